@@ -7,12 +7,15 @@ Pack-based architecture for vendor integrations.
 from .core.factory import AdapterFactory
 from .core.pack_loader import get_pack_loader
 from .core.base_adapter import BaseAdapter
+from .core.async_base_adapter import AsyncBaseAdapter, SyncAdapterShim
 from .core.schemas import MDRAlert, MDREntity, MDRProcess, MDRToolResult
 
 __all__ = [
     'AdapterFactory',
     'get_pack_loader',
     'BaseAdapter',
+    'AsyncBaseAdapter',
+    'SyncAdapterShim',
     'MDRAlert',
     'MDREntity',
     'MDRProcess',
@@ -0,0 +1,239 @@
+"""
+Adapter Cache - 租戶 Adapter 實例快取
+
+以 (vendor, tenant_id, config 指紋) 為 Key 快取已建立的 Adapter，
+讓已驗證的 Client Session 在多次工具呼叫與調查之間重複使用。
+同步與非同步 Adapter 共用此實作 (非同步 Adapter 依事件迴圈各自一個快取)。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_SIZE = 128
+DEFAULT_TTL_SECONDS = 1800
+
+logger = logging.getLogger(__name__)
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """計算配置的穩定指紋 (配置變更時會產生新的 Adapter)。"""
+    serialized = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("adapter", "created_at", "leases", "shared", "retired")
+
+    def __init__(self, adapter: Any):
+        self.adapter = adapter
+        self.created_at = time.monotonic()
+        # 目前持有租約 (acquire 尚未 release) 的呼叫端數
+        self.leases = 0
+        # 曾以無租約方式交出 (get / get_or_create)，無法得知何時用完，移出快取後不由快取關閉
+        self.shared = False
+        # 已移出快取但仍有租約，待最後一個租約歸還時關閉
+        self.retired = False
+
+
+class AdapterCache:
+    """
+    有界的 LRU + TTL Adapter 快取 (執行緒安全)。
+
+    - 同一 Key 的建立為原子操作：並行的呼叫端等待同一次建立，不會重複登入
+    - 超過 max_size 時淘汰最久未使用的項目
+    - 超過 ttl_seconds 的項目在下次存取時視為失效
+    - 被移出的 Adapter 只在沒有人借用時關閉：仍有租約者於最後一個 release() 時關閉，
+      以無租約方式交出的 Adapter 不由快取關閉 (交由呼叫端或 GC 處理)
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 closer: Optional[Callable[[Any], None]] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # 關閉被移出的 Adapter 的方式 (預設呼叫 adapter.close())
+        self.closer = closer or (lambda adapter: adapter.close())
+        self._entries: "OrderedDict[Tuple[str, str, str], _Entry]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str, str], Future] = {}
+        self._leased: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(vendor: str, tenant_id: str, config: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (vendor, tenant_id, config_fingerprint(config))
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Any]:
+        """取得快取中的 Adapter (無租約)；不存在或已過期時回傳 None"""
+        expired = []
+        with self._lock:
+            entry = self._lookup(key, expired)
+            if entry is not None:
+                entry.shared = True
+            else:
+                self.misses += 1
+        self._close(expired)
+        return entry.adapter if entry is not None else None
+
+    def put(self, key: Tuple[str, str, str], adapter: Any):
+        with self._lock:
+            evicted = self._insert(key, _Entry(adapter))
+        self._close(evicted)
+
+    def get_or_create(self, key: Tuple[str, str, str], factory: Callable[[], Any]) -> Any:
+        """取得或建立 Adapter (無租約)；同一 Key 並行呼叫時只會執行一次 factory"""
+        return self._checkout(key, factory, lease=False)
+
+    def acquire(self, key: Tuple[str, str, str], factory: Callable[[], Any]) -> Any:
+        """取得或建立 Adapter 並持有租約，用完後必須呼叫 release()"""
+        return self._checkout(key, factory, lease=True)
+
+    def release(self, adapter: Any):
+        """歸還租約；Adapter 已移出快取且沒有其他租約時關閉"""
+        with self._lock:
+            entry = self._leased.get(id(adapter))
+            if entry is None:
+                return
+            entry.leases -= 1
+            if entry.leases:
+                return
+            del self._leased[id(adapter)]
+            closing = [adapter] if entry.retired and not entry.shared else []
+        self._close(closing)
+
+    @contextmanager
+    def lease(self, key: Tuple[str, str, str], factory: Callable[[], Any]) -> Iterator[Any]:
+        adapter = self.acquire(key, factory)
+        try:
+            yield adapter
+        finally:
+            self.release(adapter)
+
+    def _checkout(self, key: Tuple[str, str, str], factory: Callable[[], Any], lease: bool) -> Any:
+        while True:
+            expired = []
+            with self._lock:
+                entry = self._lookup(key, expired)
+                if entry is not None:
+                    self._hand_out(entry, lease)
+                    pending, owner = None, False
+                else:
+                    pending = self._pending.get(key)
+                    owner = pending is None
+                    if owner:
+                        pending = self._pending[key] = Future()
+                        self.misses += 1
+            self._close(expired)
+            if entry is not None:
+                return entry.adapter
+            if not owner:
+                # 等待其他執行緒建立完成 (建立失敗時拋出相同的例外)，再重新查詢並登記租約
+                pending.result()
+                continue
+            break
+
+        try:
+            adapter = factory()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            entry = _Entry(adapter)
+            self._hand_out(entry, lease)
+            evicted = self._insert(key, entry)
+            del self._pending[key]
+        pending.set_result(adapter)
+        self._close(evicted)
+        return adapter
+
+    def _lookup(self, key: Tuple[str, str, str], expired: List[Any]) -> Optional[_Entry]:
+        # 需持有 self._lock；過期的 Adapter 放入 expired，由呼叫端在釋放鎖之後關閉
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created_at <= self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        del self._entries[key]
+        self.evictions += 1
+        expired.extend(self._retire(entry))
+        return None
+
+    def _hand_out(self, entry: _Entry, lease: bool):
+        if lease:
+            entry.leases += 1
+            self._leased[id(entry.adapter)] = entry
+        else:
+            entry.shared = True
+
+    def _insert(self, key: Tuple[str, str, str], entry: _Entry) -> List[Any]:
+        evicted = []
+        replaced = self._entries.get(key)
+        if replaced is not None and replaced.adapter is not entry.adapter:
+            evicted.extend(self._retire(replaced))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            _, old = self._entries.popitem(last=False)
+            evicted.extend(self._retire(old))
+            self.evictions += 1
+        return evicted
+
+    def _retire(self, entry: _Entry) -> List[Any]:
+        """移出快取的項目：沒有人借用時回傳以便關閉，仍有租約者延後到最後一個 release()"""
+        if entry.shared:
+            return []
+        if entry.leases:
+            entry.retired = True
+            return []
+        return [entry.adapter]
+
+    def invalidate(self, vendor: Optional[str] = None, tenant_id: Optional[str] = None) -> int:
+        """
+        移除符合條件的快取項目；未指定條件時清空全部。
+
+        Returns:
+            被移除的項目數量
+        """
+        with self._lock:
+            targets = [
+                key for key in self._entries
+                if (vendor is None or key[0] == vendor)
+                and (tenant_id is None or key[1] == tenant_id)
+            ]
+            closing = []
+            for key in targets:
+                closing.extend(self._retire(self._entries.pop(key)))
+        self._close(closing)
+        return len(targets)
+
+    def _close(self, adapters: List[Any]):
+        for adapter in adapters:
+            try:
+                self.closer(adapter)
+            except Exception as e:
+                logger.warning(f"關閉 Adapter 失敗 ({type(adapter).__name__}): {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "leased": len(self._leased),
+                "hit_rate": self.hits / total if total else 0.0
+            }
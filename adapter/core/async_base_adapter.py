@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Awaitable, Optional, TypeVar
+from .base_adapter import BaseAdapter
+from .schemas import MDRAlert, MDRProcess, MDRToolResult
+
+T = TypeVar("T")
+
+
+class AsyncBaseAdapter(ABC):
+    """
+    非同步 Adapter 介面 (與 BaseAdapter 相同的能力，但所有廠商 I/O 皆為 coroutine)。
+    讓單一行程能同時處理大量主機查詢與事件查詢。
+    """
+    cleaning_profile: Optional[str] = None
+
+    def __init__(self, tenant_id: str, config: Dict[str, Any]):
+        self.tenant_id = tenant_id
+        self.config = config
+
+    @abstractmethod
+    def normalize_alert(self, raw_data: Dict[str, Any]) -> MDRAlert:
+        """將廠商原始告警資料轉換為標準 MDRAlert 格式 (純 CPU 運算，維持同步)。"""
+        pass
+
+    # 清理 / 對映 / 優化流程不涉及 I/O，直接沿用同步版本的實作
+    transform_alert = BaseAdapter.transform_alert
+    project_for_ai = BaseAdapter.project_for_ai
+    get_elided_value = BaseAdapter.get_elided_value
+
+    @abstractmethod
+    async def list_processes(self, hostname: str) -> List[MDRProcess]:
+        """獲取指定主機的執行程序列表。"""
+        pass
+
+    @abstractmethod
+    async def isolate_host(self, hostname: str) -> MDRToolResult:
+        """執行網路隔離。"""
+        pass
+
+    @abstractmethod
+    async def terminate_process(self, hostname: str, pid: int) -> MDRToolResult:
+        """終止惡意程序。"""
+        pass
+
+    @abstractmethod
+    async def get_host_details(self, hostname: str) -> Dict[str, Any]:
+        """獲取主機詳細資訊。"""
+        pass
+
+    async def aclose(self):
+        """釋放底層連線 (子類可覆寫)。"""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "aclose"):
+            await client.aclose()
+
+
+class _BackgroundLoop:
+    """
+    在背景執行緒中常駐的事件迴圈。
+    非同步 Client 的連線池綁定於單一事件迴圈，因此同步呼叫端必須共用同一個迴圈。
+    """
+    _loop = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> asyncio.AbstractEventLoop:
+        if cls._loop is None:
+            with cls._lock:
+                if cls._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="mdr-adapter-loop", daemon=True)
+                    thread.start()
+                    cls._loop = loop
+        return cls._loop
+
+    @classmethod
+    def run(cls, coro: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, cls.get()).result()
+
+
+class SyncAdapterShim(BaseAdapter):
+    """
+    將 AsyncBaseAdapter 包裝為同步 BaseAdapter，讓既有的同步呼叫端 (Skills、ToolRegistry) 不需修改。
+    """
+    def __init__(self, async_adapter: AsyncBaseAdapter):
+        super().__init__(async_adapter.tenant_id, async_adapter.config)
+        self.async_adapter = async_adapter
+
+    def normalize_alert(self, raw_data: Dict[str, Any]) -> MDRAlert:
+        return self.async_adapter.normalize_alert(raw_data)
+
+    def transform_alert(self, raw_data: Dict[str, Any], event_type: str = None) -> MDRAlert:
+        if event_type is None:
+            return self.async_adapter.transform_alert(raw_data)
+        return self.async_adapter.transform_alert(raw_data, event_type=event_type)
+
+    def list_processes(self, hostname: str) -> List[MDRProcess]:
+        return _BackgroundLoop.run(self.async_adapter.list_processes(hostname))
+
+    def isolate_host(self, hostname: str) -> MDRToolResult:
+        return _BackgroundLoop.run(self.async_adapter.isolate_host(hostname))
+
+    def terminate_process(self, hostname: str, pid: int) -> MDRToolResult:
+        return _BackgroundLoop.run(self.async_adapter.terminate_process(hostname, pid))
+
+    def get_host_details(self, hostname: str) -> Dict[str, Any]:
+        return _BackgroundLoop.run(self.async_adapter.get_host_details(hostname))
+
+    def close(self):
+        _BackgroundLoop.run(self.async_adapter.aclose())
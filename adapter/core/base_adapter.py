@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .schemas import MDRAlert, MDRProcess, MDRToolResult
 
 class BaseAdapter(ABC):
+    # 自訂白名單 / 投影設定的 profile 名稱 (PackLoader 依 pack_metadata.json 設定)
+    cleaning_profile: Optional[str] = None
+
     def __init__(self, tenant_id: str, config: Dict[str, Any]):
         self.tenant_id = tenant_id
         self.config = config
@@ -15,21 +18,49 @@ class BaseAdapter(ABC):
     def transform_alert(self, raw_data: Dict[str, Any], event_type: str = "generic") -> MDRAlert:
         """
         標準化處理管道：Clean -> Map -> Optimize -> Validate
+        清洗與 AI 欄位篩選使用預編譯的 CleaningPlan，在對映後以單次走訪完成。
         """
         from .cleaner import DataCleaner
         
-        # 1. 基礎清理 (移除空值與冗餘)
-        clean_raw = DataCleaner.clean_dict(raw_data)
+        plan = DataCleaner.get_plan(event_type, self.cleaning_profile)
         
-        # 2. 正規化對映 (由子類實作)
-        alert = self.normalize_alert(clean_raw)
+        # 1. 正規化對映 (由子類實作)；Mapper 取得移除頂層空值與冗餘 Key 的淺層檢視
+        alert = self.normalize_alert(plan.mapper_view(raw_data))
         
-        # 3. AI Token 優化
-        alert.raw_data = DataCleaner.optimize_for_ai(alert.raw_data, event_type=event_type)
+        # 2. 清洗 + AI Token 優化 (單次走訪)
+        alert.raw_data = plan.apply(alert.raw_data)
         
-        # 4. 驗證 (Pydantic 自動處理，這裡可以加額外的邏輯)
+        # 3. 驗證 (Pydantic 自動處理，這裡可以加額外的邏輯)
         return alert
 
+    def project_for_ai(self, data: Any, event_type: str) -> Any:
+        """
+        依 Pack 的投影設定篩選工具結果 (例如 get_host_details 的 "host")；未定義投影時只套用預設的大小上限。
+        """
+        from .cleaner import DataCleaner, DEFAULT_LIMITS, ProjectionProfile
+
+        plan = DataCleaner.get_plan(event_type, self.cleaning_profile)
+        # 白名單清洗計畫是為告警設計的，工具結果只在 Pack 明確定義投影時才篩選
+        return plan.apply(data) if isinstance(plan, ProjectionProfile) else DEFAULT_LIMITS.apply(data)
+
+    def get_elided_value(self, ref: str) -> Dict[str, Any]:
+        """取回告警或工具結果中被截斷的完整內容 (ref 為 <elided ... ref=...> 佔位字串中的值)。"""
+        from .cleaner import get_elided_store
+
+        value = get_elided_store().get(ref)
+        if value is None:
+            return {"status": "error", "message": f"找不到 ref={ref} 的內容 (可能已過期)"}
+        return {"status": "success", "ref": ref, "value": value}
+
+    def close(self):
+        """
+        釋放 Adapter 自有的資源 (AdapterCache 淘汰時呼叫，子類可覆寫)。
+        共用的連線池與 TokenManager 由其他 Adapter 共同使用，不在此關閉。
+        """
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+
 
     @abstractmethod
     def list_processes(self, hostname: str) -> List[MDRProcess]:
@@ -1,4 +1,439 @@
-from typing import Dict, Any, List, Set
+import fnmatch
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+# 預設排除常見冗餘 Key
+DEFAULT_EXCLUDE_KEYS = frozenset({"links", "self", "href", "metadata_version"})
+
+# 定義不同類型事件的「必備診斷欄位」(以子字串比對 Key)
+DIAGNOSTIC_WHITELIST = {
+    "file": {"name", "path", "hash", "sha256", "md5", "action", "size", "process_name"},
+    "process": {"pid", "ppid", "name", "command_line", "executable_path", "user"},
+    "registry": {"path", "hive", "name", "value", "action"},
+    "network": {"source_ip", "dest_ip", "source_port", "dest_port", "protocol", "domain"},
+    "generic": {"id", "type", "severity", "title", "description", "timestamp"}
+}
+
+# Key 比對結果的快取上限 (廠商欄位名稱有限，通常遠低於此值)
+MAX_KEY_CACHE = 4096
+
+# 送給 AI 的值大小上限 (None 表示不限)；超過上限的內容以摘要佔位字串取代，完整值保留在 ElidedValueStore
+DEFAULT_MAX_STRING_LENGTH = 2048
+DEFAULT_MAX_LIST_LENGTH = 50
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_ELIDED_ENTRIES = 10_000
+ELIDED_PLACEHOLDER = "<elided {kind} len={length} ref={ref}>"
+
+# 各 Pack 註冊的自訂白名單 (profile 名稱 -> 與預設合併後的白名單)
+_PROFILE_WHITELISTS: Dict[str, Dict[str, FrozenSet[str]]] = {}
+
+# 各 Pack 註冊的投影設定 (profile 名稱 -> 事件類型 -> ProjectionProfile)；"*" 套用於未個別定義的事件類型
+_PROFILE_PROJECTIONS: Dict[str, Dict[str, "ProjectionProfile"]] = {}
+ANY_EVENT_TYPE = "*"
+
+
+def merge_whitelist(overrides: Optional[Mapping[str, Iterable[str]]] = None,
+                    base: Optional[Mapping[str, Iterable[str]]] = None) -> Dict[str, FrozenSet[str]]:
+    """將自訂白名單併入預設白名單 (同一事件類型取聯集，Key 一律轉小寫)"""
+    merged = {event_type: frozenset(h.lower() for h in hints) for event_type, hints in (base or DIAGNOSTIC_WHITELIST).items()}
+    for event_type, hints in (overrides or {}).items():
+        merged[event_type] = merged.get(event_type, frozenset()) | frozenset(h.lower() for h in hints)
+    return merged
+
+
+def register_whitelist(profile: str, overrides: Mapping[str, Iterable[str]]):
+    """
+    註冊 Pack 專屬的白名單 (例如 pack_metadata.json 的 diagnostic_whitelist)，
+    之後以 DataCleaner.get_plan(event_type, profile) 取得對應的清洗計畫。
+    """
+    _PROFILE_WHITELISTS[profile] = merge_whitelist(overrides)
+    DataCleaner.get_plan.cache_clear()
+
+
+def register_projections(profile: str, specs: Mapping[str, Mapping[str, Any]]):
+    """
+    註冊 Pack 專屬的投影設定 (pack_metadata.json 的 projection_profiles，事件類型 -> 設定)。
+    已定義投影的事件類型改用 ProjectionProfile，取代白名單清洗計畫。
+    """
+    _PROFILE_PROJECTIONS[profile] = {
+        event_type: ProjectionProfile.from_spec(spec) for event_type, spec in specs.items()
+    }
+    DataCleaner.get_plan.cache_clear()
+
+
+class ElidedValueStore:
+    """
+    被截斷內容的側存區 (執行緒安全的 LRU)：以內容雜湊 ref 保存完整值，供 AI 或分析師事後取回。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ELIDED_ENTRIES):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(value: Any) -> str:
+        raw = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def put(self, value: Any) -> str:
+        ref = self.digest(value)
+        with self._lock:
+            self._values[ref] = value
+            self._values.move_to_end(ref)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> Optional[Any]:
+        with self._lock:
+            value = self._values.get(ref)
+            if value is not None:
+                self._values.move_to_end(ref)
+            return value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+_elided_store = ElidedValueStore()
+
+
+def get_elided_store() -> ElidedValueStore:
+    """取得全域的截斷內容側存區"""
+    return _elided_store
+
+
+class SizeLimits:
+    """
+    字串長度、list 長度與巢狀深度上限：
+    - 過長的字串保留開頭，其後接上佔位字串 "<elided str len=... ref=...>"
+    - 過長的 list 保留前 max_list_length 個元素，最後一個元素為整個 list 的佔位字串
+    - 超過 max_depth 的 dict / list 整個以佔位字串取代
+    """
+
+    def __init__(self, max_string_length: Optional[int] = DEFAULT_MAX_STRING_LENGTH,
+                 max_list_length: Optional[int] = DEFAULT_MAX_LIST_LENGTH,
+                 max_depth: Optional[int] = DEFAULT_MAX_DEPTH, store: Optional[ElidedValueStore] = None):
+        self.max_string_length = max_string_length
+        self.max_list_length = max_list_length
+        self.max_depth = max_depth
+        self.store = store
+
+    def _placeholder(self, kind: str, value: Any) -> str:
+        ref = (self.store or _elided_store).put(value)
+        return ELIDED_PLACEHOLDER.format(kind=kind, length=len(value), ref=ref)
+
+    def apply(self, value: Any, depth: int = 0) -> Any:
+        """回傳套用上限後的值 (未超過上限的結構直接共用，不複製)"""
+        if isinstance(value, str):
+            if self.max_string_length is not None and len(value) > self.max_string_length:
+                return f"{value[:self.max_string_length]} {self._placeholder('str', value)}"
+            return value
+        if not isinstance(value, (dict, list)):
+            return value
+        if self.max_depth is not None and depth >= self.max_depth:
+            return self._placeholder(type(value).__name__, value)
+
+        apply = self.apply
+        changed = False
+        if isinstance(value, dict):
+            limited = {}
+            for k, v in value.items():
+                if isinstance(v, (str, dict, list)):
+                    inner = apply(v, depth + 1)
+                    changed = changed or inner is not v
+                    v = inner
+                limited[k] = v
+            return limited if changed else value
+
+        items = value
+        if self.max_list_length is not None and len(value) > self.max_list_length:
+            items = value[:self.max_list_length]
+            changed = True
+        limited = []
+        for item in items:
+            if isinstance(item, (str, dict, list)):
+                inner = apply(item, depth + 1)
+                changed = changed or inner is not item
+                item = inner
+            limited.append(item)
+        if items is not value:
+            limited.append(self._placeholder("list", value))
+        return limited if changed else value
+
+
+DEFAULT_LIMITS = SizeLimits()
+
+
+class CleaningPlan:
+    """
+    預先編譯的清洗計畫：排除 Key 集合 + 事件類型白名單 (編譯為單一 Regex)。
+    apply() 以一次遞迴同時完成 clean_dict 與 optimize_for_ai，結果與兩者依序執行相同，
+    但不建立中間的清洗副本，且不會走訪白名單以外的子樹。
+    """
+
+    def __init__(self, allowed_hints: Iterable[str], exclude_keys: Iterable[str] = DEFAULT_EXCLUDE_KEYS,
+                 limits: SizeLimits = DEFAULT_LIMITS):
+        self.allowed_hints: FrozenSet[str] = frozenset(h.lower() for h in allowed_hints)
+        self.limits = limits
+        self.exclude_keys: FrozenSet[str] = frozenset(exclude_keys)
+        self._pattern = re.compile("|".join(re.escape(h) for h in sorted(self.allowed_hints))) if self.allowed_hints else None
+        self._key_cache: Dict[str, bool] = {}
+
+    @classmethod
+    def for_event_type(cls, event_type: str = "generic", exclude_keys: Iterable[str] = DEFAULT_EXCLUDE_KEYS,
+                       whitelist: Optional[Mapping[str, Iterable[str]]] = None) -> "CleaningPlan":
+        whitelist = whitelist or DIAGNOSTIC_WHITELIST
+        hints = set(whitelist.get("generic", ()))
+        hints.update(whitelist.get(event_type, ()))
+        return cls(hints, exclude_keys)
+
+    def allows(self, key: str) -> bool:
+        allowed = self._key_cache.get(key)
+        if allowed is None:
+            allowed = self._pattern is not None and self._pattern.search(key.lower()) is not None
+            if len(self._key_cache) >= MAX_KEY_CACHE:
+                self._key_cache.clear()
+            self._key_cache[key] = allowed
+        return allowed
+
+    def mapper_view(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        供 Mapper 使用的淺層檢視：只移除頂層的空值與排除 Key，巢狀結構直接共用不複製。
+        """
+        exclude_keys = self.exclude_keys
+        return {k: v for k, v in data.items() if v is not None and k not in exclude_keys}
+
+    def project(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """只做白名單篩選 (不移除空值)，結果與舊版 optimize_for_ai 相同"""
+        if not isinstance(data, dict):
+            return data
+        projected = {}
+        for k, v in data.items():
+            if not self.allows(k):
+                continue
+            if isinstance(v, dict):
+                projected[k] = self.project(v)
+            elif isinstance(v, list):
+                projected[k] = [self.project(item) if isinstance(item, dict) else item for item in v]
+            else:
+                projected[k] = v
+        return projected
+
+    def apply(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """單次走訪完成清洗與 AI 欄位篩選，最後套用大小上限"""
+        if not isinstance(data, dict):
+            return data
+        return self.limits.apply(self._project(data)[0])
+
+    def _has_content(self, value: Any) -> bool:
+        # 判斷 clean_dict 後是否仍有內容 (不建立副本，找到第一個有效值即返回)
+        if isinstance(value, dict):
+            return any(
+                k not in self.exclude_keys and v is not None and self._has_content(v)
+                for k, v in value.items()
+            )
+        if isinstance(value, list):
+            return any(not isinstance(item, dict) or self._has_content(item) for item in value)
+        return True
+
+    def _project(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Returns:
+            (篩選後的字典, clean_dict 後是否仍有內容)
+        """
+        projected = {}
+        has_content = False
+        for k, v in data.items():
+            if v is None or k in self.exclude_keys:
+                continue
+            if not self.allows(k):
+                # 不在白名單的子樹不會輸出，只需確認其是否讓上層在清洗後非空
+                if not has_content:
+                    has_content = self._has_content(v)
+                continue
+
+            if isinstance(v, dict):
+                inner, inner_content = self._project(v)
+                if inner_content:
+                    projected[k] = inner
+                    has_content = True
+            elif isinstance(v, list):
+                items = []
+                for item in v:
+                    if isinstance(item, dict):
+                        inner, inner_content = self._project(item)
+                        if inner_content:
+                            items.append(inner)
+                    else:
+                        items.append(item)
+                if items:
+                    projected[k] = items
+                    has_content = True
+            else:
+                projected[k] = v
+                has_content = True
+        return projected, has_content
+
+
+class _PathNode:
+    """路徑 Trie 的節點；recursive 節點對應 "**"，可比對任意層數"""
+    __slots__ = ("children", "terminal", "recursive")
+
+    def __init__(self, recursive: bool = False):
+        self.children: List[Tuple[Optional["re.Pattern"], "_PathNode"]] = []
+        self.terminal = False
+        self.recursive = recursive
+
+
+_NO_STATE: FrozenSet[_PathNode] = frozenset()
+# 投影結果中被整個移除的值
+_DROP = object()
+
+
+class _PathMatcher:
+    """
+    將點分隔的欄位路徑 (例如 "telemetry.Process*"、"**.sha256") 編譯為 NFA。
+    每段以 fnmatch 規則、不分大小寫比對；list 不佔路徑層級。狀態轉移結果會被記住。
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.root = _PathNode()
+        self.paths = tuple(paths)
+        for path in self.paths:
+            node = self.root
+            for segment in path.split("."):
+                if segment == "**":
+                    child = _PathNode(recursive=True)
+                    node.children.append((None, child))
+                else:
+                    child = _PathNode()
+                    node.children.append((re.compile(fnmatch.translate(segment), re.IGNORECASE), child))
+                node = child
+            node.terminal = True
+        self.start = self._closure({self.root}) if self.paths else _NO_STATE
+        self._cache: Dict[Tuple[FrozenSet[_PathNode], str], FrozenSet[_PathNode]] = {}
+
+    @staticmethod
+    def _closure(nodes: Set[_PathNode]) -> FrozenSet[_PathNode]:
+        # "**" 可比對零層，進入父節點時即一併啟用
+        pending = list(nodes)
+        while pending:
+            for pattern, child in pending.pop().children:
+                if pattern is None and child not in nodes:
+                    nodes.add(child)
+                    pending.append(child)
+        return frozenset(nodes)
+
+    def step(self, state: FrozenSet[_PathNode], key: str) -> FrozenSet[_PathNode]:
+        if not state:
+            return _NO_STATE
+        cache_key = (state, key)
+        nxt = self._cache.get(cache_key)
+        if nxt is None:
+            matched = set()
+            for node in state:
+                if node.recursive:
+                    matched.add(node)
+                for pattern, child in node.children:
+                    if pattern is not None and pattern.match(key):
+                        matched.add(child)
+            nxt = self._closure(matched) if matched else _NO_STATE
+            if len(self._cache) >= MAX_KEY_CACHE:
+                self._cache.clear()
+            self._cache[cache_key] = nxt
+        return nxt
+
+    @staticmethod
+    def is_terminal(state: FrozenSet[_PathNode]) -> bool:
+        return any(node.terminal for node in state)
+
+
+class ProjectionProfile:
+    """
+    Pack 定義的欄位投影 (與 CleaningPlan 相同介面，可直接用於 transform_alert)：
+    - include: 要保留的欄位路徑 (保留整個子樹)；未設定時保留全部
+    - exclude: 要移除的欄位路徑 (優先於 include)
+    - max_list_length / max_string_length / max_depth: 大小上限 (SizeLimits)，未設定的項目使用預設值
+    同時套用 clean_dict 的規則 (移除空值、預設排除 Key 與清洗後為空的結構)。
+    """
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = (),
+                 limits: SizeLimits = DEFAULT_LIMITS, exclude_keys: Iterable[str] = DEFAULT_EXCLUDE_KEYS):
+        self.include = _PathMatcher(include)
+        self.exclude = _PathMatcher(exclude)
+        self.limits = limits
+        self.exclude_keys: FrozenSet[str] = frozenset(exclude_keys)
+
+    @classmethod
+    def from_spec(cls, spec: Mapping[str, Any]) -> "ProjectionProfile":
+        unknown = set(spec) - {"include", "exclude", "max_list_length", "max_string_length", "max_depth"}
+        if unknown:
+            raise ValueError(f"未知的投影設定欄位: {', '.join(sorted(unknown))}")
+        limits = SizeLimits(
+            max_string_length=spec.get("max_string_length", DEFAULT_MAX_STRING_LENGTH),
+            max_list_length=spec.get("max_list_length", DEFAULT_MAX_LIST_LENGTH),
+            max_depth=spec.get("max_depth", DEFAULT_MAX_DEPTH)
+        )
+        return cls(include=spec.get("include", ()), exclude=spec.get("exclude", ()), limits=limits)
+
+    def mapper_view(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """供 Mapper 使用的淺層檢視 (同 CleaningPlan.mapper_view)"""
+        exclude_keys = self.exclude_keys
+        return {k: v for k, v in data.items() if v is not None and k not in exclude_keys}
+
+    def project(self, data: Any) -> Any:
+        """與 CleaningPlan.project 相同的介面 (供 optimize_for_ai 使用)；投影本身即包含清洗，等同 apply()"""
+        return self.apply(data)
+
+    def apply(self, data: Any) -> Any:
+        if not isinstance(data, (dict, list)):
+            return data
+        projected = self._value(data, self.include.start, self.exclude.start, not self.include.paths)
+        return type(data)() if projected is _DROP else self.limits.apply(projected)
+
+    def _value(self, value: Any, include: FrozenSet[_PathNode], exclude: FrozenSet[_PathNode], included: bool) -> Any:
+        if isinstance(value, dict):
+            return self._dict(value, include, exclude, included)
+        if isinstance(value, list):
+            items = []
+            for item in value:
+                item = self._value(item, include, exclude, included)
+                if item is not _DROP:
+                    items.append(item)
+            return items if items else _DROP
+        if not included:
+            # 只是 include 路徑的上層，純量值不保留
+            return _DROP
+        return value
+
+    def _dict(self, data: Dict[str, Any], include: FrozenSet[_PathNode], exclude: FrozenSet[_PathNode],
+              included: bool) -> Any:
+        projected = {}
+        for k, v in data.items():
+            if v is None or k in self.exclude_keys:
+                continue
+            inner_exclude = self.exclude.step(exclude, k)
+            if inner_exclude and self.exclude.is_terminal(inner_exclude):
+                continue
+            inner_include = _NO_STATE
+            inner_included = included
+            if not included:
+                inner_include = self.include.step(include, k)
+                if not inner_include:
+                    continue
+                inner_included = self.include.is_terminal(inner_include)
+            v = self._value(v, inner_include, inner_exclude, inner_included)
+            if v is not _DROP:
+                projected[k] = v
+        return projected if projected else _DROP
+
 
 class DataCleaner:
     """
@@ -6,13 +441,28 @@ class DataCleaner:
     目標：剔除冗餘欄位、縮減 Token 消耗、過濾雜訊。
     """
     
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_plan(event_type: str = "generic", profile: Optional[str] = None) -> Union[CleaningPlan, ProjectionProfile]:
+        """
+        取得 (並快取) 指定事件類型的預編譯清洗計畫。
+        profile 為 register_whitelist / register_projections 註冊的名稱 (通常是 Pack 名稱)：
+        該事件類型有投影設定時回傳 ProjectionProfile，否則使用 (Pack 自訂或預設的) 白名單。
+        """
+        projections = _PROFILE_PROJECTIONS.get(profile) if profile else None
+        if projections:
+            projection = projections.get(event_type) or projections.get(ANY_EVENT_TYPE)
+            if projection is not None:
+                return projection
+        return CleaningPlan.for_event_type(event_type, whitelist=_PROFILE_WHITELISTS.get(profile) if profile else None)
+
     @staticmethod
     def clean_dict(data: Dict[str, Any], exclude_keys: Set[str] = None) -> Dict[str, Any]:
         """
         遞迴清理字典，移除空值與排除的 Key。
         """
         if exclude_keys is None:
-            exclude_keys = {"links", "self", "href", "metadata_version"} # 預設排除常見冗餘 Key
+            exclude_keys = DEFAULT_EXCLUDE_KEYS
             
         cleaned = {}
         for k, v in data.items():
@@ -36,44 +486,10 @@ class DataCleaner:
         return cleaned
 
     @staticmethod
-    def optimize_for_ai(data: Dict[str, Any], event_type: str = "generic") -> Dict[str, Any]:
+    def optimize_for_ai(data: Dict[str, Any], event_type: str = "generic", profile: Optional[str] = None) -> Dict[str, Any]:
         """
         針對 AI 分析進行額外的優化。
         動態篩選關鍵欄位，大幅減少 Token 消耗。
+        白名單依事件類型 (與 Pack profile) 預先編譯為單一 Regex，每個 Key 的比對結果會被記住。
         """
-        # 定義不同類型事件的「必備診斷欄位」
-        DIAGNOSTIC_WHITELIST = {
-            "file": {"name", "path", "hash", "sha256", "md5", "action", "size", "process_name"},
-            "process": {"pid", "ppid", "name", "command_line", "executable_path", "user"},
-            "registry": {"path", "hive", "name", "value", "action"},
-            "network": {"source_ip", "dest_ip", "source_port", "dest_port", "protocol", "domain"},
-            "generic": {"id", "type", "severity", "title", "description", "timestamp"}
-        }
-
-        # 這裡的邏輯可以進一步擴展，例如針對長 String 進行摘要
-        if not isinstance(data, dict):
-            return data
-
-        # 基礎策略：僅保留特定 Key，或根據 event_type 篩選
-        # 為了保持彈性，我們合併通用欄位與特定類型欄位
-        allowed_keys = DIAGNOSTIC_WHITELIST["generic"]
-        if event_type in DIAGNOSTIC_WHITELIST:
-            allowed_keys = allowed_keys.union(DIAGNOSTIC_WHITELIST[event_type])
-
-        # 執行過濾
-        optimized = {}
-        for k, v in data.items():
-            # 模糊匹配或精確匹配 Key
-            k_lower = k.lower()
-            if any(key in k_lower for key in allowed_keys):
-                if isinstance(v, dict):
-                    optimized[k] = DataCleaner.optimize_for_ai(v, event_type)
-                elif isinstance(v, list):
-                    optimized[k] = [
-                        DataCleaner.optimize_for_ai(item, event_type) if isinstance(item, dict) else item 
-                        for item in v
-                    ]
-                else:
-                    optimized[k] = v
-        
-        return optimized
+        return DataCleaner.get_plan(event_type, profile).project(data)
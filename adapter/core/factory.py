@@ -1,6 +1,37 @@
-from typing import Dict, Any
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, AsyncIterator, Iterator, Optional
 from .base_adapter import BaseAdapter
 from .pack_loader import get_pack_loader
+from .adapter_cache import AdapterCache
+from .async_base_adapter import AsyncBaseAdapter
+
+# 全域 Adapter 快取 (讓已驗證的 Session 在工具呼叫之間重用)
+_adapter_cache = AdapterCache()
+
+# 非同步 Adapter 的連線池綁定於事件迴圈，因此每個事件迴圈各自一個快取 (迴圈結束後隨之釋放)
+_async_adapter_caches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AdapterCache]" = weakref.WeakKeyDictionary()
+_async_caches_lock = threading.Lock()
+
+
+def _async_cache_for(loop: asyncio.AbstractEventLoop) -> AdapterCache:
+    with _async_caches_lock:
+        cache = _async_adapter_caches.get(loop)
+        if cache is None:
+            loop_ref = weakref.ref(loop)
+            cache = AdapterCache(closer=lambda adapter: _schedule_aclose(loop_ref, adapter))
+            _async_adapter_caches[loop] = cache
+        return cache
+
+
+def _schedule_aclose(loop_ref: "weakref.ref", adapter: AsyncBaseAdapter):
+    # 被移出快取的非同步 Adapter 在其所屬事件迴圈上關閉 (迴圈已結束時連線池已無法使用，直接略過)
+    loop = loop_ref()
+    if loop is None or loop.is_closed():
+        return
+    loop.call_soon_threadsafe(lambda: loop.create_task(adapter.aclose()))
 
 class AdapterFactory:
     """
@@ -8,18 +39,48 @@ class AdapterFactory:
     """
     
     @staticmethod
-    def get_adapter(vendor: str, tenant_id: str, config: Dict[str, Any]) -> BaseAdapter:
+    def get_adapter(vendor: str, tenant_id: str, config: Dict[str, Any], use_cache: bool = True) -> BaseAdapter:
         """
         Dynamically load and instantiate an adapter from a pack.
         
+        Live adapters are cached per (vendor, tenant_id, config fingerprint),
+        so repeated tool calls reuse the same authenticated client.
+        Concurrent callers for the same key share a single instantiation.
+        The returned adapter is not leased, so the cache never closes it;
+        use lease() to let evicted adapters be closed once no caller holds them.
+        
         Args:
             vendor: Vendor name (e.g., 'Fidelis', 'TrendMicro')
             tenant_id: Tenant identifier
             config: Vendor-specific configuration
+            use_cache: Reuse a cached adapter instance when available
             
         Returns:
             Instantiated adapter instance
         """
+        if not use_cache:
+            return AdapterFactory._create_adapter(vendor, tenant_id, config)
+        return _adapter_cache.get_or_create(AdapterCache.make_key(vendor, tenant_id, config),
+                                            lambda: AdapterFactory._create_adapter(vendor, tenant_id, config))
+    
+    @staticmethod
+    @contextmanager
+    def lease(vendor: str, tenant_id: str, config: Dict[str, Any]) -> Iterator[BaseAdapter]:
+        """
+        Borrow the cached adapter for the duration of a with-block.
+        
+        An adapter evicted while leased is closed when its last lease is released.
+        
+        Usage:
+            with AdapterFactory.lease("Fidelis", tenant_id, config) as adapter:
+                adapter.isolate_host(hostname)
+        """
+        with _adapter_cache.lease(AdapterCache.make_key(vendor, tenant_id, config),
+                                  lambda: AdapterFactory._create_adapter(vendor, tenant_id, config)) as adapter:
+            yield adapter
+    
+    @staticmethod
+    def _create_adapter(vendor: str, tenant_id: str, config: Dict[str, Any]) -> BaseAdapter:
         pack_loader = get_pack_loader()
         
         # Validate configuration
@@ -30,6 +91,82 @@ class AdapterFactory:
         adapter_class = pack_loader.get_adapter_class(vendor)
         return adapter_class(tenant_id=tenant_id, config=config)
     
+    @staticmethod
+    def get_async_adapter(vendor: str, tenant_id: str, config: Dict[str, Any], use_cache: bool = True) -> AsyncBaseAdapter:
+        """
+        Instantiate the async adapter of a pack.
+        
+        Async adapters hold connection pools bound to the running event loop,
+        so they are cached per event loop. Called outside a running loop,
+        a new uncached adapter is returned. As with get_adapter(), the returned
+        adapter is not leased; use async_lease() instead of closing it yourself.
+        
+        Args:
+            vendor: Vendor name (e.g., 'Fidelis')
+            tenant_id: Tenant identifier
+            config: Vendor-specific configuration
+            use_cache: Reuse the adapter cached for the running event loop
+            
+        Returns:
+            Instantiated async adapter instance
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if not use_cache or loop is None:
+            return AdapterFactory._create_async_adapter(vendor, tenant_id, config)
+        return _async_cache_for(loop).get_or_create(AdapterCache.make_key(vendor, tenant_id, config),
+                                                    lambda: AdapterFactory._create_async_adapter(vendor, tenant_id, config))
+    
+    @staticmethod
+    @asynccontextmanager
+    async def async_lease(vendor: str, tenant_id: str, config: Dict[str, Any]) -> AsyncIterator[AsyncBaseAdapter]:
+        """
+        Borrow the async adapter cached for the running event loop.
+        
+        Usage:
+            async with AdapterFactory.async_lease("Fidelis", tenant_id, config) as adapter:
+                await adapter.get_host_details(hostname)
+        """
+        cache = _async_cache_for(asyncio.get_running_loop())
+        with cache.lease(AdapterCache.make_key(vendor, tenant_id, config),
+                         lambda: AdapterFactory._create_async_adapter(vendor, tenant_id, config)) as adapter:
+            yield adapter
+    
+    @staticmethod
+    def _create_async_adapter(vendor: str, tenant_id: str, config: Dict[str, Any]) -> AsyncBaseAdapter:
+        pack_loader = get_pack_loader()
+        
+        if not pack_loader.validate_pack_config(vendor, config):
+            raise ValueError(f"Invalid configuration for {vendor} pack. Check required_config in pack metadata.")
+        
+        adapter_class = pack_loader.get_async_adapter_class(vendor)
+        return adapter_class(tenant_id=tenant_id, config=config)
+    
+    @staticmethod
+    def invalidate(vendor: Optional[str] = None, tenant_id: Optional[str] = None) -> int:
+        """
+        Drop cached adapters (e.g. after credential rotation).
+        
+        Args:
+            vendor: Only drop adapters of this vendor
+            tenant_id: Only drop adapters of this tenant
+            
+        Returns:
+            Number of cached adapters removed
+        """
+        with _async_caches_lock:
+            caches = [_adapter_cache] + list(_async_adapter_caches.values())
+        return sum(cache.invalidate(vendor=vendor, tenant_id=tenant_id) for cache in caches)
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """
+        Get adapter cache counters (size, hits, misses, evictions, hit_rate).
+        """
+        return _adapter_cache.stats()
+    
     @staticmethod
     def list_available_vendors() -> list:
         """
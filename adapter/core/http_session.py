@@ -0,0 +1,72 @@
+"""
+HTTP Session Pool - 共用連線池
+
+為廠商 Client 提供以 server_url 為單位共用的 requests.Session，
+讓同一台廠商主控台的所有 Adapter 實例重用 TCP/TLS 連線 (Keep-Alive)。
+"""
+
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (502, 503, 504)
+
+_sessions: Dict[Tuple[str, int, int], requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _build_session(pool_size: int, max_retries: int) -> requests.Session:
+    """建立具備連線池與重試策略的 Session。"""
+    # 僅對冪等方法重試，避免 POST (例如執行隔離腳本) 被重複送出
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_shared_session(server_url: str, pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES) -> requests.Session:
+    """
+    取得指定 server_url 的共用 Session，不存在時建立。
+
+    Args:
+        server_url: 廠商主控台 URL (作為共用 Key)
+        pool_size: 連線池大小
+        max_retries: 連線錯誤與 5xx 的最大重試次數
+
+    Returns:
+        共用的 requests.Session 實例
+    """
+    key = (server_url.rstrip('/'), pool_size, max_retries)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _build_session(pool_size, max_retries)
+            _sessions[key] = session
+        return session
+
+
+def close_all_sessions():
+    """關閉所有共用 Session（主要用於服務關閉或測試）"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -5,11 +5,14 @@ This module provides functionality to discover and load vendor packs dynamically
 """
 
 import os
+import re
 import json
 import importlib
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from .cleaner import register_projections, register_whitelist
+
 class PackLoader:
     """Dynamically loads and manages vendor packs"""
     
@@ -86,6 +89,7 @@ class PackLoader:
             # Get the adapter class (convention: {PackName}Adapter)
             adapter_class_name = f"{pack_name}Adapter"
             adapter_class = getattr(pack_module, adapter_class_name)
+            self._apply_cleaning_profile(pack_name, adapter_class)
             
             self._pack_cache[pack_name] = adapter_class
             return adapter_class
@@ -93,6 +97,50 @@ class PackLoader:
         except (ImportError, AttributeError) as e:
             raise ImportError(f"Failed to load adapter from pack '{pack_name}': {str(e)}")
     
+    def get_async_adapter_class(self, pack_name: str):
+        """
+        Dynamically import and return the async Adapter class from a pack.
+        
+        Args:
+            pack_name: Name of the pack (e.g., 'Fidelis')
+            
+        Returns:
+            Async adapter class from the pack (convention: Async{PackName}Adapter)
+        """
+        cache_key = f"async:{pack_name}"
+        if cache_key in self._pack_cache:
+            return self._pack_cache[cache_key]
+        
+        try:
+            pack_module = importlib.import_module(f"adapter.packs.{pack_name}")
+            adapter_class = getattr(pack_module, f"Async{pack_name}Adapter")
+            self._apply_cleaning_profile(pack_name, adapter_class)
+            
+            self._pack_cache[cache_key] = adapter_class
+            return adapter_class
+            
+        except (ImportError, AttributeError) as e:
+            raise ImportError(f"Failed to load async adapter from pack '{pack_name}': {str(e)}")
+    
+    def _apply_cleaning_profile(self, pack_name: str, adapter_class):
+        """
+        依 pack_metadata.json 編譯該 Pack 送給 AI 的欄位設定，之後該 Pack 的 transform_alert 與工具結果使用此設定：
+        - diagnostic_whitelist: 事件類型 -> Key 子字串列表，併入預設白名單
+        - projection_profiles: 事件類型 -> {include, exclude, max_list_length, max_string_length}
+        """
+        metadata = self.load_pack_metadata(pack_name)
+        whitelist = metadata.get("diagnostic_whitelist")
+        projections = metadata.get("projection_profiles")
+        if whitelist:
+            register_whitelist(pack_name, whitelist)
+        if projections:
+            try:
+                register_projections(pack_name, projections)
+            except (TypeError, ValueError, re.error) as e:
+                raise ValueError(f"Invalid projection_profiles in pack '{pack_name}': {str(e)}")
+        if whitelist or projections:
+            adapter_class.cleaning_profile = pack_name
+    
     def list_pack_capabilities(self, pack_name: str) -> List[str]:
         """
         Get the list of capabilities provided by a pack.
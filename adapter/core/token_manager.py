@@ -0,0 +1,254 @@
+"""
+Token Manager - 廠商 API Token 生命週期管理
+
+負責追蹤 Token 到期時間、於到期前在背景主動更新、將並發的更新請求合併為一次，
+並在收到 401 時讓呼叫端以新 Token 重送一次請求 (靜態 API Key 無法更新，不重送)。
+同一組憑證的所有 Client 透過 get_shared_token_manager 共用一個管理器與背景計時器。
+供各廠商 Client (Fidelis, TrendMicro, _template) 共用。
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Hashable, Optional, Tuple
+
+DEFAULT_TOKEN_TTL = 3600
+DEFAULT_REFRESH_MARGIN = 300
+
+logger = logging.getLogger(__name__)
+
+# login_func 回傳 (token, 有效秒數)；有效秒數為 None 代表使用 default_ttl，
+# 若 default_ttl 也為 None 則視為永不過期 (例如靜態 API Key)
+LoginFunc = Callable[[], Tuple[str, Optional[float]]]
+
+# 憑證 Key -> 共用的 TokenManager；最後一個使用中的 Client 釋放後自動移除
+_shared_managers: "weakref.WeakValueDictionary[Hashable, TokenManager]" = weakref.WeakValueDictionary()
+_shared_lock = threading.Lock()
+
+
+class TokenManager:
+    """
+    執行緒安全的 Token 管理器。
+
+    - get_token(): 取得有效 Token，必要時同步更新 (並發呼叫只會觸發一次登入)
+    - invalidate(token): 回報 Token 已失效 (例如收到 401)
+    - 背景計時器會在到期前 refresh_margin 秒自動更新
+    - refreshable 為 False (靜態 API Key) 時重新登入只會取回同一把 Key，收到 401 不應重送
+    """
+
+    def __init__(self, login_func: LoginFunc, default_ttl: Optional[float] = DEFAULT_TOKEN_TTL,
+                 refresh_margin: float = DEFAULT_REFRESH_MARGIN, auto_refresh: bool = True,
+                 refreshable: bool = True):
+        self._login_func = login_func
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.auto_refresh = auto_refresh
+        self.refreshable = refreshable
+
+        self._token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    @classmethod
+    def for_static_key(cls, api_key: str) -> "TokenManager":
+        """靜態 API Key：永不過期、無背景更新，401 時不重送"""
+        return cls(lambda: (api_key, None), default_ttl=None, auto_refresh=False, refreshable=False)
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token
+
+    def _is_valid(self) -> bool:
+        if self._token is None:
+            return False
+        if self._expires_at is None:
+            return True
+        return time.monotonic() < self._expires_at
+
+    def get_token(self) -> str:
+        """取得有效 Token；過期或不存在時進行登入。"""
+        if self._is_valid():
+            return self._token
+
+        with self._lock:
+            # Double-check：等待鎖的期間可能已有其他執行緒完成更新
+            if self._is_valid():
+                return self._token
+            return self._refresh_locked()
+
+    def refresh(self) -> str:
+        """強制重新登入並回傳新 Token。"""
+        with self._lock:
+            return self._refresh_locked()
+
+    def invalidate(self, stale_token: Optional[str] = None):
+        """
+        標記 Token 失效。
+
+        Args:
+            stale_token: 呼叫端使用過的 Token；若目前 Token 已被其他執行緒更新則忽略，
+                         避免多個同時收到 401 的請求各自重新登入
+        """
+        with self._lock:
+            if stale_token is None or stale_token == self._token:
+                self._token = None
+                self._expires_at = None
+
+    def close(self):
+        """停止背景更新計時器。"""
+        with self._lock:
+            self._closed = True
+            self._cancel_timer()
+
+    def _refresh_locked(self) -> str:
+        token, ttl = self._login_func()
+        if ttl is None:
+            ttl = self.default_ttl
+
+        self._token = token
+        self._expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._schedule_refresh(ttl)
+        return token
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_refresh(self, ttl: Optional[float]):
+        self._cancel_timer()
+        if not self.auto_refresh or self._closed or ttl is None:
+            return
+
+        delay = max(ttl - self.refresh_margin, 1)
+        # 計時器只持有弱參照，Client 被回收後背景更新即自動停止
+        self._timer = threading.Timer(delay, TokenManager._background_refresh, args=(weakref.ref(self),))
+        self._timer.daemon = True
+        self._timer.start()
+
+    @staticmethod
+    def _background_refresh(manager_ref: "weakref.ref[TokenManager]"):
+        manager = manager_ref()
+        if manager is None or manager._closed:
+            return
+        try:
+            manager.refresh()
+        except Exception as e:
+            # 背景更新失敗時保留舊 Token，到期後由 get_token() 同步重試
+            logger.warning(f"背景更新 Token 失敗: {str(e)}")
+
+
+def get_shared_token_manager(login_func: Callable[..., Tuple[str, Optional[float]]], *login_args: Hashable,
+                             default_ttl: Optional[float] = DEFAULT_TOKEN_TTL,
+                             refresh_margin: float = DEFAULT_REFRESH_MARGIN) -> TokenManager:
+    """
+    取得指定憑證的共用 TokenManager，不存在時建立；管理器以 login_func(*login_args) 登入。
+
+    同一組憑證的多個 Client (例如每個租戶各一個 Adapter) 共用同一個 Token 與背景計時器，
+    不會各自登入、各自排程更新。共用 Key 為 (login_func, login_args, default_ttl, refresh_margin)，
+    因此 login_args 必須包含完整的憑證識別 (例如 server_url, username, password)。
+
+    Args:
+        login_func: 不綁定 Client 實例的登入函式 (模組函式或 staticmethod)，回傳 (token, 有效秒數)；
+                    綁定方法會讓共用管理器持有第一個 Client，並以它的憑證替後續的 Client 登入
+        login_args: 傳給 login_func 的參數 (需可雜湊)
+    """
+    if inspect.ismethod(login_func):
+        raise ValueError("login_func 不可為綁定方法，請改用 staticmethod 並以 login_args 傳入憑證")
+    key = (login_func, login_args, default_ttl, refresh_margin)
+    with _shared_lock:
+        manager = _shared_managers.get(key)
+        if manager is None:
+            manager = TokenManager(functools.partial(login_func, *login_args), default_ttl=default_ttl,
+                                   refresh_margin=refresh_margin)
+            _shared_managers[key] = manager
+        return manager
+
+
+class AsyncTokenManager:
+    """
+    asyncio 版本的 Token 管理器 (供 httpx 非同步 Client 使用)。
+
+    - 進入到期前 refresh_margin 秒的區間時，於背景 Task 更新並先回傳舊 Token
+    - 已過期時由第一個呼叫端登入，其餘協程等待同一次更新結果
+    """
+
+    def __init__(self, login_func: Callable[[], Awaitable[Tuple[str, Optional[float]]]],
+                 default_ttl: Optional[float] = DEFAULT_TOKEN_TTL, refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 refreshable: bool = True):
+        self._login_func = login_func
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.refreshable = refreshable
+
+        self._token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_static_key(cls, api_key: str) -> "AsyncTokenManager":
+        """靜態 API Key：永不過期，401 時不重送"""
+        async def login():
+            return api_key, None
+        return cls(login, default_ttl=None, refreshable=False)
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token
+
+    def _remaining(self) -> Optional[float]:
+        if self._expires_at is None:
+            return None
+        return self._expires_at - time.monotonic()
+
+    async def get_token(self) -> str:
+        if self._token is not None:
+            remaining = self._remaining()
+            if remaining is None:
+                return self._token
+            if remaining > 0:
+                if remaining < self.refresh_margin and self._refresh_task is None:
+                    self._refresh_task = asyncio.ensure_future(self._background_refresh())
+                return self._token
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            remaining = self._remaining()
+            if self._token is not None and (remaining is None or remaining > 0):
+                return self._token
+            return await self._refresh_locked()
+
+    async def refresh(self) -> str:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await self._refresh_locked()
+
+    def invalidate(self, stale_token: Optional[str] = None):
+        if stale_token is None or stale_token == self._token:
+            self._token = None
+            self._expires_at = None
+
+    async def _refresh_locked(self) -> str:
+        token, ttl = await self._login_func()
+        if ttl is None:
+            ttl = self.default_ttl
+        self._token = token
+        self._expires_at = time.monotonic() + ttl if ttl is not None else None
+        return token
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"背景更新 Token 失敗: {str(e)}")
+        finally:
+            self._refresh_task = None
@@ -7,11 +7,15 @@ This module exports the main classes for the Fidelis integration.
 from .client import FidelisEndpointClient
 from .adapter import FidelisAdapter
 from .mapper import FidelisMapper
+from .async_client import AsyncFidelisEndpointClient
+from .async_adapter import AsyncFidelisAdapter
 
 __all__ = [
     'FidelisEndpointClient',
     'FidelisAdapter',
-    'FidelisMapper'
+    'FidelisMapper',
+    'AsyncFidelisEndpointClient',
+    'AsyncFidelisAdapter'
 ]
 
 __version__ = '1.0.0'
@@ -1,12 +1,18 @@
 import json
 import time
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import logging
+from typing import List, Dict, Any, Optional, Iterator, Set
+from datetime import datetime, timedelta
 from ...core.base_adapter import BaseAdapter
 from ...core.schemas import MDRAlert, Severity, MDREntity, EntityType, MDRToolResult, MDRProcess
 from ...core.cleaner import DataCleaner
 from .client import FidelisEndpointClient
 
+logger = logging.getLogger(__name__)
+
+# 沒有高水位 (首次輪詢) 時往回擷取的秒數，避免第一次輪詢就拉回整個告警歷史
+DEFAULT_INITIAL_LOOKBACK = 86400
+
 class FidelisAdapter(BaseAdapter):
     def __init__(self, tenant_id: str, config: Dict[str, Any]):
         super().__init__(tenant_id, config)
@@ -15,8 +21,15 @@ class FidelisAdapter(BaseAdapter):
             username=config["username"],
             password=config["password"],
             verify=config.get("verify", False),
-            proxy=config.get("proxy")
+            proxy=config.get("proxy"),
+            pool_size=config.get("pool_size", 10),
+            max_retries=config.get("max_retries", 3),
+            token_ttl=config.get("token_ttl", 3600)
         )
+        self.initial_lookback: Optional[float] = config.get("initial_lookback", DEFAULT_INITIAL_LOOKBACK)
+        # 告警擷取的高水位 (最後一筆已處理告警的 createDate)，以及同一時間點已處理的告警 ID
+        self.high_water_mark: Optional[str] = None
+        self._boundary_ids: Set[str] = set()
 
     def _map_severity(self, vendor_severity: int) -> Severity:
         mapping = {
@@ -51,6 +64,10 @@ class FidelisAdapter(BaseAdapter):
             limit=100
         )
         
+        return self._parse_process_events(raw_response)
+
+    @staticmethod
+    def _parse_process_events(raw_response: Dict[str, Any]) -> List[MDRProcess]:
         # 這裡體現「清洗層」：過濾掉非必要的事件資料
         events = raw_response.get("data", [])
         
@@ -141,7 +158,7 @@ class FidelisAdapter(BaseAdapter):
 
     def get_host_details(self, hostname: str) -> Dict[str, Any]:
         response = self.client.get_host_info(host_name=hostname)
-        return response.get("data", {}).get("entities", [{}])[0]
+        return self.project_for_ai(response.get("data", {}).get("entities", [{}])[0], "host")
 
     def list_alerts(self, limit: int = 10, start_date: str = None) -> List[MDRAlert]:
         raw_response = self.client.list_alerts(limit=limit, start_date=start_date)
@@ -160,6 +177,65 @@ class FidelisAdapter(BaseAdapter):
             try:
                 alert = self.normalize_alert(raw)
                 alerts.append(alert)
-            except Exception:
+            except Exception as e:
+                logger.warning(f"告警 {raw.get('id')} 正規化失敗，已略過: {str(e)}")
                 continue
         return alerts
+
+    def iter_alerts(self, since: Optional[str] = None, page_size: int = 100,
+                    initial_lookback: Optional[float] = None) -> Iterator[MDRAlert]:
+        """
+        以串流方式逐頁擷取並標準化告警，記憶體用量與告警總數無關。
+
+        Args:
+            since: 起始時間 (Fidelis startDate 格式)；未提供時從 high_water_mark 接續
+            page_size: 每頁筆數
+            initial_lookback: 尚無高水位時往回擷取的秒數 (預設為 config 的 initial_lookback，
+                              None 表示擷取全部歷史)
+
+        Yields:
+            經 transform_alert 處理後的 MDRAlert (依 createDate 遞增)
+        """
+        if since is None:
+            since = self.high_water_mark
+        if since is None:
+            lookback = self.initial_lookback if initial_lookback is None else initial_lookback
+            if lookback is not None:
+                since = (datetime.utcnow() - timedelta(seconds=lookback)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        # startDate 為包含邊界，需略過上一輪在同一時間點已處理過的告警
+        skip_ids = set(self._boundary_ids) if since is not None and since == self.high_water_mark else set()
+
+        for page in self.client.iter_alert_pages(page_size=page_size, start_date=since):
+            for raw in page:
+                alert_id = str(raw.get("id"))
+                created = raw.get("createDate")
+                if created == since and alert_id in skip_ids:
+                    continue
+
+                # 無論轉換成功與否皆推進高水位，避免同一筆壞資料被反覆擷取
+                self._advance_cursor(created, alert_id)
+                try:
+                    alert = self.transform_alert(raw)
+                except Exception as e:
+                    logger.warning(f"告警 {alert_id} 標準化失敗，已略過: {str(e)}")
+                    continue
+                yield alert
+
+    @property
+    def alert_cursor(self) -> Dict[str, Any]:
+        """目前的擷取進度，可序列化後保存以於重啟時接續。"""
+        return {"last_check_time": self.high_water_mark, "boundary_ids": sorted(self._boundary_ids)}
+
+    @alert_cursor.setter
+    def alert_cursor(self, cursor: Dict[str, Any]):
+        self.high_water_mark = cursor.get("last_check_time")
+        self._boundary_ids = set(cursor.get("boundary_ids") or [])
+
+    def _advance_cursor(self, created: Optional[str], alert_id: str):
+        if not created:
+            return
+        if self.high_water_mark is None or created > self.high_water_mark:
+            self.high_water_mark = created
+            self._boundary_ids = {alert_id}
+        elif created == self.high_water_mark:
+            self._boundary_ids.add(alert_id)
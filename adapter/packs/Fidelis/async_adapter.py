@@ -0,0 +1,101 @@
+import time
+from typing import List, Dict, Any
+from ...core.async_base_adapter import AsyncBaseAdapter
+from ...core.schemas import MDRAlert, MDRToolResult, MDRProcess
+from .async_client import AsyncFidelisEndpointClient
+from .adapter import FidelisAdapter
+from .mapper import FidelisMapper
+
+class AsyncFidelisAdapter(AsyncBaseAdapter):
+    """
+    Fidelis 非同步轉接器，行為與 FidelisAdapter 相同。
+    同步呼叫端可透過 SyncAdapterShim 包裝使用。
+    """
+    def __init__(self, tenant_id: str, config: Dict[str, Any]):
+        super().__init__(tenant_id, config)
+        self.client = AsyncFidelisEndpointClient(
+            server_url=config["server_url"],
+            username=config["username"],
+            password=config["password"],
+            verify=config.get("verify", False),
+            proxy=config.get("proxy"),
+            pool_size=config.get("pool_size", 10),
+            max_retries=config.get("max_retries", 3),
+            token_ttl=config.get("token_ttl", 3600)
+        )
+
+    def normalize_alert(self, raw_data: Dict[str, Any]) -> MDRAlert:
+        return FidelisMapper(self.tenant_id).map(raw_data)
+
+    def transform_alert(self, raw_data: Dict[str, Any], event_type: str = None) -> MDRAlert:
+        if event_type is None:
+            event_type = FidelisMapper(self.tenant_id).get_event_type(raw_data)
+        return super().transform_alert(raw_data, event_type=event_type)
+
+    async def list_processes(self, hostname: str) -> List[MDRProcess]:
+        raw_response = await self.client.query_events(
+            entity_type="Process",
+            column="EndpointName",
+            operator="=",
+            value=hostname,
+            limit=100
+        )
+        return FidelisAdapter._parse_process_events(raw_response)
+
+    async def _resolve_ip(self, hostname: str):
+        host_info = await self.client.get_host_info(host_name=hostname)
+        entities = host_info.get("data", {}).get("entities", [])
+        if not entities:
+            return None, f"Host '{hostname}' not found"
+        ip = entities[0].get("ipAddress")
+        if not ip:
+            return None, f"Could not find IP for host '{hostname}'"
+        return ip, None
+
+    async def isolate_host(self, hostname: str) -> MDRToolResult:
+        start_time = time.time()
+        try:
+            script_id = self.config.get("fidelis_isolate_script_id")
+            if not script_id:
+                return MDRToolResult(status="error", data=None, message="Missing 'fidelis_isolate_script_id' in config", execution_time=time.time() - start_time)
+
+            ip, error = await self._resolve_ip(hostname)
+            if error:
+                return MDRToolResult(status="error", data=None, message=error, execution_time=time.time() - start_time)
+
+            job_id = await self.client.execute_script(script_id=script_id, endpoint_ip=ip)
+
+            return MDRToolResult(
+                status="success",
+                data={"hostname": hostname, "ip": ip, "job_id": job_id},
+                message=f"Isolation job '{job_id}' triggered for {hostname}",
+                execution_time=time.time() - start_time
+            )
+        except Exception as e:
+            return MDRToolResult(status="error", data=None, message=str(e), execution_time=time.time() - start_time)
+
+    async def terminate_process(self, hostname: str, pid: int) -> MDRToolResult:
+        start_time = time.time()
+        try:
+            script_id = self.config.get("fidelis_terminate_process_script_id")
+            if not script_id:
+                return MDRToolResult(status="error", data=None, message="Missing 'fidelis_terminate_process_script_id' in config", execution_time=time.time() - start_time)
+
+            ip, error = await self._resolve_ip(hostname)
+            if error:
+                return MDRToolResult(status="error", data=None, message=error, execution_time=time.time() - start_time)
+
+            job_id = await self.client.execute_script(script_id=script_id, endpoint_ip=ip, answer=str(pid))
+
+            return MDRToolResult(
+                status="success",
+                data={"pid": pid, "hostname": hostname, "job_id": job_id},
+                message=f"Termination job '{job_id}' triggered for PID {pid} on {hostname}",
+                execution_time=time.time() - start_time
+            )
+        except Exception as e:
+            return MDRToolResult(status="error", data=None, message=str(e), execution_time=time.time() - start_time)
+
+    async def get_host_details(self, hostname: str) -> Dict[str, Any]:
+        response = await self.client.get_host_info(host_name=hostname)
+        return self.project_for_ai(response.get("data", {}).get("entities", [{}])[0], "host")
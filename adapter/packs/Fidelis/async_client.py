@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, Any, Optional, Tuple
+from ...core.http_session import DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES
+from ...core.token_manager import AsyncTokenManager, DEFAULT_TOKEN_TTL
+from .client import FidelisEndpointClient
+
+class AsyncFidelisEndpointClient:
+    """
+    Fidelis Endpoint API 非同步客戶端 (httpx)。
+    API 行為與 FidelisEndpointClient 相同，請求內容建構邏輯共用同步版本。
+    """
+
+    def __init__(self, server_url: str, username: str, password: str, verify: bool = False, proxy: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 token_ttl: float = DEFAULT_TOKEN_TTL):
+        import httpx
+
+        self.server_url = server_url.rstrip('/')
+        if not self.server_url.endswith('/Endpoint/api'):
+            self.server_url += '/Endpoint/api'
+
+        self.username = username
+        self.password = password
+        # httpx 的 retries 僅處理連線建立失敗，不會重送已送出的請求
+        transport = httpx.AsyncHTTPTransport(
+            verify=verify,
+            proxy=proxy,
+            retries=max_retries,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self.client = httpx.AsyncClient(transport=transport, timeout=30)
+        self.token_manager = AsyncTokenManager(self._authenticate, default_ttl=token_ttl)
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.token_manager.token
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _http_request(self, method: str, url_suffix: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None, resp_type: str = "json") -> Any:
+        import httpx
+
+        url = self.server_url + url_suffix
+
+        try:
+            token = await self.token_manager.get_token()
+            response = await self._send(method, url, token, params, json_data)
+            if response.status_code == 401 and self.token_manager.refreshable:
+                self.logger.info(f"收到 401，更新 Token 後重送: {method} {url}")
+                self.token_manager.invalidate(token)
+                token = await self.token_manager.get_token()
+                response = await self._send(method, url, token, params, json_data)
+            response.raise_for_status()
+            if resp_type == "json":
+                return response.json()
+            else:
+                return response.content
+        except httpx.HTTPError as e:
+            self.logger.error(f"API 請求失敗: {method} {url}, 錯誤: {str(e)}")
+            raise e
+
+    async def _send(self, method: str, url: str, token: str, params: Optional[Dict], json_data: Optional[Dict]):
+        return await self.client.request(
+            method,
+            url,
+            headers=FidelisEndpointClient._auth_headers(token),
+            params=params,
+            json=json_data
+        )
+
+    async def _authenticate(self) -> Tuple[str, Optional[float]]:
+        params = {"username": self.username, "password": self.password}
+        response = await self.client.get(
+            f"{self.server_url}/authenticate",
+            params=params,
+            headers={"Accept": "application/json"},
+            timeout=10
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("success"):
+            raise Exception(f"登入失敗: {data.get('error', '未知錯誤')}")
+        return data.get("data", {}).get("token"), None
+
+    async def login(self) -> str:
+        return await self.token_manager.refresh()
+
+    async def list_alerts(self, limit: int = 50, sort: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, skip: int = 0) -> Dict:
+        params = FidelisEndpointClient._build_alerts_params(limit, sort, start_date, end_date, skip)
+        return await self._http_request("GET", "/alerts/getalertsV2", params=params)
+
+    async def get_host_info(self, host_name: Optional[str] = None, ip_address: Optional[str] = None) -> Dict:
+        params = FidelisEndpointClient._build_host_search_params(host_name, ip_address)
+        return await self._http_request("GET", "/endpoints/v2/0/100/hostname Ascending", params=params)
+
+    async def execute_script(self, script_id: str, endpoint_ip: str, answer: str = "", timeout: Optional[int] = None) -> str:
+        body = FidelisEndpointClient._build_script_body(script_id, endpoint_ip, answer, timeout)
+        response = await self._http_request("POST", "/jobs/createTask", json_data=body)
+        return response.get("data") # 回傳 Job ID
+
+    async def query_events(self, entity_type: str, column: str, value: str, operator: str = "=", logic: str = "AND", limit: int = 500) -> Dict:
+        body = FidelisEndpointClient._build_events_body(entity_type, column, value, operator, logic)
+        return await self._http_request("POST", "/v2/events", params={"pageSize": limit}, json_data=body)
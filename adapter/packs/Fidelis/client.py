@@ -2,7 +2,9 @@ import requests
 import json
 import logging
 import urllib3
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+from ...core.http_session import get_shared_session, DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES
+from ...core.token_manager import DEFAULT_TOKEN_TTL, get_shared_token_manager
 
 # 關閉自簽憑證產生的警告資訊
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -12,7 +14,9 @@ class FidelisEndpointClient:
     Fidelis Endpoint API 獨立客戶端。
     """
     
-    def __init__(self, server_url: str, username: str, password: str, verify: bool = False, proxy: Optional[str] = None):
+    def __init__(self, server_url: str, username: str, password: str, verify: bool = False, proxy: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 token_ttl: float = DEFAULT_TOKEN_TTL):
         self.server_url = server_url.rstrip('/')
         if not self.server_url.endswith('/Endpoint/api'):
             self.server_url += '/Endpoint/api'
@@ -21,28 +25,42 @@ class FidelisEndpointClient:
         self.password = password
         self.verify = verify
         self.proxies = {"http": proxy, "https": proxy} if proxy else None
-        self.token = None
-        self.headers = {}
+        # 同一 server_url 的所有實例共用連線池，避免每次請求重新進行 TCP/TLS 握手
+        self.session = get_shared_session(self.server_url, pool_size=pool_size, max_retries=max_retries)
+        # Token 到期前自動更新，並發登入合併為一次；同一組憑證的所有實例共用 Token 與背景計時器
+        self.token_manager = get_shared_token_manager(FidelisEndpointClient._login, self.session, self.server_url,
+                                                      username, password, verify, proxy, default_ttl=token_ttl)
         
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def token(self) -> Optional[str]:
+        return self.token_manager.token
+
+    @staticmethod
+    def _auth_headers(token: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self._auth_headers(self.token) if self.token else {}
+
     def _http_request(self, method: str, url_suffix: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None, resp_type: str = "json") -> Any:
-        if not self.token and url_suffix != "/authenticate":
-            self.login()
-            
         url = self.server_url + url_suffix
         
         try:
-            response = requests.request(
-                method,
-                url,
-                headers=self.headers,
-                params=params,
-                json=json_data,
-                verify=self.verify,
-                proxies=self.proxies,
-                timeout=30
-            )
+            token = self.token_manager.get_token()
+            response = self._send(method, url, token, params, json_data)
+            if response.status_code == 401 and self.token_manager.refreshable:
+                # Token 已被伺服器撤銷或提前過期：更新後重送一次
+                self.logger.info(f"收到 401，更新 Token 後重送: {method} {url}")
+                self.token_manager.invalidate(token)
+                token = self.token_manager.get_token()
+                response = self._send(method, url, token, params, json_data)
             response.raise_for_status()
             if resp_type == "json":
                 return response.json()
@@ -52,28 +70,41 @@ class FidelisEndpointClient:
             self.logger.error(f"API 請求失敗: {method} {url}, 錯誤: {str(e)}")
             raise e
 
-    def login(self) -> str:
-        params = {"username": self.username, "password": self.password}
-        temp_headers = {"Accept": "application/json"}
-        response = requests.get(
-            f"{self.server_url}/authenticate",
+    def _send(self, method: str, url: str, token: str, params: Optional[Dict], json_data: Optional[Dict]) -> requests.Response:
+        return self.session.request(
+            method,
+            url,
+            headers=self._auth_headers(token),
             params=params,
+            json=json_data,
             verify=self.verify,
-            headers=temp_headers,
             proxies=self.proxies,
+            timeout=30
+        )
+
+    @staticmethod
+    def _login(session: requests.Session, server_url: str, username: str, password: str, verify: bool,
+               proxy: Optional[str]) -> Tuple[str, Optional[float]]:
+        # 共用 TokenManager 的登入函式：不持有 Client 實例，憑證皆由參數傳入
+        params = {"username": username, "password": password}
+        temp_headers = {"Accept": "application/json"}
+        response = session.get(
+            f"{server_url}/authenticate",
+            params=params,
+            verify=verify,
+            headers=temp_headers,
+            proxies={"http": proxy, "https": proxy} if proxy else None,
             timeout=10
         )
         response.raise_for_status()
         data = response.json()
         if not data.get("success"):
             raise Exception(f"登入失敗: {data.get('error', '未知錯誤')}")
-        self.token = data.get("data", {}).get("token")
-        self.headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
-        return self.token
+        # Fidelis 不回傳有效期限，使用 token_ttl 設定值
+        return data.get("data", {}).get("token"), None
+
+    def login(self) -> str:
+        return self.token_manager.refresh()
 
     def test_module(self) -> str:
         try:
@@ -82,22 +113,64 @@ class FidelisEndpointClient:
         except Exception as e:
             return f"測試失敗: {str(e)}"
 
-    def list_alerts(self, limit: int = 50, sort: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+    def list_alerts(self, limit: int = 50, sort: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, skip: int = 0) -> Dict:
         url_suffix = "/alerts/getalertsV2"
+        params = self._build_alerts_params(limit, sort, start_date, end_date, skip)
+        return self._http_request("GET", url_suffix, params=params)
+
+    def iter_alert_pages(self, page_size: int = 100, sort: Optional[str] = "createDate Ascending", start_date: Optional[str] = None, end_date: Optional[str] = None) -> Iterator[List[Dict]]:
+        """
+        逐頁取得告警 (Lazy)，每次只向 API 要求一頁，直到回傳筆數少於 page_size。
+        """
+        skip = 0
+        while True:
+            response = self.list_alerts(limit=page_size, sort=sort, start_date=start_date, end_date=end_date, skip=skip)
+            entities = ((response or {}).get("data") or {}).get("entities") or []
+            if entities:
+                yield entities
+            if len(entities) < page_size:
+                return
+            skip += len(entities)
+
+    def get_host_info(self, host_name: Optional[str] = None, ip_address: Optional[str] = None) -> Dict:
+        url_suffix = "/endpoints/v2/0/100/hostname Ascending"
+        params = self._build_host_search_params(host_name, ip_address)
+        return self._http_request("GET", url_suffix, params=params)
+
+    def execute_script(self, script_id: str, endpoint_ip: str, answer: str = "", timeout: Optional[int] = None) -> str:
+        """
+        在指定端點執行腳本
+        """
+        url_suffix = "/jobs/createTask"
+        body = self._build_script_body(script_id, endpoint_ip, answer, timeout)
+        response = self._http_request("POST", url_suffix, json_data=body)
+        return response.get("data") # 回傳 Job ID
+
+    def query_events(self, entity_type: str, column: str, value: str, operator: str = "=", logic: str = "AND", limit: int = 500) -> Dict:
+        url_suffix = "/v2/events"
+        params = {"pageSize": limit}
+        body = self._build_events_body(entity_type, column, value, operator, logic)
+        return self._http_request("POST", url_suffix, params=params, json_data=body)
+
+    # ===== 請求內容建構 (同步與非同步 Client 共用) =====
+
+    @staticmethod
+    def _build_alerts_params(limit: int, sort: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, skip: int = 0) -> Dict:
         params = {"take": limit}
+        if skip: params["skip"] = skip
         if sort: params["sort"] = sort
         if start_date: params["startDate"] = start_date
         if end_date: params["endDate"] = end_date
-        return self._http_request("GET", url_suffix, params=params)
+        return params
 
-    def get_host_info(self, host_name: Optional[str] = None, ip_address: Optional[str] = None) -> Dict:
-        url_suffix = "/endpoints/v2/0/100/hostname Ascending"
+    @staticmethod
+    def _build_host_search_params(host_name: Optional[str] = None, ip_address: Optional[str] = None) -> Dict:
         field_name = "HostName" if host_name else "IpAddress"
         value = host_name or ip_address
         if not value:
             raise ValueError("必須提供 host_name 或 ip_address")
 
-        params = {
+        return {
             "accessType": "3",
             "search": json.dumps({
                 "searchFields": [{
@@ -106,14 +179,10 @@ class FidelisEndpointClient:
                 }]
             }),
         }
-        return self._http_request("GET", url_suffix, params=params)
 
-    def execute_script(self, script_id: str, endpoint_ip: str, answer: str = "", timeout: Optional[int] = None) -> str:
-        """
-        在指定端點執行腳本
-        """
-        url_suffix = "/jobs/createTask"
-        body = {
+    @staticmethod
+    def _build_script_body(script_id: str, endpoint_ip: str, answer: str = "", timeout: Optional[int] = None) -> Dict:
+        return {
             "timeoutInSeconds": timeout,
             "packageId": script_id,
             "endpoints": endpoint_ip,
@@ -128,13 +197,9 @@ class FidelisEndpointClient:
             ],
         }
 
-        response = self._http_request("POST", url_suffix, json_data=body)
-        return response.get("data") # 回傳 Job ID
-
-    def query_events(self, entity_type: str, column: str, value: str, operator: str = "=", logic: str = "AND", limit: int = 500) -> Dict:
-        url_suffix = "/v2/events"
-        params = {"pageSize": limit}
-        body = {
+    @staticmethod
+    def _build_events_body(entity_type: str, column: str, value: str, operator: str = "=", logic: str = "AND") -> Dict:
+        return {
             "criteriaV3": {
                 "entityType": entity_type,
                 "filter": {
@@ -144,4 +209,3 @@ class FidelisEndpointClient:
                 },
             },
         }
-        return self._http_request("POST", url_suffix, params=params, json_data=body)
@@ -2,11 +2,11 @@
 TrendMicro Pack - Main Entry Point
 """
 
-from .client import TrendMicroClient
+from .client import TrendMicroVisionOneClient
 from .adapter import TrendMicroAdapter
 
 __all__ = [
-    'TrendMicroClient',
+    'TrendMicroVisionOneClient',
     'TrendMicroAdapter'
 ]
 
@@ -2,10 +2,10 @@ import json
 import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from ..core.base_adapter import BaseAdapter
-from ..core.schemas import MDRAlert, Severity, MDREntity, EntityType, MDRToolResult, MDRProcess
-from ..core.cleaner import DataCleaner
-from .trendmicro_client import TrendMicroVisionOneClient
+from ...core.base_adapter import BaseAdapter
+from ...core.schemas import MDRAlert, Severity, MDREntity, EntityType, MDRToolResult, MDRProcess
+from ...core.cleaner import DataCleaner
+from .client import TrendMicroVisionOneClient
 
 class TrendMicroAdapter(BaseAdapter):
     """
@@ -132,4 +132,4 @@ class TrendMicroAdapter(BaseAdapter):
 
     def get_host_details(self, hostname: str) -> Dict[str, Any]:
         search_res = self.client.search_endpoints(f"endpointName eq '{hostname}'")
-        return search_res.get("items", [{}])[0]
+        return self.project_for_ai(search_res.get("items", [{}])[0], "host")
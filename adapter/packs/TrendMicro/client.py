@@ -1,6 +1,9 @@
 import requests
 import json
+import logging
 from typing import Dict, Any, List, Optional
+from ...core.http_session import get_shared_session
+from ...core.token_manager import TokenManager
 
 class TrendMicroVisionOneClient:
     """
@@ -9,11 +12,41 @@ class TrendMicroVisionOneClient:
     """
     def __init__(self, api_url: str, api_key: str, verify: bool = True):
         self.api_url = api_url.rstrip('/')
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
+        self.verify = verify
+        self.session = get_shared_session(self.api_url)
+        # Vision One 使用靜態 API Key (無到期時間、無法更新)，收到 401 直接回報錯誤
+        self.token_manager = TokenManager.for_static_key(api_key)
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token_manager.get_token()}",
             "Content-Type": "application/json"
         }
-        self.verify = verify
+
+    def _http_request(self, method: str, url_suffix: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict[str, Any]:
+        url = self.api_url + url_suffix
+        token = self.token_manager.get_token()
+        response = self._send(method, url, token, params, json_data)
+        if response.status_code == 401 and self.token_manager.refreshable:
+            self.logger.info(f"收到 401，更新 Token 後重送: {method} {url}")
+            self.token_manager.invalidate(token)
+            token = self.token_manager.get_token()
+            response = self._send(method, url, token, params, json_data)
+        response.raise_for_status()
+        return response.json()
+
+    def _send(self, method: str, url: str, token: str, params: Optional[Dict], json_data: Optional[Dict]) -> requests.Response:
+        return self.session.request(
+            method,
+            url,
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            params=params,
+            json=json_data,
+            verify=self.verify,
+            timeout=30
+        )
 
     def get_alert_details(self, alert_id: str) -> Dict[str, Any]:
         """獲取原始告警詳情 (Mock)"""
@@ -19,7 +19,8 @@ class VendorNameAdapter(BaseAdapter):
         self.client = VendorClient(
             server_url=config['server_url'],
             api_key=config['api_key'],
-            verify=config.get('verify', True)
+            verify=config.get('verify', True),
+            static_key=config.get('static_key', False)
         )
     
     def normalize_alert(self, raw_data: Dict[str, Any]) -> MDRAlert:
@@ -5,32 +5,63 @@ Implement your vendor's API client here.
 """
 
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from ...core.http_session import get_shared_session
+from ...core.token_manager import DEFAULT_TOKEN_TTL, TokenManager, get_shared_token_manager
 
 class VendorClient:
     """
     API Client for [Vendor Name]
     """
     
-    def __init__(self, server_url: str, api_key: str, verify: bool = True):
+    def __init__(self, server_url: str, api_key: str, verify: bool = True, static_key: bool = False):
         self.server_url = server_url.rstrip('/')
         self.api_key = api_key
         self.verify = verify
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        })
+        # Shared keep-alive connection pool per server_url
+        self.session = get_shared_session(self.server_url)
+        if static_key:
+            # The API key itself is the bearer token: it never expires and a 401 is not replayed
+            self.token_manager = TokenManager.for_static_key(api_key)
+        else:
+            # The API key is exchanged for short-lived access tokens, refreshed before expiry.
+            # Clients with the same credentials share one manager; pass the credentials as login args
+            # (never a bound method, which would pin this client and reuse its credentials for others)
+            self.token_manager = get_shared_token_manager(VendorClient._login, self.session, self.server_url,
+                                                          api_key, verify)
+    
+    @staticmethod
+    def _login(session: requests.Session, server_url: str, api_key: str, verify: bool) -> Tuple[str, Optional[float]]:
+        """
+        Exchange the API key for an access token; returns (token, ttl_seconds)
+        """
+        # TODO: Replace with the vendor's token endpoint
+        response = session.post(f"{server_url}/api/auth/token", json={'api_key': api_key}, verify=verify, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        return data['access_token'], data.get('expires_in', DEFAULT_TOKEN_TTL)
     
     def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """
-        Internal request wrapper
+        Internal request wrapper (replays once with a fresh token on 401 when the token can be refreshed)
         """
         url = f"{self.server_url}{endpoint}"
-        response = self.session.request(method, url, verify=self.verify, **kwargs)
+        token = self.token_manager.get_token()
+        response = self._send(method, url, token, **kwargs)
+        if response.status_code == 401 and self.token_manager.refreshable:
+            self.token_manager.invalidate(token)
+            token = self.token_manager.get_token()
+            response = self._send(method, url, token, **kwargs)
         response.raise_for_status()
         return response.json()
     
+    def _send(self, method: str, url: str, token: str, **kwargs) -> requests.Response:
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+        return self.session.request(method, url, headers=headers, verify=self.verify, **kwargs)
+    
     def list_alerts(self, limit: int = 50) -> Dict[str, Any]:
         """
         Fetch alerts from the vendor API
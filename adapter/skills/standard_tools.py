@@ -6,29 +6,32 @@ from .investigation_skills import InvestigationSkills
 def get_adapter_for_tenant(tenant_id: str, vendor: str, config: Dict[str, Any]):
     return AdapterFactory.get_adapter(vendor, tenant_id, config)
 
+def lease_adapter_for_tenant(tenant_id: str, vendor: str, config: Dict[str, Any]):
+    return AdapterFactory.lease(vendor, tenant_id, config)
+
 # --- 定義標準工具函數 ---
 
 def investigate_host(tenant_id: str, vendor: str, config: Dict[str, Any], hostname: str):
     """
     對指定主機進行深度調查，包含行程分析與環境檢查。
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    return InvestigationSkills.deep_investigate_host(adapter, hostname)
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        return InvestigationSkills.deep_investigate_host(adapter, hostname)
 
 def isolate_endpoint(tenant_id: str, vendor: str, config: Dict[str, Any], hostname: str):
     """
     隔離指定主機以防止威脅擴散。
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    return adapter.isolate_host(hostname).dict()
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        return adapter.isolate_host(hostname).dict()
 
 def list_endpoint_processes(tenant_id: str, vendor: str, config: Dict[str, Any], hostname: str):
     """
     獲取主機目前的行程列表（已清洗與標準化）。
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    processes = adapter.list_processes(hostname)
-    return [p.dict() for p in processes]
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        processes = adapter.list_processes(hostname)
+        return [p.dict() for p in processes]
 
 # --- 註冊工具到註冊表，以便 AI 讀取 Schema ---
 
@@ -0,0 +1,315 @@
+"""
+LLM Response Cache - LLM 回應快取
+
+重複出現的告警 (相同標題、實體與 raw_data) 會產生幾乎相同的對話。CachingLLM 位於 BaseLLM 之前：
+- 以正規化後的對話內容 + 工具 Schema 計算雜湊作為 Key (遮罩告警 ID、時間戳記、UUID 與 tool_call_id)
+- 快取含判定結果的最終回應，以及中間的工具呼叫回合 (Key 為當下的對話前綴)：
+  重複告警的前幾輪直接取得相同的工具呼叫，工具本身仍即時執行；
+  工具結果相同時後續回合 (直到最終結論) 也會命中，結果不同時才重新呼叫 LLM
+- 空回應與錯誤訊息不快取，避免暫時性失敗被重播
+- 記憶體 LRU + TTL，並可使用 SQLite 作為本機磁碟後端 (重啟後保留)
+- replay_verdicts=True 時，完全相同的告警 (Exact-match 指紋) 直接重播先前的調查結論，不再呼叫 LLM
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional
+
+from adapter.core.schemas import MDRAlert
+from .fast_path import extract_verdict
+from .models import BaseLLM, ChatResponse, FunctionCall, StreamEvent, ToolCall
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 6 * 3600
+DEFAULT_CACHE_ENTRIES = 10_000
+PRUNE_EVERY = 100
+MIN_MASKED_ID_LENGTH = 4
+
+# 每次告警都不同、但不影響調查內容的值
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+]
+
+
+def _mask(text: str, alert_id: Optional[str] = None) -> str:
+    # 過短的 ID (例如 "1") 直接取代會誤傷其他內容
+    if alert_id and len(alert_id) >= MIN_MASKED_ID_LENGTH:
+        text = text.replace(alert_id, "<alert_id>")
+    for pattern, placeholder in _VOLATILE_PATTERNS:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def _digest(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def conversation_key(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                     model: str = "", alert_id: Optional[str] = None) -> str:
+    """計算正規化後的對話雜湊 (tool_call_id 以出現順序取代)"""
+    call_ids: Dict[str, str] = {}
+
+    def call_id(value: str) -> str:
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    normalized = []
+    for msg in messages:
+        item = {"role": msg.get("role"), "content": _mask(msg.get("content") or "", alert_id)}
+        if msg.get("tool_calls"):
+            item["tool_calls"] = [
+                [call_id(tc["id"]), tc["function"]["name"], tc["function"]["arguments"]]
+                for tc in msg["tool_calls"]
+            ]
+        if msg.get("tool_call_id"):
+            item["tool_call_id"] = call_id(msg["tool_call_id"])
+        normalized.append(item)
+    return _digest({"model": model, "messages": normalized, "tools": tools or []})
+
+
+def alert_exact_fingerprint(alert: MDRAlert) -> str:
+    """
+    完全相同告警的指紋：除告警 ID 與時間外的所有內容 (含 entities 與 raw_data)。
+    與 ingestion 去重用的 Title + Hostname 指紋不同，只有內容完全一致時才會相同。
+    """
+    data = alert.model_dump(mode="json", exclude={"alert_id", "timestamp"})
+    raw = _mask(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str), alert.alert_id)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _dump_response(response: Any) -> str:
+    message = response.choices[0].message
+    tool_calls = [
+        {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments}
+        for tc in getattr(message, "tool_calls", None) or []
+    ]
+    return json.dumps({"content": message.content, "tool_calls": tool_calls}, ensure_ascii=False)
+
+
+def _is_cacheable(response: Any) -> bool:
+    """
+    只快取工具呼叫回合與含判定結果的最終回應：空回應、錯誤或供應商的備援訊息
+    (例如「AI 未能提供有效回應。」) 都不可重播給之後的相同告警。
+    """
+    try:
+        message = response.choices[0].message
+    except (AttributeError, IndexError, TypeError):
+        return False
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return all(getattr(tc.function, "name", None) for tc in tool_calls)
+    verdict, _ = extract_verdict(message.content)
+    return verdict is not None
+
+
+def _load_response(value: str) -> ChatResponse:
+    data = json.loads(value)
+    # 重播的工具呼叫使用新的 ID，不同調查之間不會出現相同的 tool_call_id
+    tool_calls = [ToolCall(f"call_{uuid.uuid4().hex[:24]}", FunctionCall(tc["name"], tc["arguments"]))
+                  for tc in data["tool_calls"]]
+    # 快取命中不消耗 Token，因此不帶 usage
+    return ChatResponse.build(data["content"], tool_calls)
+
+
+class ResponseCache:
+    """
+    具 TTL 與容量上限的 Key-Value 快取 (執行緒安全)，可選 SQLite 磁碟後端。
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_CACHE_TTL, max_entries: int = DEFAULT_CACHE_ENTRIES,
+                 db_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._entries[key] = entry
+
+            if entry is None or now - entry[1] >= self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            self._evict()
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)", (key, value, now)
+                )
+                self._puts += 1
+                if self._puts % PRUNE_EVERY == 0:
+                    self._prune(now)
+                self._conn.commit()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune(self, now: float):
+        """清除磁碟上過期與超出容量的項目"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key NOT IN (SELECT key FROM llm_cache ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachingLLM(BaseLLM):
+    """
+    在任一 BaseLLM 之前加上回應快取。
+
+    預設只依對話前綴快取：相同告警的工具呼叫回合可直接命中，但工具結果一旦不同 (例如行程清單變動)
+    之後的回合仍需呼叫 LLM。replay_verdicts=True 時，完全相同的告警在第一輪就重播先前的結論，
+    連工具都不再執行；適合告警內容相同即代表相同結論的環境。
+
+    使用方式：
+        llm = CachingLLM(GeminiLLM(key), ResponseCache(db_path="llm_cache.db"), replay_verdicts=True)
+        engine = MDRIntelligenceEngine(llm, system_prompt)
+    """
+
+    def __init__(self, llm: BaseLLM, cache: ResponseCache, replay_verdicts: bool = False):
+        self.llm = llm
+        self.cache = cache
+        self.replay_verdicts = replay_verdicts
+        self.model_id = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+    def for_session(self, session: Any) -> BaseLLM:
+        return _SessionCache(self, session)
+
+    def cached_chat(self, llm: BaseLLM, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]],
+                    alert_id: Optional[str] = None) -> Any:
+        key = conversation_key(messages, tools, self.model_id, alert_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _load_response(cached)
+        response = llm.chat(messages, tools=tools)
+        if _is_cacheable(response):
+            self.cache.put(key, _dump_response(response))
+        return response
+
+    def cached_chat_stream(self, llm: BaseLLM, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]],
+                           alert_id: Optional[str] = None) -> Iterator[StreamEvent]:
+        key = conversation_key(messages, tools, self.model_id, alert_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            # 以預設實作將快取回應轉為事件
+            yield from _StaticLLM(_load_response(cached)).chat_stream(messages, tools)
+            return
+        with closing(llm.chat_stream(messages, tools=tools)) as events:
+            for event in events:
+                if event.type == StreamEvent.DONE and _is_cacheable(event.response):
+                    self.cache.put(key, _dump_response(event.response))
+                yield event
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        return self.cached_chat(self.llm, messages, tools)
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        return self.cached_chat_stream(self.llm, messages, tools)
+
+
+class _StaticLLM(BaseLLM):
+    def __init__(self, response: ChatResponse):
+        self.response = response
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        return self.response
+
+
+class _SessionCache(BaseLLM):
+    """綁定單一調查的快取視圖：遮罩該告警的 ID，並處理結論重播"""
+
+    def __init__(self, owner: CachingLLM, session: Any):
+        self.owner = owner
+        self.session = session
+        self.llm = owner.llm.for_session(session)
+        self.alert_id = session.alert.alert_id
+        self.verdict_key = f"verdict:{alert_exact_fingerprint(session.alert)}" if owner.replay_verdicts else None
+
+    def _replayed_verdict(self) -> Optional[ChatResponse]:
+        # 只在調查第一輪重播，之後的迭代代表已經開始新的調查
+        if self.verdict_key is None or self.session.iterations > 1:
+            return None
+        verdict = self.owner.cache.get(self.verdict_key)
+        if verdict is None:
+            return None
+        logger.info(f"[{self.alert_id}] 重播相同告警的先前調查結論")
+        return ChatResponse.build(verdict)
+
+    def _remember_verdict(self, response: Any):
+        if self.verdict_key is not None and _is_cacheable(response):
+            self.owner.cache.put(self.verdict_key, response.choices[0].message.content)
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        replayed = self._replayed_verdict()
+        if replayed is not None:
+            return replayed
+        response = self.owner.cached_chat(self.llm, messages, tools, self.alert_id)
+        self._remember_verdict(response)
+        return response
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        replayed = self._replayed_verdict()
+        if replayed is not None:
+            yield from _StaticLLM(replayed).chat_stream(messages, tools)
+            return
+        with closing(self.owner.cached_chat_stream(self.llm, messages, tools, self.alert_id)) as events:
+            for event in events:
+                if event.type == StreamEvent.DONE:
+                    self._remember_verdict(event.response)
+                yield event
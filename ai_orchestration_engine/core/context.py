@@ -0,0 +1,163 @@
+import json
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONTEXT_TOKENS = 12000
+DEFAULT_COMPACT_THRESHOLD = 400
+DEFAULT_INVESTIGATION_BUDGET = 150000
+DEFAULT_KEEP_RECENT_TURNS = 1
+
+# 壓縮工具結果時一律保留的欄位 (識別碼與調查關鍵資訊)
+KEY_FIELD_HINTS = (
+    "id", "name", "status", "message", "error", "summary", "host", "ip",
+    "pid", "hash", "sha256", "md5", "path", "severity", "verdict", "user"
+)
+COMPACTED_PREFIX = "[compacted]"
+MAX_COMPACT_STRING = 160
+MAX_COMPACT_LIST = 5
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """若有安裝 tiktoken 則使用精確計數，否則回傳 None 改用估算"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """
+    計算文字的 Token 數。
+    未安裝 tiktoken 時以估算代替：ASCII 約 4 字元 1 Token，中文等非 ASCII 字元約 1 字 1 Token。
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    tokens = 4  # 每則訊息的角色與格式開銷
+    tokens += count_tokens(message.get("content"))
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += count_tokens(function.get("name")) + count_tokens(function.get("arguments"))
+    return tokens
+
+
+def _is_key_field(key: str) -> bool:
+    k_lower = key.lower()
+    return any(hint in k_lower for hint in KEY_FIELD_HINTS)
+
+
+def _is_table(value: Dict[str, Any]) -> bool:
+    return set(value) == {"columns", "rows"} and isinstance(value["columns"], list) and isinstance(value["rows"], list)
+
+
+def _compact_value(value: Any, depth: int = 0) -> Any:
+    if isinstance(value, str):
+        if len(value) > MAX_COMPACT_STRING:
+            return value[:MAX_COMPACT_STRING] + f"...[+{len(value) - MAX_COMPACT_STRING} chars]"
+        return value
+    if isinstance(value, dict):
+        if _is_table(value):
+            # PromptEncoder 的表格形式：欄位與每列的儲存格數需完整保留才能對應，只截斷列數與長字串
+            rows = value["rows"]
+            compacted = [
+                [_compact_value(cell, depth + 2) for cell in row] if isinstance(row, list) else _compact_value(row, depth + 1)
+                for row in rows[:MAX_COMPACT_LIST]
+            ]
+            if len(rows) > MAX_COMPACT_LIST:
+                compacted.append(f"...[+{len(rows) - MAX_COMPACT_LIST} rows]")
+            return {"columns": value["columns"], "rows": compacted}
+        if depth >= 2:
+            return f"{{{len(value)} fields}}"
+        # 巢狀結構 (例如 MDRToolResult.data) 一律保留並遞迴壓縮，只過濾非關鍵的純量欄位
+        return {
+            k: _compact_value(v, depth + 1) for k, v in value.items()
+            if _is_key_field(k) or isinstance(v, (dict, list))
+        }
+    if isinstance(value, list):
+        items = [_compact_value(v, depth + 1) for v in value[:MAX_COMPACT_LIST]]
+        if len(value) > MAX_COMPACT_LIST:
+            items.append(f"...[+{len(value) - MAX_COMPACT_LIST} items]")
+        return items
+    return value
+
+
+def compact_tool_content(content: str) -> str:
+    """
+    將工具結果壓縮為摘要：JSON 僅保留識別碼與關鍵欄位、截斷長字串與清單；非 JSON 則直接截斷。
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        data = None
+
+    if isinstance(data, (dict, list)):
+        compacted = json.dumps(_compact_value(data), ensure_ascii=False, separators=(",", ":"))
+    else:
+        compacted = _compact_value(content)
+    return f"{COMPACTED_PREFIX} {compacted}"
+
+
+class ContextWindow:
+    """
+    調查對話的 Token 預算管理。
+
+    - 單次請求超過 max_context_tokens，或舊的工具結果超過 compact_threshold 時，
+      將較舊回合的工具結果壓縮為摘要 (保留 tool_call_id 與關鍵欄位，完整內容仍保存在 session.tool_results)
+    - 整個調查累計送出的輸入 Token 超過 investigation_budget 時停止調查
+    """
+    def __init__(self, max_context_tokens: int = DEFAULT_MAX_CONTEXT_TOKENS,
+                 compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+                 investigation_budget: int = DEFAULT_INVESTIGATION_BUDGET,
+                 keep_recent_turns: int = DEFAULT_KEEP_RECENT_TURNS):
+        self.max_context_tokens = max_context_tokens
+        self.compact_threshold = compact_threshold
+        self.investigation_budget = investigation_budget
+        self.keep_recent_turns = keep_recent_turns
+
+    def fit(self, history: List[Dict[str, Any]]) -> int:
+        """
+        就地壓縮 history 中較舊的工具結果，並回傳壓縮後的 Token 數。
+        """
+        # 最近 keep_recent_turns 個 assistant 回合之後的訊息保持完整
+        assistant_indexes = [i for i, m in enumerate(history) if m.get("role") == "assistant"]
+        if self.keep_recent_turns <= 0:
+            protected_from = len(history)
+        elif len(assistant_indexes) >= self.keep_recent_turns:
+            protected_from = assistant_indexes[-self.keep_recent_turns]
+        else:
+            protected_from = 0
+
+        counts = [count_message_tokens(m) for m in history]
+        total = sum(counts)
+
+        for i, message in enumerate(history[:protected_from]):
+            content = message.get("content") or ""
+            if message.get("role") != "tool" or content.startswith(COMPACTED_PREFIX):
+                continue
+            if counts[i] <= self.compact_threshold and total <= self.max_context_tokens:
+                continue
+            message["content"] = compact_tool_content(content)
+            new_count = count_message_tokens(message)
+            total -= counts[i] - new_count
+            counts[i] = new_count
+
+        if total > self.max_context_tokens:
+            logger.warning(f"壓縮後的對話仍超過上限: {total} > {self.max_context_tokens} tokens")
+        return total
@@ -1,43 +1,220 @@
 import logging
 import json
-from typing import List, Dict, Any, Optional
-from .models import BaseLLM
+import time
+import threading
+from contextlib import closing, nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+from .models import BaseLLM, StreamEvent
+from .session import InvestigationSession
+from .context import ContextWindow
+from .rate_limit import UNLIMITED, RateLimiter
+from .fast_path import FastPathTriage, extract_verdict
+from .prompt_encoding import DEFAULT_ENCODER, PromptEncoder
+from pydantic import BaseModel
 from adapter.core.schemas import MDRAlert
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TOOL_TIMEOUT = 60.0
+# 工具在共用工作池中排隊等待執行的上限 (批次調查時工作池可能暫時滿載)
+DEFAULT_TOOL_QUEUE_TIMEOUT = 300.0
+DEFAULT_MAX_PARALLEL_TOOLS = 8
+DEFAULT_BATCH_CONCURRENCY = 8
+
+# 串流模式下接收 AI 文字片段的回呼 (例如即時推送給分析師介面)
+ContentCallback = Callable[[str], None]
+
+
+class BatchProgress:
+    """
+    investigate_many 的進度指標 (執行緒安全)，可在批次執行期間由其他執行緒讀取 snapshot()。
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.tokens = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def _submit(self):
+        with self._lock:
+            self.submitted += 1
+
+    def _complete(self, session: InvestigationSession):
+        with self._lock:
+            self.completed += 1
+            if session.error is not None:
+                self.failed += 1
+            self.tokens += session.total_tokens or session.estimated_input_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.submitted - self.completed,
+                "tokens": self.tokens,
+                "elapsed": elapsed,
+                "alerts_per_minute": self.completed / elapsed * 60 if elapsed > 0 else 0.0
+            }
+
+class _ToolRun:
+    """記錄工具呼叫在工作池中實際開始執行的時間"""
+    def __init__(self):
+        self.submitted_at = time.monotonic()
+        self.started_at = 0.0
+        self.started = threading.Event()
+
+    def mark_started(self):
+        self.started_at = time.monotonic()
+        self.started.set()
+
+
 class MDRIntelligenceEngine:
     """
     MDR AI 調度引擎
     負責理解告警、決定行動並總結調查結果。
+    引擎本身不保存對話狀態，每次調查使用獨立的 InvestigationSession，可安全地在多執行緒間共用。
     """
-    def __init__(self, llm: BaseLLM, system_prompt: str):
+    def __init__(self, llm: BaseLLM, system_prompt: str, tool_timeout: float = DEFAULT_TOOL_TIMEOUT,
+                 max_parallel_tools: int = DEFAULT_MAX_PARALLEL_TOOLS, context_window: Optional[ContextWindow] = None,
+                 stream: bool = False, rate_limiter: Optional[RateLimiter] = None,
+                 fast_path: Optional[FastPathTriage] = None, prompt_encoder: Optional[PromptEncoder] = None,
+                 tool_queue_timeout: float = DEFAULT_TOOL_QUEUE_TIMEOUT):
         self.llm = llm
+        # 所有調查共用的 LLM RPM/TPM 限制 (None 表示不限制)，等待中的請求依租戶輪替。
+        # 適用於本身沒有限制器的 LLM (例如 RoutingLLM 或自訂實作)；與 LLM 的供應商限制器為同一物件時不重複計算
+        if rate_limiter is not None and rate_limiter is getattr(llm, "rate_limiter", None):
+            rate_limiter = None
+        self.rate_limiter = rate_limiter
+        # 規則式前置判定與判定穩定後提前結束 (None 表示每筆告警都走完整調查)
+        self.fast_path = fast_path
+        # 串流模式：工具呼叫一解析完成就開始執行，不必等待整個回應生成完畢
+        self.stream = stream
         self.system_prompt = system_prompt
-        self.history: List[Dict[str, str]] = [
-            {"role": "system", "content": system_prompt}
-        ]
+        # 告警與工具結果的精簡序列化 (每次請求都會重送，直接影響輸入 Token 數)
+        self.prompt_encoder = prompt_encoder or DEFAULT_ENCODER
+        # tool_timeout 由工具實際開始執行時起算；排隊時間另以 tool_queue_timeout 限制
+        self.tool_timeout = tool_timeout
+        self.tool_queue_timeout = tool_queue_timeout
+        # 控制每次請求的 Token 數與整個調查的 Token 預算
+        self.context_window = context_window or ContextWindow()
+        # 同一輪 AI 回應中的多個工具呼叫彼此獨立，並行執行以縮短每次迭代的等待時間
+        self._tool_executor = ThreadPoolExecutor(max_workers=max_parallel_tools, thread_name_prefix="mdr-tool")
+
+    def new_session(self, alert: MDRAlert) -> InvestigationSession:
+        """
+        建立新的調查會話 (含系統提示與告警內容)。
+        """
+        session = InvestigationSession(alert, self.system_prompt)
+        alert_json = self.prompt_encoder.encode_alert(alert)
+        user_message = f"偵測到一筆新的資安告警，請協助調查其根因並提供處置建議：\n\n{alert_json}"
+        session.history.append({"role": "user", "content": user_message})
+        return session
 
-    def investigate(self, alert: MDRAlert, registry: 'ToolRegistry', max_iterations: int = 5) -> str:
+    def investigate(self, alert: MDRAlert, registry: 'ToolRegistry', max_iterations: int = 5,
+                    on_content: Optional[ContentCallback] = None) -> str:
         """
         針對指定告警啟動自動化調查循環。
         """
+        session = self.new_session(alert)
+        self.run_session(session, registry, max_iterations=max_iterations, on_content=on_content)
+        return session.result
+
+    def investigate_many(self, alerts: Iterable[MDRAlert], registry: 'ToolRegistry',
+                         concurrency: int = DEFAULT_BATCH_CONCURRENCY, max_iterations: int = 5,
+                         progress: Optional[BatchProgress] = None) -> Iterator[InvestigationSession]:
+        """
+        以工作池並行調查多筆告警，依完成順序回傳 session (含 result 與 summary)。
+        alerts 可為產生器；同時送出的調查數不超過 concurrency，因此可直接消化大量積壓告警。
+        LLM 請求速率由 rate_limiter 統一控管；單筆調查失敗時 session.error 會記錄原因，不影響其他調查。
+        
+        Args:
+            progress: 傳入時即時更新進度指標，供其他執行緒監看
+        """
+        progress = progress or BatchProgress()
+        pending = set()
+        alert_iter = iter(alerts)
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mdr-investigate") as pool:
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    alert = next(alert_iter, None)
+                    if alert is None:
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(self._run_batch_item, alert, registry, max_iterations))
+                    progress._submit()
+
+                if not pending:
+                    return
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    session = future.result()
+                    progress._complete(session)
+                    yield session
+
+    def _run_batch_item(self, alert: MDRAlert, registry: 'ToolRegistry', max_iterations: int) -> InvestigationSession:
+        session = self.new_session(alert)
+        try:
+            self.run_session(session, registry, max_iterations=max_iterations)
+        except Exception as e:
+            logger.error(f"[{alert.alert_id}] 調查失敗: {str(e)}")
+            session.error = str(e)
+            session.finish(f"調查失敗: {str(e)}")
+        return session
+
+    def run_session(self, session: InvestigationSession, registry: 'ToolRegistry', max_iterations: int = 5,
+                    on_content: Optional[ContentCallback] = None) -> InvestigationSession:
+        """
+        執行調查循環直到 AI 提出結論或達到最大迭代次數。
+        
+        Args:
+            on_content: 提供時以串流模式執行，AI 產生的文字片段 (含初步結論) 會即時傳給此回呼
+        
+        Returns:
+            完成的 session (結論位於 session.result)
+        """
         # 1. 準備工具 Schema
         tools = registry.get_schemas()
-        
-        # 2. 初始化對話
-        alert_json = alert.model_dump_json(indent=2)
-        user_message = f"偵測到一筆新的資安告警，請協助調查其根因並提供處置建議：\n\n{alert_json}"
-        self.history.append({"role": "user", "content": user_message})
+        alert = session.alert
+        llm = self.llm.for_session(session)
 
         logger.info(f"開始調查告警: {alert.alert_id} - {alert.title}")
         
-        iterations = 0
-        while iterations < max_iterations:
-            iterations += 1
-            logger.info(f"--- 迭代 {iterations} ---")
+        if self.fast_path is not None and session.iterations == 0:
+            hit = self.fast_path.evaluate(alert)
+            if hit is not None:
+                session.resolved_by, conclusion = hit
+                logger.info(f"[{alert.alert_id}] 依規則 {session.resolved_by} 結案，略過 AI 調查")
+                session.finish(conclusion)
+                return session
+        
+        while session.iterations < max_iterations:
+            session.iterations += 1
+            logger.info(f"[{alert.alert_id}] --- 迭代 {session.iterations} ---")
+            
+            # 壓縮較舊的工具結果，使每次迭代的輸入 Token 維持穩定
+            input_tokens = self.context_window.fit(session.history)
+            if session.estimated_input_tokens + input_tokens > self.context_window.investigation_budget:
+                logger.warning(f"[{alert.alert_id}] Token 預算用盡 ({session.estimated_input_tokens} tokens)")
+                session.finish("已達本次調查的 Token 預算上限，調查強制結束。請檢查目前對話紀錄。")
+                return session
+            session.estimated_input_tokens += input_tokens
             
-            response = self.llm.chat(self.history, tools=tools)
+            streamed = None
+            with self._rate_grant(input_tokens, alert.tenant_id) as grant:
+                if self.stream or on_content is not None:
+                    response, streamed = self._stream_chat(llm, session.history, tools, registry, on_content)
+                else:
+                    response = llm.chat(session.history, tools=tools)
+                grant.reconcile(session.record_usage(response))
             message = response.choices[0].message
             
             # 將 AI 的回應加入歷史紀錄
@@ -55,35 +232,136 @@ class MDRIntelligenceEngine:
                     } for tc in message.tool_calls
                 ]
             
-            self.history.append(msg_dict)
+            session.history.append(msg_dict)
+            if self.fast_path is not None:
+                session.verdicts.append(extract_verdict(message.content))
 
             # 如果沒有工具呼叫，則這是最終結論
             if not (hasattr(message, 'tool_calls') and message.tool_calls):
-                return message.content or "AI 調查完成，但未提供內容。"
-
-            # 執行工具呼叫
-            for tool_call in message.tool_calls:
-                func_name = tool_call.function.name
-                func_args = json.loads(tool_call.function.arguments)
-                
-                logger.info(f"執行工具: {func_name}({func_args})")
-                try:
-                    result = registry.execute(func_name, func_args)
-                    # 如果結果是 Pydantic 模型或複雜物件，轉為 JSON 字串
-                    if hasattr(result, "model_dump_json"):
-                        result_str = result.model_dump_json()
-                    else:
-                        result_str = str(result)
-                except Exception as e:
-                    logger.error(f"工具執行失敗: {str(e)}")
-                    result_str = f"Error: {str(e)}"
-
-                # 將結果回饋給對話紀錄
-                self.history.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": func_name,
-                    "content": result_str
-                })
+                session.finish(message.content or "AI 調查完成，但未提供內容。")
+                self._record_verdict(session)
+                return session
+
+            # 並行執行工具呼叫，並依原始 tool_call 順序寫回對話紀錄 (確保對話內容可重現)
+            futures = self._match_tool_runs(registry, message.tool_calls, streamed or {})
+            for tool_call, result_str in zip(message.tool_calls, self._collect_tool_results(message.tool_calls, futures)):
+                session.add_tool_result(tool_call.id, tool_call.function.name, result_str)
+
+            # 判定已穩定：本輪工具 (可能包含處置動作) 已執行完畢，不再進行下一輪 LLM 請求
+            if self.fast_path is not None and self.fast_path.is_settled(session.verdicts):
+                logger.info(f"[{alert.alert_id}] 判定結果已穩定，提前結束調查")
+                session.resolved_by = "early_exit"
+                session.finish(message.content)
+                self._record_verdict(session)
+                return session
+        
+        session.finish("達到最大迭代次數，調查強制結束。請檢查目前對話紀錄。")
+        return session
+
+    def _record_verdict(self, session: InvestigationSession):
+        if self.fast_path is not None:
+            self.fast_path.record(session.alert, session.result)
+
+    def _stream_chat(self, llm: BaseLLM, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]], registry: 'ToolRegistry',
+                     on_content: Optional[ContentCallback]) -> Tuple[Any, Dict[str, Tuple[Future, "_ToolRun"]]]:
+        """
+        以串流方式取得 AI 回應；每個工具呼叫解析完成時立即送出執行。
         
-        return "達到最大迭代次數，調查強制結束。請檢查目前對話紀錄。"
+        Returns:
+            (組裝後的完整回應, 以 tool_call.id 為 Key 的 (future, 執行紀錄))
+        """
+        response = None
+        started: Dict[str, Tuple[Future, _ToolRun]] = {}
+        # 中途失敗時立即關閉串流，不讓 HTTP 回應與並行名額留到垃圾回收
+        with closing(llm.chat_stream(messages, tools=tools)) as events:
+            for event in events:
+                if event.type == StreamEvent.CONTENT:
+                    if on_content is not None:
+                        try:
+                            on_content(event.content)
+                        except Exception as e:
+                            logger.error(f"串流回呼失敗: {str(e)}")
+                elif event.type == StreamEvent.TOOL_CALL:
+                    tool_call = event.tool_call
+                    if tool_call.id in started:
+                        logger.warning(f"串流中重複的工具呼叫 ID，略過: {tool_call.id}")
+                        continue
+                    started[tool_call.id] = self._submit_tool_call(registry, tool_call)
+                elif event.type == StreamEvent.DONE:
+                    response = event.response
+        if response is None:
+            raise RuntimeError("LLM 串流未回傳完整回應")
+        return response, started
+
+    def _match_tool_runs(self, registry: 'ToolRegistry', tool_calls: List[Any],
+                         started: Dict[str, Tuple[Future, "_ToolRun"]]) -> List[Tuple[Future, "_ToolRun"]]:
+        """
+        依 tool_call.id 將串流期間已送出的工具對應到完整回應中的 tool_calls；
+        沒有對應的呼叫 (ID 不同或串流未送出) 在此送出執行，多出的串流呼叫盡可能取消。
+        
+        Returns:
+            與 tool_calls 順序相同的 (future, 執行紀錄) 列表
+        """
+        started = dict(started)
+        runs = []
+        for tool_call in tool_calls:
+            run = started.pop(tool_call.id, None)
+            runs.append(run if run is not None else self._submit_tool_call(registry, tool_call))
+        for call_id, (future, _) in started.items():
+            if not future.cancel():
+                logger.warning(f"串流中的工具呼叫未出現在完整回應中，但已執行: {call_id}")
+        return runs
+
+    def _rate_grant(self, input_tokens: int, tenant_id: str):
+        """取得引擎層級限制器的配額 (離開時歸還並行名額)；未設定時不等待"""
+        if self.rate_limiter is None:
+            return nullcontext(UNLIMITED)
+        return self.rate_limiter.request(input_tokens, tenant_id=tenant_id)
+
+    def _submit_tool_call(self, registry: 'ToolRegistry', tool_call: Any) -> Tuple[Future, "_ToolRun"]:
+        run = _ToolRun()
+        return self._tool_executor.submit(self._run_tool_call, run, registry, tool_call), run
+
+    def _run_tool_call(self, run: "_ToolRun", registry: 'ToolRegistry', tool_call: Any) -> str:
+        run.mark_started()
+        return self._execute_tool_call(registry, tool_call)
+
+    def _collect_tool_results(self, tool_calls: List[Any], futures: List[Tuple[Future, "_ToolRun"]]) -> List[str]:
+        """
+        等待同一輪所有 (並行中的) 工具呼叫完成，逾時或失敗的工具以錯誤訊息回饋給 AI。
+        逾時由工具開始執行時起算，在共用工作池中排隊的時間不計入；排隊過久仍未開始的工具會被取消。
+        
+        Returns:
+            與 tool_calls 順序相同的結果字串列表
+        """
+        results = []
+        for tool_call, (future, run) in zip(tool_calls, futures):
+            name = tool_call.function.name
+            if not run.started.wait(max(self.tool_queue_timeout - (time.monotonic() - run.submitted_at), 0)):
+                if future.cancel():
+                    logger.error(f"工具排隊逾時未執行: {name} ({self.tool_queue_timeout}s)")
+                    results.append(f"Error: Tool '{name}' was not started: all tool workers busy for {self.tool_queue_timeout}s")
+                    continue
+                # cancel 失敗代表工具剛好開始執行
+                run.started.wait()
+            remaining = max(self.tool_timeout - (time.monotonic() - run.started_at), 0)
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                logger.error(f"工具執行逾時: {name} ({self.tool_timeout}s)")
+                results.append(f"Error: Tool '{name}' timed out after {self.tool_timeout}s")
+        return results
+
+    def _execute_tool_call(self, registry: 'ToolRegistry', tool_call: Any) -> str:
+        func_name = tool_call.function.name
+        try:
+            func_args = json.loads(tool_call.function.arguments or "{}")
+            logger.info(f"執行工具: {func_name}({func_args})")
+            result = registry.execute(func_name, func_args)
+            # Pydantic 模型、dict 與 list (含程序清單) 轉為精簡 JSON 字串
+            if isinstance(result, (BaseModel, dict, list)):
+                return self.prompt_encoder.encode(result)
+            return str(result)
+        except Exception as e:
+            logger.error(f"工具執行失敗: {str(e)}")
+            return f"Error: {str(e)}"
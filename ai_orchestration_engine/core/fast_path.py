@@ -0,0 +1,162 @@
+"""
+Fast Path - 調查前的規則判定與提前結束
+
+大量告警屬於明確的雜訊，不需要進入 LLM 調查循環：
+- 檔案雜湊全部位於已知良性清單 (例如內部簽章工具觸發的告警)
+- 相同偵測 (標題) 且所有實體近期已被調查並判定為良性
+- INFO 等級且沒有任何實體的告警
+
+進入調查循環後，AI 的判定結果達到信心門檻或連續兩輪一致時，執行完該輪的工具呼叫即結束調查，
+不再進行下一輪 LLM 請求。
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from adapter.core.schemas import MDRAlert, EntityType, Severity
+
+DEFAULT_VERDICT_TTL = 24 * 3600
+DEFAULT_MIN_CONFIDENCE = 90
+DEFAULT_STABLE_TURNS = 2
+MAX_ENTITY_VERDICTS = 100_000
+
+BENIGN = "benign"
+SUSPICIOUS = "suspicious"
+MALICIOUS = "malicious"
+
+# 對應 playbook 的輸出格式，例如「**判定結果**: Benign」「Verdict: 惡意」
+_VERDICT_PATTERN = re.compile(
+    r"(?:判定結果|判定|verdict)\W{0,4}(malicious|suspicious|benign|惡意|可疑|良性)", re.IGNORECASE
+)
+_CONFIDENCE_PATTERN = re.compile(r"(?:信心(?:程度|分數)?|confidence)\W{0,4}(\d{1,3})\s*%?", re.IGNORECASE)
+_VERDICT_ALIASES = {"惡意": MALICIOUS, "可疑": SUSPICIOUS, "良性": BENIGN}
+
+# 參與「相同實體已判定」比對的實體類型
+_VERDICT_ENTITY_TYPES = frozenset({EntityType.HOST, EntityType.FILE, EntityType.USER, EntityType.IP, EntityType.DOMAIN})
+
+
+def extract_verdict(text: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """
+    從 AI 回應中擷取判定結果與信心分數。
+
+    Returns:
+        (verdict, confidence)；找不到時為 None
+    """
+    if not text:
+        return None, None
+    verdict = None
+    match = _VERDICT_PATTERN.search(text)
+    if match:
+        value = match.group(1)
+        verdict = _VERDICT_ALIASES.get(value, value.lower())
+    confidence = None
+    match = _CONFIDENCE_PATTERN.search(text)
+    if match:
+        confidence = min(int(match.group(1)), 100)
+    return verdict, confidence
+
+
+class FastPathTriage:
+    """
+    規則式前置判定 (執行緒安全)。
+
+    使用方式：
+        triage = FastPathTriage(benign_hashes=load_hash_list("allowlist.txt"))
+        engine = MDRIntelligenceEngine(llm, system_prompt, fast_path=triage)
+    """
+
+    def __init__(self, benign_hashes: Iterable[str] = (), verdict_ttl: float = DEFAULT_VERDICT_TTL,
+                 reusable_verdicts: Iterable[str] = (BENIGN,), close_empty_info: bool = True,
+                 min_confidence: int = DEFAULT_MIN_CONFIDENCE, stable_turns: int = DEFAULT_STABLE_TURNS):
+        self.benign_hashes = frozenset(h.strip().lower() for h in benign_hashes if h.strip())
+        self.verdict_ttl = verdict_ttl
+        self.reusable_verdicts = frozenset(reusable_verdicts)
+        self.close_empty_info = close_empty_info
+        self.min_confidence = min_confidence
+        self.stable_turns = stable_turns
+
+        # (tenant, title, entity_type, value) -> (verdict, alert_id, 判定時間)
+        self._entity_verdicts: Dict[Tuple[str, str, str, str], Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"evaluated": 0, "benign_hash": 0, "entity_verdict": 0, "empty_info": 0}
+
+    @staticmethod
+    def _entity_keys(alert: MDRAlert) -> List[Tuple[str, str, str, str]]:
+        # 包含告警標題：同一主機上的不同偵測仍須各自調查
+        title = alert.title.strip().lower()
+        return [
+            (alert.tenant_id, title, e.type.value, e.value.strip().lower())
+            for e in alert.entities if e.type in _VERDICT_ENTITY_TYPES and e.value.strip()
+        ]
+
+    def evaluate(self, alert: MDRAlert, now: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """
+        對告警套用前置規則。
+
+        Returns:
+            (規則名稱, 結論文字)；無規則命中時回傳 None，需進入 AI 調查
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.stats["evaluated"] += 1
+
+        if self.close_empty_info and alert.severity == Severity.INFO and not alert.entities:
+            return self._hit("empty_info", "**判定結果**: Benign\n\nINFO 等級且無任何關聯實體，依規則自動結案。")
+
+        file_hashes = [e.value.strip().lower() for e in alert.entities if e.type == EntityType.FILE]
+        if file_hashes and self.benign_hashes and all(h in self.benign_hashes for h in file_hashes):
+            return self._hit("benign_hash", "**判定結果**: Benign\n\n告警中的檔案雜湊皆位於已知良性清單，依規則自動結案。")
+
+        keys = self._entity_keys(alert)
+        if keys:
+            with self._lock:
+                known = [self._entity_verdicts.get(k) for k in keys]
+            fresh = [v for v in known if v is not None and now - v[2] < self.verdict_ttl]
+            if len(fresh) == len(keys):
+                verdicts = {v[0] for v in fresh}
+                if len(verdicts) == 1 and verdicts <= self.reusable_verdicts:
+                    verdict = verdicts.pop()
+                    sources = ", ".join(sorted({v[1] for v in fresh}))
+                    return self._hit(
+                        "entity_verdict",
+                        f"**判定結果**: {verdict.capitalize()}\n\n所有關聯實體近期已調查並判定為 {verdict} (來源告警: {sources})，沿用先前結論。"
+                    )
+        return None
+
+    def _hit(self, rule: str, conclusion: str) -> Tuple[str, str]:
+        with self._lock:
+            self.stats[rule] += 1
+        return rule, conclusion
+
+    def record(self, alert: MDRAlert, conclusion: Optional[str], now: Optional[float] = None):
+        """記錄 AI 調查的判定結果，供之後相同實體的告警沿用"""
+        verdict, _ = extract_verdict(conclusion)
+        if verdict is None:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            for key in self._entity_keys(alert):
+                self._entity_verdicts[key] = (verdict, alert.alert_id, now)
+            if len(self._entity_verdicts) > MAX_ENTITY_VERDICTS:
+                cutoff = now - self.verdict_ttl
+                self._entity_verdicts = {k: v for k, v in self._entity_verdicts.items() if v[2] >= cutoff}
+
+    def is_settled(self, verdicts: List[Tuple[Optional[str], Optional[int]]]) -> bool:
+        """
+        判斷 AI 的判定是否已穩定：最新一輪的信心達門檻，或最近 stable_turns 輪的判定一致。
+        """
+        if not verdicts or verdicts[-1][0] is None:
+            return False
+        verdict, confidence = verdicts[-1]
+        if confidence is not None and confidence >= self.min_confidence:
+            return True
+        recent = [v for v, _ in verdicts[-self.stable_turns:]]
+        return len(recent) >= self.stable_turns and all(v == verdict for v in recent)
+
+
+def load_hash_list(path: str) -> List[str]:
+    """載入雜湊清單檔案 (每行一個雜湊，# 開頭為註解)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
@@ -1,19 +1,209 @@
+import inspect
+import json
+import logging
+import random
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from contextlib import closing, contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Optional
+
+import requests
+
+from adapter.core.http_session import get_shared_session, DEFAULT_POOL_SIZE
+from .context import count_message_tokens
+from .rate_limit import RateGrant, RateLimiter, UNLIMITED, get_provider_limiter
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com"
+DEFAULT_LLM_TIMEOUT = 60.0
+# 單次串流回應的整體時限 (秒)；兩個片段之間的讀取逾時仍為 DEFAULT_LLM_TIMEOUT
+DEFAULT_STREAM_TIMEOUT = 300.0
+DEFAULT_LLM_MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1.0
+MAX_RETRY_DELAY = 60.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Gemini functionDeclarations 參數支援的 Schema 欄位 (OpenAPI 子集)
+GEMINI_SCHEMA_FIELDS = frozenset({"type", "format", "description", "nullable", "enum", "properties", "required", "items"})
+
+
+class StreamTimeoutError(TimeoutError):
+    """串流回應超過整體時限"""
+
+
+def _iter_with_deadline(chunks: Iterator[Any], timeout: float) -> Iterator[Any]:
+    """逐一取出串流片段，超過整體時限即中止 (單次讀取的逾時由 HTTP 用戶端負責)"""
+    deadline = time.monotonic() + timeout
+    for chunk in chunks:
+        if time.monotonic() > deadline:
+            raise StreamTimeoutError(f"串流回應超過 {timeout:.0f}s")
+        yield chunk
+
+
+# ===== 與 OpenAI SDK 相容的輕量回應結構 (串流組裝與非 OpenAI 供應商共用) =====
+
+@dataclass
+class FunctionCall:
+    name: str
+    arguments: str = ""
+
+
+@dataclass
+class ToolCall:
+    id: str
+    function: FunctionCall
+    type: str = "function"
+
+
+@dataclass
+class ChatMessage:
+    content: Optional[str] = None
+    tool_calls: Optional[List[ToolCall]] = None
+
+
+@dataclass
+class Choice:
+    message: ChatMessage
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+@dataclass
+class ChatResponse:
+    choices: List[Choice]
+    usage: Optional[Usage] = None
+
+    @classmethod
+    def build(cls, content: Optional[str], tool_calls: Optional[List[ToolCall]] = None,
+              usage: Optional[Usage] = None) -> "ChatResponse":
+        return cls(choices=[Choice(ChatMessage(content, tool_calls or None))], usage=usage)
+
+
+@dataclass
+class StreamEvent:
+    """
+    chat_stream 產生的事件：
+    - content: 文字片段 (delta)
+    - tool_call: 一個已完整解析的工具呼叫，可立即執行
+    - done: 串流結束，response 為組裝後的完整回應 (與 chat() 回傳格式相同)
+    """
+    CONTENT = "content"
+    TOOL_CALL = "tool_call"
+    DONE = "done"
+
+    type: str
+    content: Optional[str] = None
+    tool_call: Optional[ToolCall] = None
+    response: Optional[ChatResponse] = None
+
+
+def _usage_total(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+
 
 class BaseLLM(ABC):
+    # 供應商 + 模型共用的 RPM/TPM 限制器 (None 表示不限制)
+    rate_limiter: Optional[RateLimiter] = None
+
     @abstractmethod
     def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
         """發送對話請求到 LLM。"""
         pass
 
+    def for_session(self, session: Any) -> "BaseLLM":
+        """
+        回傳用於單一調查的 LLM。預設為自身；RoutingLLM 會依該調查的告警與迭代次數選擇模型，
+        設有限制器的 LLM 則綁定該調查的租戶，讓配額在租戶間公平輪替。
+        """
+        if self.rate_limiter is not None:
+            return _TenantScopedLLM(self, session.alert.tenant_id)
+        return self
+
+    @contextmanager
+    def _limited(self, messages: List[Dict[str, Any]], tenant_id: Optional[str]) -> Iterator[RateGrant]:
+        """在限制器取得配額 (預估輸入 Token) 後才送出請求"""
+        if self.rate_limiter is None:
+            yield UNLIMITED
+            return
+        estimated = sum(count_message_tokens(m) for m in messages)
+        with self.rate_limiter.request(estimated, tenant_id) as grant:
+            yield grant
+
+    def _limited_stream(self, messages: List[Dict[str, Any]], tenant_id: Optional[str],
+                        stream: Callable[[RateGrant], Iterator[StreamEvent]]) -> Iterator[StreamEvent]:
+        # 串流期間持續佔用並行名額，結束時以實際用量修正 TPM；
+        # 呼叫端提前停止讀取時立即關閉底層串流 (連同 HTTP 回應) 並歸還名額
+        with self._limited(messages, tenant_id) as grant, closing(stream(grant)) as events:
+            for event in events:
+                if event.type == StreamEvent.DONE:
+                    grant.reconcile(_usage_total(event.response))
+                yield event
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        """
+        串流版本的 chat()。
+        預設實作呼叫 chat() 後一次送出所有事件，供不支援串流的供應商使用。
+        """
+        response = self.chat(messages, tools=tools)
+        message = response.choices[0].message
+        if message.content:
+            yield StreamEvent(StreamEvent.CONTENT, content=message.content)
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=tool_call)
+        yield StreamEvent(StreamEvent.DONE, response=response)
+
+def _accepts_tenant(func: Callable[..., Any]) -> bool:
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == "tenant_id" or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+
+class _TenantScopedLLM(BaseLLM):
+    """
+    綁定租戶的 LLM 視圖，讓限制器可依租戶公平排隊。
+    只有 chat / chat_stream 宣告 tenant_id 參數的 LLM 才會收到租戶 (自訂 LLM 不需要支援)。
+    """
+
+    def __init__(self, llm: BaseLLM, tenant_id: str):
+        self.llm = llm
+        self.tenant_id = tenant_id
+        self._chat_kwargs = {"tenant_id": tenant_id} if _accepts_tenant(llm.chat) else {}
+        self._stream_kwargs = {"tenant_id": tenant_id} if _accepts_tenant(llm.chat_stream) else {}
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        return self.llm.chat(messages, tools, **self._chat_kwargs)
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        return self.llm.chat_stream(messages, tools, **self._stream_kwargs)
+
+
 class OpenAILLM(BaseLLM):
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    def __init__(self, api_key: str, model: str = "gpt-4o", requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 timeout: float = DEFAULT_LLM_TIMEOUT, stream_timeout: float = DEFAULT_STREAM_TIMEOUT):
         import openai
         self.client = openai.OpenAI(api_key=api_key)
         self.model = model
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        if requests_per_minute or tokens_per_minute or max_concurrency:
+            self.rate_limiter = get_provider_limiter("openai", model, requests_per_minute, tokens_per_minute, max_concurrency)
 
-    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None,
+             tenant_id: Optional[str] = None) -> Any:
         kwargs = {
             "model": self.model,
             "messages": messages,
@@ -22,69 +212,305 @@ class OpenAILLM(BaseLLM):
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
         
-        return self.client.chat.completions.create(**kwargs)
+        with self._limited(messages, tenant_id) as grant:
+            response = self.client.chat.completions.create(**kwargs)
+            grant.reconcile(_usage_total(response))
+        return response
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None,
+                    tenant_id: Optional[str] = None) -> Iterator[StreamEvent]:
+        return self._limited_stream(messages, tenant_id, lambda grant: self._stream(messages, tools))
+
+    def _stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            # 串流時為兩個片段之間的讀取逾時
+            "timeout": self.timeout,
+        }
+        if tools:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = "auto"
+
+        content_parts: List[str] = []
+        # 以 index 組裝分段送達的工具呼叫；出現下一個 index 時代表前一個已完整
+        pending: Dict[int, Dict[str, Any]] = {}
+        completed: List[ToolCall] = []
+        usage = None
+
+        def flush(upto: Optional[int] = None):
+            for index in sorted(pending):
+                if upto is not None and index >= upto:
+                    break
+                item = pending.pop(index)
+                tool_call = ToolCall(item["id"], FunctionCall(item["name"], item["arguments"]))
+                completed.append(tool_call)
+                yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=tool_call)
+
+        with closing(self.client.chat.completions.create(**kwargs)) as stream:
+            for chunk in _iter_with_deadline(stream, self.stream_timeout):
+                if getattr(chunk, "usage", None):
+                    usage = Usage(chunk.usage.prompt_tokens or 0, chunk.usage.completion_tokens or 0)
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield StreamEvent(StreamEvent.CONTENT, content=delta.content)
+                for tc_delta in delta.tool_calls or []:
+                    yield from flush(upto=tc_delta.index)
+                    item = pending.setdefault(tc_delta.index, {"id": "", "name": "", "arguments": ""})
+                    if tc_delta.id:
+                        item["id"] = tc_delta.id
+                    if tc_delta.function is not None:
+                        item["name"] += tc_delta.function.name or ""
+                        item["arguments"] += tc_delta.function.arguments or ""
+                if choice.finish_reason:
+                    yield from flush()
+
+        yield from flush()
+        response = ChatResponse.build("".join(content_parts) or None, completed, usage)
+        yield StreamEvent(StreamEvent.DONE, response=response)
+
+class GeminiAPIError(Exception):
+    """Gemini API 回傳非 200 狀態 (重試後仍失敗)；retry_after 為伺服器要求的等待秒數"""
+    def __init__(self, status_code: int, text: str, retry_after: Optional[float] = None):
+        suffix = f" (Retry-After {retry_after:.0f}s)" if retry_after is not None else ""
+        super().__init__(f"Gemini API Error: {status_code} - {text}{suffix}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭 (秒數或 HTTP 日期)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
 
 class GeminiLLM(BaseLLM):
-    def __init__(self, api_key: str, model: str = "gemini-pro"):
+    def __init__(self, api_key: str, model: str = "gemini-pro", timeout: float = DEFAULT_LLM_TIMEOUT,
+                 max_retries: int = DEFAULT_LLM_MAX_RETRIES, pool_size: int = DEFAULT_POOL_SIZE,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: Optional[int] = None, stream_timeout: float = DEFAULT_STREAM_TIMEOUT):
         self.api_key = api_key
         self.model_name = model
+        if requests_per_minute or tokens_per_minute or max_concurrency:
+            self.rate_limiter = get_provider_limiter("gemini", model, requests_per_minute, tokens_per_minute, max_concurrency)
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.max_retries = max_retries
+        # 同一程序內的所有 GeminiLLM 共用連線池 (Keep-Alive)；重試一律由 _post 處理
+        self.session = get_shared_session(GEMINI_API_BASE, pool_size=pool_size, max_retries=0)
         # 確保模型名稱格式正確 (例如 gemini-1.5-flash)
         model_id = model if model.startswith("models/") else f"models/{model}"
-        self.url = f"https://generativelanguage.googleapis.com/v1beta/{model_id}:generateContent?key={api_key}"
+        base_url = f"{GEMINI_API_BASE}/v1beta/{model_id}"
+        self.url = f"{base_url}:generateContent?key={api_key}"
+        self.stream_url = f"{base_url}:streamGenerateContent?alt=sse&key={api_key}"
 
-    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
-        import requests
-        import json
+    def _retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after
+        return min(RETRY_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, RETRY_BACKOFF_BASE), MAX_RETRY_DELAY)
+
+    def _post(self, url: str, payload: Dict[str, Any], stream: bool = False, grant: RateGrant = UNLIMITED) -> Any:
+        """
+        送出請求；429/5xx 與連線錯誤以指數退避重試 (優先依照 Retry-After)。
+        Retry-After 超過 MAX_RETRY_DELAY 時不等待，直接拋出帶有 retry_after 的 GeminiAPIError。
+        退避等待期間歸還限制器的並行名額，讓其他請求可以使用。
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"Gemini 連線失敗，{delay:.1f}s 後重試 ({attempt + 1}/{self.max_retries}): {str(e)}")
+                with grant.paused():
+                    time.sleep(delay)
+                continue
+
+            if response.status_code == 200:
+                return response
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            if (response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries
+                    or (retry_after is not None and retry_after > MAX_RETRY_DELAY)):
+                error = GeminiAPIError(response.status_code, response.text, retry_after)
+                response.close()
+                raise error
+
+            delay = self._retry_delay(attempt, retry_after)
+            response.close()
+            logger.warning(f"Gemini 回應 {response.status_code}，{delay:.1f}s 後重試 ({attempt + 1}/{self.max_retries})")
+            with grant.paused():
+                time.sleep(delay)
+
+    @staticmethod
+    def _to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+        """將 JSON Schema 轉為 Gemini 支援的 OpenAPI 子集 (移除不支援的欄位)"""
+        result = {k: v for k, v in schema.items() if k in GEMINI_SCHEMA_FIELDS}
+        if "properties" in result:
+            result["properties"] = {name: GeminiLLM._to_gemini_schema(prop) for name, prop in result["properties"].items()}
+        if "items" in result:
+            result["items"] = GeminiLLM._to_gemini_schema(result["items"])
+        return result
+
+    @staticmethod
+    def _build_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """OpenAI Tool Schema -> Gemini functionDeclarations"""
+        declarations = []
+        for tool in tools:
+            function = tool.get("function", tool)
+            declaration = {"name": function["name"], "description": function.get("description", "")}
+            parameters = function.get("parameters")
+            # 無參數的函式不可帶空的 object schema
+            if parameters and parameters.get("properties"):
+                declaration["parameters"] = GeminiLLM._to_gemini_schema(parameters)
+            declarations.append(declaration)
+        return [{"functionDeclarations": declarations}]
+
+    @staticmethod
+    def _call_args(arguments: Optional[str]) -> Dict[str, Any]:
+        try:
+            args = json.loads(arguments or "{}")
+        except ValueError:
+            return {}
+        return args if isinstance(args, dict) else {}
+
+    @staticmethod
+    def _tool_response(content: Optional[str]) -> Dict[str, Any]:
+        # functionResponse.response 必須是物件；JSON 物件直接帶入，其餘包成 {"result": ...}
+        try:
+            data = json.loads(content or "")
+        except ValueError:
+            data = content
+        return data if isinstance(data, dict) else {"result": data}
 
-        # 將訊息轉換為 Gemini API 格式
+    @staticmethod
+    def _build_payload(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        將 OpenAI 格式的對話紀錄轉換為 Gemini API 格式：
+        - system -> systemInstruction
+        - assistant 的 tool_calls -> model 回合的 functionCall
+        - 連續的 tool 訊息 -> 同一個 user 回合中的多個 functionResponse (對應並行呼叫)
+        """
         contents = []
-        system_instruction = ""
-        
+        system_parts = []
+        call_names: Dict[str, str] = {}
+
         for msg in messages:
-            if msg["role"] == "system":
-                system_instruction = msg["content"]
+            role = msg["role"]
+            if role == "system":
+                system_parts.append({"text": msg["content"]})
+            elif role == "assistant":
+                parts = [{"text": msg["content"]}] if msg.get("content") else []
+                for tool_call in msg.get("tool_calls") or []:
+                    function = tool_call["function"]
+                    call_names[tool_call["id"]] = function["name"]
+                    parts.append({"functionCall": {"name": function["name"], "args": GeminiLLM._call_args(function["arguments"])}})
+                if parts:
+                    contents.append({"role": "model", "parts": parts})
+            elif role == "tool":
+                name = msg.get("name") or call_names.get(msg.get("tool_call_id"), "")
+                part = {"functionResponse": {"name": name, "response": GeminiLLM._tool_response(msg.get("content"))}}
+                last = contents[-1] if contents else None
+                if last is not None and last["role"] == "user" and "functionResponse" in last["parts"][-1]:
+                    last["parts"].append(part)
+                else:
+                    contents.append({"role": "user", "parts": [part]})
             else:
-                role = "user" if msg["role"] == "user" else "model"
-                content_text = msg["content"]
-                # 如果有 system instruction，將其併入第一個 user message
-                if system_instruction and not contents:
-                    content_text = f"System Instruction: {system_instruction}\n\nUser Message: {content_text}"
-                    system_instruction = "" # 確保只加一次
-                
-                contents.append({
-                    "role": role,
-                    "parts": [{"text": content_text}]
-                })
-
-        payload = {
-            "contents": contents
-        }
+                contents.append({"role": "user", "parts": [{"text": msg["content"]}]})
 
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(self.url, headers=headers, data=json.dumps(payload))
-        
-        if response.status_code != 200:
-            raise Exception(f"Gemini API Error: {response.status_code} - {response.text}")
-            
-        data = response.json()
-        
-        # 提取文字內容
-        try:
-            text_content = data['candidates'][0]['content']['parts'][0]['text']
-        except (KeyError, IndexWarning):
-            text_content = "AI 未能提供有效回應。"
-
-        # 模擬 OpenAI 的結構
-        class MockChoice:
-            def __init__(self, content):
-                class MockMessage:
-                    def __init__(self, content):
-                        self.content = content
-                        self.tool_calls = None
-                self.message = MockMessage(content)
-        
-        class MockResponse:
-            def __init__(self, content):
-                self.choices = [MockChoice(content)]
-        
-        return MockResponse(text_content)
+        payload: Dict[str, Any] = {"contents": contents}
+        if system_parts:
+            payload["systemInstruction"] = {"parts": system_parts}
+        if tools:
+            payload["tools"] = GeminiLLM._build_tools(tools)
+            payload["toolConfig"] = {"functionCallingConfig": {"mode": "AUTO"}}
+        return payload
+
+    @staticmethod
+    def _parse_part(part: Dict[str, Any]) -> Any:
+        """回傳文字片段或 ToolCall (Gemini 不提供呼叫 ID 時自動產生)"""
+        function_call = part.get("functionCall")
+        if function_call:
+            call_id = function_call.get("id") or f"call_{uuid.uuid4().hex[:24]}"
+            arguments = json.dumps(function_call.get("args") or {}, ensure_ascii=False)
+            return ToolCall(call_id, FunctionCall(function_call["name"], arguments))
+        return part.get("text")
+
+    @staticmethod
+    def _parse_usage(data: Dict[str, Any]) -> Optional[Usage]:
+        metadata = data.get("usageMetadata")
+        if not metadata:
+            return None
+        return Usage(metadata.get("promptTokenCount", 0), metadata.get("candidatesTokenCount", 0))
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None,
+             tenant_id: Optional[str] = None) -> Any:
+        with self._limited(messages, tenant_id) as grant:
+            data = self._post(self.url, self._build_payload(messages, tools), grant=grant).json()
+            usage = self._parse_usage(data)
+            grant.reconcile(usage.prompt_tokens + usage.completion_tokens if usage else None)
+
+        texts: List[str] = []
+        tool_calls: List[ToolCall] = []
+        for candidate in data.get("candidates", [])[:1]:
+            for part in candidate.get("content", {}).get("parts", []):
+                parsed = self._parse_part(part)
+                if isinstance(parsed, ToolCall):
+                    tool_calls.append(parsed)
+                elif parsed:
+                    texts.append(parsed)
+
+        content = "".join(texts) or None
+        if content is None and not tool_calls:
+            content = "AI 未能提供有效回應。"
+
+        # 以與 OpenAI SDK 相同的結構回傳
+        return ChatResponse.build(content, tool_calls, usage=usage)
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None,
+                    tenant_id: Optional[str] = None) -> Iterator[StreamEvent]:
+        return self._limited_stream(messages, tenant_id, lambda grant: self._stream(messages, tools, grant))
+
+    def _stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None,
+                grant: RateGrant = UNLIMITED) -> Iterator[StreamEvent]:
+        content_parts: List[str] = []
+        tool_calls: List[ToolCall] = []
+        usage = None
+
+        with self._post(self.stream_url, self._build_payload(messages, tools), stream=True, grant=grant) as response:
+            # Server-Sent Events：每個 "data: " 行為一個 GenerateContentResponse 片段，functionCall 一次完整送達
+            for raw_line in _iter_with_deadline(response.iter_lines(), self.stream_timeout):
+                line = raw_line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):].strip())
+                for candidate in data.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        parsed = self._parse_part(part)
+                        if isinstance(parsed, ToolCall):
+                            tool_calls.append(parsed)
+                            yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=parsed)
+                        elif parsed:
+                            content_parts.append(parsed)
+                            yield StreamEvent(StreamEvent.CONTENT, content=parsed)
+                usage = self._parse_usage(data) or usage
+
+        content = "".join(content_parts) or None
+        if content is None and not tool_calls:
+            content = "AI 未能提供有效回應。"
+        yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build(content, tool_calls, usage=usage))
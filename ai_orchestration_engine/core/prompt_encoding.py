@@ -0,0 +1,81 @@
+"""
+Prompt Encoding - 告警與工具結果的精簡序列化
+
+每次 LLM 請求都會重送完整對話，告警與工具結果的序列化格式直接決定輸入 Token 數：
+- 不縮排、不留空白的 JSON，省略 None 與預設值 (空的 entities / metadata 等)
+- 程序清單改為表格形式 (欄位名稱只出現一次)，只保留至少一列有值的欄位
+- 中文等非 ASCII 字元不跳脫 (\\uXXXX 每字約需 6 個字元)
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+from adapter.core.schemas import MDRAlert, MDRProcess
+
+DEFAULT_TABULAR_MIN_ROWS = 2
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class PromptEncoder:
+    """
+    將 MDRAlert / MDRProcess / MDRToolResult 及一般工具結果轉為精簡的提示內容。
+
+    使用方式：
+        encoder = PromptEncoder(tabular_processes=True)
+        engine = MDRIntelligenceEngine(llm, system_prompt, prompt_encoder=encoder)
+    """
+
+    def __init__(self, tabular_processes: bool = True, tabular_min_rows: int = DEFAULT_TABULAR_MIN_ROWS):
+        self.tabular_processes = tabular_processes
+        self.tabular_min_rows = tabular_min_rows
+
+    def to_data(self, value: Any) -> Any:
+        """轉為可序列化的精簡結構 (巢狀的 Pydantic 模型與程序清單一併處理)"""
+        if isinstance(value, BaseModel):
+            data = value.model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+            for name in data:
+                raw = getattr(value, name, None)
+                if isinstance(raw, (BaseModel, list, dict)):
+                    data[name] = self.to_data(raw)
+            return data
+        if isinstance(value, list):
+            if self._is_process_table(value):
+                return self.process_table(value)
+            return [self.to_data(item) for item in value]
+        if isinstance(value, dict):
+            return {k: self.to_data(v) for k, v in value.items()}
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    def _is_process_table(self, value: List[Any]) -> bool:
+        return (self.tabular_processes and len(value) >= self.tabular_min_rows
+                and all(isinstance(item, MDRProcess) for item in value))
+
+    @staticmethod
+    def process_table(processes: List[MDRProcess]) -> Dict[str, Any]:
+        """
+        程序清單的表格形式：{"columns": [...], "rows": [[...], ...]}，欄位依 MDRProcess 定義順序，
+        全部為 None 的欄位不輸出。
+        """
+        rows = [process.model_dump(mode="json") for process in processes]
+        columns = [name for name in MDRProcess.model_fields if any(row.get(name) is not None for row in rows)]
+        return {"columns": columns, "rows": [[row.get(name) for name in columns] for row in rows]}
+
+    def encode(self, value: Any) -> str:
+        """序列化任意告警、模型或工具結果 (字串原樣回傳)"""
+        if isinstance(value, str):
+            return value
+        return _dumps(self.to_data(value))
+
+    def encode_alert(self, alert: MDRAlert) -> str:
+        return _dumps(self.to_data(alert))
+
+
+DEFAULT_ENCODER = PromptEncoder()
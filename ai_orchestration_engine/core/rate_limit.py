@@ -0,0 +1,222 @@
+"""
+LLM Rate Limiter - LLM 請求速率限制
+
+以 Token Bucket 同時限制每分鐘請求數 (RPM) 與每分鐘 Token 數 (TPM)，
+讓大量並行的調查在不觸發供應商 429 的前提下盡可能用滿配額。
+
+- 依供應商與模型共用 (get_provider_limiter)，同一程序內所有 LLM 實例共享同一組配額
+- 等待中的請求依租戶輪流取得配額 (Round-robin)，單一租戶的告警風暴不會餓死其他租戶
+- 可選 max_concurrency 限制同時進行中的請求數
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+DEFAULT_TENANT = "__default__"
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # 單次請求超過容量時只要求桶滿即可，避免永遠等不到
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateGrant:
+    """已取得的配額；呼叫完成後以 reconcile() 回報實際 Token 用量"""
+
+    def __init__(self, limiter: Optional["RateLimiter"], estimated_tokens: int, tenant_id: Optional[str] = None):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.tenant_id = tenant_id
+
+    def reconcile(self, actual_tokens: Optional[int]):
+        if self.limiter is not None:
+            self.limiter.reconcile(self.estimated_tokens, actual_tokens)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        暫時歸還並行名額 (例如重試前的退避等待)，結束時重新排隊取得；
+        重送的請求另計一次 RPM，預扣的 Token 不重複計算。
+        """
+        if self.limiter is None:
+            yield
+            return
+        self.limiter.release()
+        try:
+            yield
+        finally:
+            self.limiter.acquire(0, tenant_id=self.tenant_id)
+
+
+# 未設定限制器時使用的配額 (reconcile 不做任何事)
+UNLIMITED = RateGrant(None, 0)
+
+
+class RateLimiter:
+    """
+    RPM / TPM 速率限制器 (執行緒安全)。未設定的限制視為不限。
+
+    使用方式：
+        limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=200_000)
+        with limiter.request(estimated_tokens, tenant_id="tenant-a") as grant:
+            response = llm.chat(...)
+            grant.reconcile(actual_tokens)
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+        self._cond = threading.Condition()
+        # 有請求在等待的租戶，依輪替順序排列；每個租戶內部為 FIFO
+        self._waiting: "OrderedDict[str, Deque[object]]" = OrderedDict()
+
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.max_wait = 0.0
+        self._tenant_waits: Dict[str, Tuple[int, float]] = {}
+
+    def _is_next(self, tenant: str, ticket: object) -> bool:
+        head_tenant = next(iter(self._waiting))
+        return head_tenant == tenant and self._waiting[tenant][0] is ticket
+
+    def _dequeue(self, tenant: str, ticket: object, rotate: bool):
+        queue = self._waiting[tenant]
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[tenant]
+        elif rotate:
+            # 取得配額後輪到下一個租戶
+            self._waiting.move_to_end(tenant)
+
+    def _record_wait(self, tenant: str, waited: float):
+        self.acquired += 1
+        self.waited_seconds += waited
+        self.max_wait = max(self.max_wait, waited)
+        count, total = self._tenant_waits.get(tenant, (0, 0.0))
+        self._tenant_waits[tenant] = (count + 1, total + waited)
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None, tenant_id: Optional[str] = None) -> bool:
+        """
+        等待直到配額足以送出一個請求 (預估使用 tokens 個 Token)。
+        設定 max_concurrency 時，每次成功的 acquire 都必須以 release() 歸還 (建議使用 request())。
+
+        Returns:
+            True 表示已取得配額；timeout 到期仍無配額時回傳 False
+        """
+        tenant = tenant_id or DEFAULT_TENANT
+        ticket = object()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        with self._cond:
+            self._waiting.setdefault(tenant, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                wait: Optional[float] = None
+                slot_free = self.max_concurrency is None or self.in_flight < self.max_concurrency
+                if slot_free and self._is_next(tenant, ticket):
+                    wait = 0.0
+                    for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                        if bucket is not None:
+                            bucket.refill(now)
+                            wait = max(wait, bucket.wait_time(amount))
+                    if wait == 0.0:
+                        if self.requests is not None:
+                            self.requests.level -= 1
+                        if self.tokens is not None:
+                            self.tokens.level -= min(tokens, self.tokens.capacity)
+                        if self.max_concurrency is not None:
+                            self.in_flight += 1
+                        self._dequeue(tenant, ticket, rotate=True)
+                        self._record_wait(tenant, now - started)
+                        self._cond.notify_all()
+                        return True
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._dequeue(tenant, ticket, rotate=False)
+                        self._cond.notify_all()
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                # 非自己的回合或等待並行名額時，由 notify 喚醒
+                self._cond.wait(wait)
+
+    def release(self):
+        """歸還並行名額 (僅在設定 max_concurrency 時需要)"""
+        if self.max_concurrency is None:
+            return
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            self._cond.notify_all()
+
+    @contextmanager
+    def request(self, tokens: int = 0, tenant_id: Optional[str] = None) -> Iterator[RateGrant]:
+        """取得配額並在結束時歸還並行名額"""
+        self.acquire(tokens, tenant_id=tenant_id)
+        try:
+            yield RateGrant(self, tokens, tenant_id)
+        finally:
+            self.release()
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """以實際用量 (含輸出 Token) 修正預扣的 TPM 配額；超用的部分會延後之後的請求"""
+        if self.tokens is None or actual_tokens is None:
+            return
+        with self._cond:
+            self.tokens.refill(time.monotonic())
+            self.tokens.level -= actual_tokens - min(estimated_tokens, self.tokens.capacity)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "acquired": self.acquired,
+                "waiting": sum(len(q) for q in self._waiting.values()),
+                "in_flight": self.in_flight,
+                "waited_seconds": self.waited_seconds,
+                "avg_wait": self.waited_seconds / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+                "tenant_avg_wait": {t: total / count for t, (count, total) in self._tenant_waits.items()},
+                "requests_available": self.requests.level if self.requests else None,
+                "tokens_available": self.tokens.level if self.tokens else None
+            }
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(provider: str, model: str, requests_per_minute: Optional[float] = None,
+                         tokens_per_minute: Optional[float] = None,
+                         max_concurrency: Optional[int] = None) -> RateLimiter:
+    """
+    取得供應商 + 模型共用的限制器，不存在時以指定配額建立 (之後的呼叫沿用第一次的配額設定)。
+    """
+    key = (provider, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute, max_concurrency)
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,245 @@
+"""
+LLM Router - 依成本/延遲選擇模型並自動容錯切換
+
+RoutingLLM 本身實作 BaseLLM，可直接交給 MDRIntelligenceEngine：
+- 依告警嚴重程度選擇模型等級 (LOW/INFO 用快速模型，CRITICAL 用最強模型)
+- 調查迭代次數超過 escalate_after 時升級一個等級
+- 同等級的模型依觀測到的延遲 (EWMA) 排序，近期失敗或延遲過高的模型排到最後
+- 呼叫失敗或逾時時依序切換到下一個候選模型
+"""
+
+import logging
+import threading
+import time
+from contextlib import closing
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from adapter.core.schemas import Severity
+from .models import BaseLLM, StreamEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE_TIMEOUT = 90.0
+DEFAULT_ROUTE_QUEUE_TIMEOUT = 60.0
+DEFAULT_ROUTE_WORKERS = 16
+DEFAULT_LATENCY_BUDGET = 20.0
+DEFAULT_FAILURE_COOLDOWN = 60.0
+DEFAULT_ESCALATE_AFTER = 3
+LATENCY_EWMA_ALPHA = 0.3
+
+# 嚴重程度對應的最低模型等級 (0 = 最快/最便宜)
+DEFAULT_SEVERITY_TIERS = {
+    Severity.INFO: 0,
+    Severity.LOW: 0,
+    Severity.MEDIUM: 1,
+    Severity.HIGH: 1,
+    Severity.CRITICAL: 2
+}
+
+
+@dataclass
+class ModelRoute:
+    """一個可供路由的模型，tier 越高代表能力越強 (通常也越慢、越貴)"""
+    name: str
+    llm: BaseLLM
+    tier: int = 0
+
+
+class _RouteStats:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def record_success(self, elapsed: float):
+        self.calls += 1
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency = LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * self.latency
+
+    def record_failure(self, now: float):
+        self.calls += 1
+        self.failures += 1
+        self.last_failure = now
+
+
+class _RouteCall:
+    """記錄模型呼叫在工作池中實際開始執行的時間"""
+    def __init__(self):
+        self.submitted_at = time.monotonic()
+        self.started_at = 0.0
+        self.started = threading.Event()
+
+    def mark_started(self):
+        self.started_at = time.monotonic()
+        self.started.set()
+
+
+class RoutingLLM(BaseLLM):
+    """
+    依告警與觀測延遲選擇模型的 LLM 路由器 (執行緒安全)。
+
+    使用方式：
+        llm = RoutingLLM([
+            ModelRoute("gemini-flash", GeminiLLM(key, "gemini-1.5-flash"), tier=0),
+            ModelRoute("gpt-4o-mini", OpenAILLM(key, "gpt-4o-mini"), tier=0),
+            ModelRoute("gpt-4o", OpenAILLM(key, "gpt-4o"), tier=2),
+        ])
+        engine = MDRIntelligenceEngine(llm, system_prompt)
+    """
+
+    def __init__(self, routes: List[ModelRoute], severity_tiers: Optional[Dict[Severity, int]] = None,
+                 escalate_after: int = DEFAULT_ESCALATE_AFTER, timeout: float = DEFAULT_ROUTE_TIMEOUT,
+                 latency_budget: float = DEFAULT_LATENCY_BUDGET, failure_cooldown: float = DEFAULT_FAILURE_COOLDOWN,
+                 max_workers: int = DEFAULT_ROUTE_WORKERS, queue_timeout: float = DEFAULT_ROUTE_QUEUE_TIMEOUT):
+        if not routes:
+            raise ValueError("RoutingLLM 至少需要一個 ModelRoute")
+        self.routes = routes
+        self.severity_tiers = severity_tiers or DEFAULT_SEVERITY_TIERS
+        self.escalate_after = escalate_after
+        # timeout 由模型呼叫實際開始執行時起算；排隊時間另以 queue_timeout 限制且不計入模型延遲統計
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.latency_budget = latency_budget
+        self.failure_cooldown = failure_cooldown
+
+        self._max_tier = max(route.tier for route in routes)
+        self._stats: Dict[str, _RouteStats] = {route.name: _RouteStats() for route in routes}
+        self._lock = threading.Lock()
+        # 以獨立執行緒呼叫供應商，才能在逾時時切換 (逾時的請求會在背景自行結束)。
+        # max_workers 應不小於同時呼叫 chat 的執行緒數 (例如 investigate_many 的 concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mdr-llm-route")
+
+    # ===== 模型選擇 =====
+
+    def target_tier(self, severity: Optional[Severity] = None, iteration: int = 0) -> int:
+        tier = self.severity_tiers.get(severity, 1) if severity is not None else 1
+        if self.escalate_after and iteration > self.escalate_after:
+            tier += 1
+        return min(tier, self._max_tier)
+
+    def candidates(self, severity: Optional[Severity] = None, iteration: int = 0) -> List[ModelRoute]:
+        """
+        依優先順序回傳候選模型：
+        等級 >= 目標等級者由近到遠，其後為較低等級 (最後手段)；同等級中健康且延遲低者優先。
+        """
+        tier = self.target_tier(severity, iteration)
+        now = time.time()
+
+        def sort_key(route: ModelRoute):
+            stats = self._stats[route.name]
+            tier_rank = route.tier - tier if route.tier >= tier else self._max_tier + (tier - route.tier)
+            degraded = (now - stats.last_failure < self.failure_cooldown
+                        or (stats.latency is not None and stats.latency > self.latency_budget))
+            return (degraded, tier_rank, stats.latency if stats.latency is not None else 0.0)
+
+        with self._lock:
+            return sorted(self.routes, key=sort_key)
+
+    def for_session(self, session: Any) -> BaseLLM:
+        return _SessionRoute(self, session)
+
+    # ===== 呼叫與容錯 =====
+
+    def _record(self, route: ModelRoute, elapsed: Optional[float]):
+        with self._lock:
+            stats = self._stats[route.name]
+            if elapsed is None:
+                stats.record_failure(time.time())
+            else:
+                stats.record_success(elapsed)
+
+    def _call_route(self, call: _RouteCall, llm: BaseLLM, messages: List[Dict[str, Any]],
+                    tools: Optional[List[Dict[str, Any]]]) -> Any:
+        call.mark_started()
+        return llm.chat(messages, tools)
+
+    def _wait_started(self, call: _RouteCall, future: Future) -> None:
+        """等待模型呼叫開始執行；工作池排隊過久時取消並拋出 TimeoutError (不計入該模型的健康統計)"""
+        if call.started.wait(max(self.queue_timeout - (time.monotonic() - call.submitted_at), 0)):
+            return
+        if future.cancel():
+            raise TimeoutError(f"路由工作池忙碌，模型呼叫排隊逾時 ({self.queue_timeout}s)")
+        # cancel 失敗代表呼叫剛好開始執行
+        call.started.wait()
+
+    def route_chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                   severity: Optional[Severity] = None, iteration: int = 0, session: Any = None) -> Any:
+        last_error: Optional[Exception] = None
+        for route in self.candidates(severity, iteration):
+            llm = route.llm.for_session(session) if session is not None else route.llm
+            call = _RouteCall()
+            future = self._executor.submit(self._call_route, call, llm, messages, tools)
+            self._wait_started(call, future)
+            try:
+                response = future.result(timeout=max(self.timeout - (time.monotonic() - call.started_at), 0))
+            except FutureTimeoutError:
+                last_error = TimeoutError(f"{route.name} 回應逾時 ({self.timeout}s)")
+            except Exception as e:
+                last_error = e
+            else:
+                self._record(route, time.monotonic() - call.started_at)
+                return response
+
+            self._record(route, None)
+            logger.warning(f"模型 {route.name} 呼叫失敗，切換下一個候選模型: {str(last_error)}")
+        raise last_error
+
+    def route_chat_stream(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                          severity: Optional[Severity] = None, iteration: int = 0,
+                          session: Any = None) -> Iterator[StreamEvent]:
+        """
+        串流版本：只在尚未送出任何事件前切換模型 (已輸出的片段無法撤回)。
+        """
+        last_error: Optional[Exception] = None
+        for route in self.candidates(severity, iteration):
+            llm = route.llm.for_session(session) if session is not None else route.llm
+            started = time.monotonic()
+            emitted = False
+            try:
+                with closing(llm.chat_stream(messages, tools=tools)) as events:
+                    for event in events:
+                        emitted = True
+                        yield event
+            except Exception as e:
+                self._record(route, None)
+                if emitted:
+                    raise
+                last_error = e
+                logger.warning(f"模型 {route.name} 串流失敗，切換下一個候選模型: {str(e)}")
+                continue
+            self._record(route, time.monotonic() - started)
+            return
+        raise last_error
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        return self.route_chat(messages, tools)
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        return self.route_chat_stream(messages, tools)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {"latency": s.latency, "calls": s.calls, "failures": s.failures}
+                for name, s in self._stats.items()
+            }
+
+
+class _SessionRoute(BaseLLM):
+    """綁定單一調查的路由視圖，每次呼叫時讀取告警嚴重程度與目前迭代次數"""
+
+    def __init__(self, router: RoutingLLM, session: Any):
+        self.router = router
+        self.session = session
+
+    def chat(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Any:
+        return self.router.route_chat(messages, tools, self.session.alert.severity, self.session.iterations, self.session)
+
+    def chat_stream(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> Iterator[StreamEvent]:
+        return self.router.route_chat_stream(messages, tools, self.session.alert.severity, self.session.iterations,
+                                             self.session)
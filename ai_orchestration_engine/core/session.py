@@ -0,0 +1,76 @@
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from adapter.core.schemas import MDRAlert
+
+class InvestigationSession:
+    """
+    單次調查的對話狀態。
+    每個調查擁有獨立的 history、Token 計數與工具結果，讓同一個引擎可同時處理多個調查。
+    """
+    def __init__(self, alert: MDRAlert, system_prompt: str):
+        self.alert = alert
+        self.history: List[Dict[str, Any]] = [
+            {"role": "system", "content": system_prompt}
+        ]
+        self.iterations = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # 以 ContextWindow 估算的累計輸入 Token (供應商未回報 usage 時仍可控管預算)
+        self.estimated_input_tokens = 0
+        self.tool_results: List[Dict[str, Any]] = []
+        self.result: Optional[str] = None
+        # 調查因例外中止時的錯誤訊息
+        self.error: Optional[str] = None
+        # 每輪 AI 回應中擷取的 (判定結果, 信心分數)
+        self.verdicts: List[Tuple[Optional[str], Optional[int]]] = []
+        # 非經完整調查循環結束時的原因 (Fast Path 規則名稱或 "early_exit")
+        self.resolved_by: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record_usage(self, response: Any) -> Optional[int]:
+        """
+        累計 LLM 回應中的 Token 用量 (若供應商有提供)。
+        
+        Returns:
+            本次回應的總 Token 數；供應商未提供時為 None
+        """
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        return prompt_tokens + completion_tokens
+
+    def add_tool_result(self, tool_call_id: str, name: str, content: str):
+        self.tool_results.append({"tool_call_id": tool_call_id, "name": name, "content": content})
+        self.history.append({
+            "role": "tool",
+            "tool_call_id": tool_call_id,
+            "name": name,
+            "content": content
+        })
+
+    def finish(self, result: str) -> str:
+        self.result = result
+        self.finished_at = time.time()
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "alert_id": self.alert.alert_id,
+            "iterations": self.iterations,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_input_tokens": self.estimated_input_tokens,
+            "tool_calls": len(self.tool_results),
+            "error": self.error,
+            "resolved_by": self.resolved_by,
+            "duration": (self.finished_at or time.time()) - self.started_at
+        }
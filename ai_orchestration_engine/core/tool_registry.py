@@ -19,7 +19,8 @@ class ToolRegistry:
             "list_processes",
             "isolate_host",
             "terminate_process",
-            "get_host_details"
+            "get_host_details",
+            "get_elided_value"
         ]
 
         for method_name in target_methods:
@@ -0,0 +1,21 @@
+"""
+Ingestion Service - 觸發器層
+
+主動輪詢外部告警來源 -> 過濾去重 -> 觸發 AI 調查。
+"""
+
+from .checkpoint import CheckpointStore
+from .clustering import AlertClusterer, ClusteringStage, Incident
+from .deduplication import AlertDeduplicator, alert_fingerprint
+from .scheduler import IngestionScheduler, PollTarget
+
+__all__ = [
+    'AlertDeduplicator',
+    'alert_fingerprint',
+    'AlertClusterer',
+    'ClusteringStage',
+    'Incident',
+    'CheckpointStore',
+    'IngestionScheduler',
+    'PollTarget',
+]
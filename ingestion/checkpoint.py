@@ -0,0 +1,74 @@
+"""
+Checkpoint Store - 告警擷取進度持久化
+
+以 SQLite 保存每個 (tenant_id, vendor) 的 last_check_time 與邊界告警 ID，
+服務重啟後可從上次的高水位接續輪詢。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+DEFAULT_DB_PATH = "ingestion_state.db"
+
+
+class CheckpointStore:
+    """執行緒安全的 SQLite Checkpoint 儲存"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                tenant_id TEXT NOT NULL,
+                vendor TEXT NOT NULL,
+                last_check_time TEXT,
+                boundary_ids TEXT NOT NULL DEFAULT '[]',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (tenant_id, vendor)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def load(self, tenant_id: str, vendor: str) -> Optional[Dict[str, Any]]:
+        """
+        讀取指定租戶/廠商的擷取進度。
+
+        Returns:
+            {"last_check_time": ..., "boundary_ids": [...]}，不存在時回傳 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_check_time, boundary_ids FROM checkpoints WHERE tenant_id = ? AND vendor = ?",
+                (tenant_id, vendor)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_check_time": row[0], "boundary_ids": json.loads(row[1])}
+
+    def save(self, tenant_id: str, vendor: str, cursor: Dict[str, Any]):
+        """寫入 (覆蓋) 指定租戶/廠商的擷取進度"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO checkpoints (tenant_id, vendor, last_check_time, boundary_ids, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (tenant_id, vendor) DO UPDATE SET
+                    last_check_time = excluded.last_check_time,
+                    boundary_ids = excluded.boundary_ids,
+                    updated_at = excluded.updated_at
+                """,
+                (tenant_id, vendor, cursor.get("last_check_time"),
+                 json.dumps(cursor.get("boundary_ids") or []), time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
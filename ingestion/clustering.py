@@ -0,0 +1,262 @@
+"""
+Alert Clustering - 告警聚合 (調查前處理)
+
+將同一租戶在滑動時間窗內、共享實體 (相同主機、檔案雜湊、使用者) 的告警合併為單一事件 (Incident)，
+每個事件只觸發一次 AI 調查。例如蠕蟲感染 200 台主機 (相同檔案雜湊) 只會產生一個事件。
+
+- 事件在最後一筆告警後 window_seconds 內沒有新告警時結案並送出調查
+- 持續有新告警的事件最多開啟 max_open_seconds，避免調查被無限延後
+"""
+
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from adapter.core.schemas import MDRAlert, MDREntity, EntityType, Severity
+
+DEFAULT_WINDOW_SECONDS = 120.0
+DEFAULT_MAX_OPEN_SECONDS = 600.0
+# to_alert 附帶的成員摘要與合併實體上限 (大型事件的 Prompt 大小不隨告警數成長)
+DEFAULT_MAX_RELATED_ALERTS = 20
+DEFAULT_MAX_ENTITIES_PER_TYPE = 25
+DEFAULT_CLUSTER_TYPES = frozenset({EntityType.HOST, EntityType.FILE, EntityType.USER})
+# 幾乎所有告警都會出現的系統帳號，若作為聚合依據會把不相關的告警串在一起
+DEFAULT_IGNORED_VALUES = frozenset({
+    "system", "nt authority\\system", "local service", "network service",
+    "nt authority\\local service", "nt authority\\network service", "root"
+})
+
+_SEVERITY_RANK = {
+    Severity.CRITICAL: 5,
+    Severity.HIGH: 4,
+    Severity.MEDIUM: 3,
+    Severity.LOW: 2,
+    Severity.INFO: 1
+}
+
+EntityKey = Tuple[str, str, str]
+
+
+class Incident:
+    """一組相關告警的聚合結果"""
+
+    def __init__(self, tenant_id: str, now: float):
+        self.incident_id = f"INC-{uuid.uuid4().hex[:12]}"
+        self.tenant_id = tenant_id
+        self.alerts: List[MDRAlert] = []
+        self.keys: Set[EntityKey] = set()
+        self.first_seen = now
+        self.last_seen = now
+
+    @property
+    def primary(self) -> MDRAlert:
+        """嚴重程度最高 (同級取最早) 的告警"""
+        best = self.alerts[0]
+        for alert in self.alerts[1:]:
+            if _SEVERITY_RANK.get(alert.severity, 0) > _SEVERITY_RANK.get(best.severity, 0):
+                best = alert
+        return best
+
+    def to_alert(self, max_related_alerts: int = DEFAULT_MAX_RELATED_ALERTS,
+                 max_entities_per_type: int = DEFAULT_MAX_ENTITIES_PER_TYPE) -> MDRAlert:
+        """
+        轉換為單一 MDRAlert 交給 AI 調查。
+        以主要告警為基礎，合併所有成員的實體 (每種類型最多 max_entities_per_type 個，主要告警的實體優先)，
+        並在 raw_data.related_alerts 附上最近 max_related_alerts 筆成員的摘要；
+        省略的數量記錄於 related_alerts_total 與 entities_omitted。
+        """
+        primary = self.primary
+        if len(self.alerts) == 1:
+            return primary
+
+        entities: List[MDREntity] = []
+        seen = set()
+        per_type: Dict[EntityType, int] = {}
+        omitted: Dict[str, int] = {}
+        for alert in [primary] + [a for a in self.alerts if a is not primary]:
+            for entity in alert.entities:
+                key = (entity.type, entity.value)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if per_type.get(entity.type, 0) >= max_entities_per_type:
+                    omitted[entity.type.value] = omitted.get(entity.type.value, 0) + 1
+                    continue
+                per_type[entity.type] = per_type.get(entity.type, 0) + 1
+                entities.append(entity)
+
+        others = [a for a in self.alerts if a is not primary]
+        recent = sorted(others, key=lambda a: a.timestamp)[-max_related_alerts:] if max_related_alerts > 0 else []
+        raw_data = dict(primary.raw_data)
+        raw_data["related_alerts"] = [
+            {
+                "alert_id": a.alert_id,
+                "title": a.title,
+                "severity": a.severity.value,
+                "timestamp": a.timestamp.isoformat(),
+                "hosts": [e.value for e in a.entities if e.type == EntityType.HOST][:max_entities_per_type]
+            }
+            for a in recent
+        ]
+        raw_data["related_alerts_total"] = len(others)
+        if omitted:
+            raw_data["entities_omitted"] = omitted
+
+        return primary.model_copy(update={
+            "alert_id": self.incident_id,
+            "title": f"{primary.title} (+{len(others)} related alerts)",
+            "entities": entities,
+            "raw_data": raw_data
+        })
+
+
+class AlertClusterer:
+    """
+    以實體為鍵的告警聚合器 (執行緒安全)。
+
+    使用方式：
+        clusterer = AlertClusterer()
+        clusterer.add(alert)
+        for incident in clusterer.pop_ready():
+            engine.investigate(incident.to_alert(), registry)
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, max_open_seconds: float = DEFAULT_MAX_OPEN_SECONDS,
+                 cluster_types: FrozenSet[EntityType] = DEFAULT_CLUSTER_TYPES,
+                 ignored_values: FrozenSet[str] = DEFAULT_IGNORED_VALUES):
+        self.window_seconds = window_seconds
+        self.max_open_seconds = max_open_seconds
+        self.cluster_types = cluster_types
+        self.ignored_values = ignored_values
+
+        self._incidents: Dict[str, Incident] = {}
+        self._index: Dict[EntityKey, str] = {}
+        self._lock = threading.Lock()
+
+        self.alerts_in = 0
+        self.incidents_out = 0
+
+    def _keys(self, alert: MDRAlert) -> Set[EntityKey]:
+        keys = set()
+        for entity in alert.entities:
+            value = entity.value.strip().lower()
+            if entity.type in self.cluster_types and value and value not in self.ignored_values:
+                keys.add((alert.tenant_id, entity.type.value, value))
+        return keys
+
+    def add(self, alert: MDRAlert, now: Optional[float] = None) -> Incident:
+        """
+        將告警加入 (或合併到) 相關事件。
+
+        Returns:
+            告警所屬的事件
+        """
+        now = time.time() if now is None else now
+        keys = self._keys(alert)
+
+        with self._lock:
+            self.alerts_in += 1
+            related_ids = {self._index[k] for k in keys if k in self._index}
+            related = [self._incidents[i] for i in related_ids]
+
+            if not related:
+                incident = Incident(alert.tenant_id, now)
+                self._incidents[incident.incident_id] = incident
+            else:
+                # 告警同時連結多個事件時，合併到最早開啟的事件
+                related.sort(key=lambda inc: inc.first_seen)
+                incident = related[0]
+                for other in related[1:]:
+                    self._merge(incident, other)
+
+            incident.alerts.append(alert)
+            incident.last_seen = now
+            incident.keys.update(keys)
+            for key in keys:
+                self._index[key] = incident.incident_id
+            return incident
+
+    def _merge(self, target: Incident, other: Incident):
+        target.alerts.extend(other.alerts)
+        target.keys.update(other.keys)
+        target.first_seen = min(target.first_seen, other.first_seen)
+        target.last_seen = max(target.last_seen, other.last_seen)
+        for key in other.keys:
+            self._index[key] = target.incident_id
+        del self._incidents[other.incident_id]
+
+    def pop_ready(self, now: Optional[float] = None, force: bool = False) -> List[Incident]:
+        """
+        取出已結案的事件 (時間窗內無新告警，或開啟時間達上限)。
+
+        Args:
+            now: 目前時間 (Unix timestamp)
+            force: 取出所有事件 (例如服務關閉時)
+        """
+        now = time.time() if now is None else now
+        ready = []
+        with self._lock:
+            for incident_id, incident in list(self._incidents.items()):
+                if (force
+                        or now - incident.last_seen >= self.window_seconds
+                        or now - incident.first_seen >= self.max_open_seconds):
+                    ready.append(incident)
+                    del self._incidents[incident_id]
+                    for key in incident.keys:
+                        if self._index.get(key) == incident_id:
+                            del self._index[key]
+            self.incidents_out += len(ready)
+        return sorted(ready, key=lambda inc: inc.first_seen)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "open_incidents": len(self._incidents),
+                "alerts_in": self.alerts_in,
+                "incidents_out": self.incidents_out,
+                "compression_ratio": self.alerts_in / self.incidents_out if self.incidents_out else 0.0
+            }
+
+
+class ClusteringStage:
+    """
+    Pipeline 階段：從告警佇列讀取 MDRAlert，聚合後將結案的 Incident 放入事件佇列。
+    """
+
+    def __init__(self, alert_queue: "queue.Queue[MDRAlert]", incident_queue: "queue.Queue[Incident]",
+                 clusterer: Optional[AlertClusterer] = None, flush_interval: float = 1.0):
+        self.alert_queue = alert_queue
+        self.incident_queue = incident_queue
+        self.clusterer = clusterer or AlertClusterer()
+        self.flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="mdr-clustering", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # 關閉時送出所有尚未結案的事件，避免告警遺失
+        self._emit(self.clusterer.pop_ready(force=True))
+
+    def _emit(self, incidents: Iterable[Incident]):
+        for incident in incidents:
+            self.incident_queue.put(incident)
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            timeout = max(next_flush - time.monotonic(), 0)
+            try:
+                self.clusterer.add(self.alert_queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_flush:
+                self._emit(self.clusterer.pop_ready())
+                next_flush = time.monotonic() + self.flush_interval
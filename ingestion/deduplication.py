@@ -0,0 +1,187 @@
+"""
+Alert Deduplication - 告警去重過濾器
+
+以告警指紋 md5(Title + Hostname + TenantID) 判斷同一告警是否在時間窗內重複出現，
+避免告警風暴時大量觸發 AI 調查。
+
+- O(1) 查詢：記憶體中以 OrderedDict 保存 {fingerprint: first_seen}
+- TTL 淘汰：超過時間窗的指紋自動移除
+- 記憶體上限：超過 max_entries 時淘汰最舊的指紋
+- 可選 SQLite 持久化：重啟後保留時間窗內的指紋 (寫入批次送出)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from adapter.core.schemas import MDRAlert, EntityType
+
+DEFAULT_WINDOW_SECONDS = 30 * 60
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_FLUSH_EVERY = 500
+
+
+def alert_fingerprint(alert: MDRAlert) -> str:
+    """計算告警指紋：md5(Title + Hostname + TenantID)"""
+    hostname = next((e.value for e in alert.entities if e.type == EntityType.HOST), "")
+    raw = f"{alert.title}|{hostname}|{alert.tenant_id}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+class AlertDeduplicator:
+    """
+    具備時間窗與容量上限的告警去重器 (執行緒安全)。
+
+    使用方式：
+        dedup = AlertDeduplicator(db_path="dedup.db")
+        if not dedup.is_duplicate(alert):
+            investigate(alert)
+
+    需要在告警確實被接受後才記錄時 (例如放入佇列可能失敗)，改用
+    is_duplicate(alert, record=False) 檢查，成功後再呼叫 record(alert)。
+    SQLite 寫入會累積後批次送出 (每 flush_every 筆或呼叫 flush()/close() 時)。
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 db_path: Optional[str] = None, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        # 依首次出現時間排序，最舊的項目位於開頭
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 尚未寫入 SQLite 的變更
+        self._pending_upserts: Dict[str, float] = {}
+        self._pending_deletes: Set[str] = set()
+
+        self.checked = 0
+        self.suppressed = 0
+        # evicted = 超過時間窗 (expired) + 超過容量上限而移除的指紋數
+        self.evicted = 0
+        self.expired = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_alerts (fingerprint TEXT PRIMARY KEY, first_seen REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._load()
+
+    def _load(self):
+        """從 SQLite 載入仍在時間窗內的指紋"""
+        cutoff = time.time() - self.window_seconds
+        self._conn.execute("DELETE FROM seen_alerts WHERE first_seen < ?", (cutoff,))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT fingerprint, first_seen FROM seen_alerts ORDER BY first_seen DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for fingerprint, first_seen in reversed(rows):
+            self._seen[fingerprint] = first_seen
+
+    def _remove(self, fingerprint: str):
+        if self._conn is not None:
+            self._pending_upserts.pop(fingerprint, None)
+            self._pending_deletes.add(fingerprint)
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._seen:
+            fingerprint, first_seen = next(iter(self._seen.items()))
+            if first_seen >= cutoff:
+                break
+            self._seen.popitem(last=False)
+            self._remove(fingerprint)
+            self.expired += 1
+            self.evicted += 1
+        while len(self._seen) > self.max_entries:
+            fingerprint, _ = self._seen.popitem(last=False)
+            self._remove(fingerprint)
+            self.evicted += 1
+
+    def is_duplicate(self, alert: MDRAlert, now: Optional[float] = None, record: bool = True) -> bool:
+        """
+        檢查告警是否為時間窗內的重複告警；非重複且 record=True 時記錄其指紋。
+
+        Args:
+            alert: 標準化告警
+            now: 檢查時間 (Unix timestamp)，預設為目前時間
+            record: 是否立即記錄新告警的指紋 (False 時需在接受告警後呼叫 record())
+
+        Returns:
+            True 表示重複 (應略過)，False 表示新告警
+        """
+        return self.check_fingerprint(alert_fingerprint(alert), now, record)
+
+    def record(self, alert: MDRAlert, now: Optional[float] = None):
+        """記錄已接受告警的指紋，之後時間窗內的相同告警視為重複"""
+        self.record_fingerprint(alert_fingerprint(alert), now)
+
+    def check_fingerprint(self, fingerprint: str, now: Optional[float] = None, record: bool = True) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            self.checked += 1
+            first_seen = self._seen.get(fingerprint)
+            if first_seen is not None and now - first_seen < self.window_seconds:
+                self.suppressed += 1
+                return True
+            if record:
+                self._record(fingerprint, now)
+            return False
+
+    def record_fingerprint(self, fingerprint: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._record(fingerprint, now)
+
+    def _record(self, fingerprint: str, now: float):
+        # 新告警或已過期：重新記錄 (移到最新位置)
+        self._seen.pop(fingerprint, None)
+        self._seen[fingerprint] = now
+        if self._conn is not None:
+            self._pending_deletes.discard(fingerprint)
+            self._pending_upserts[fingerprint] = now
+        self._expire(now)
+        if len(self._pending_upserts) + len(self._pending_deletes) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        if self._conn is None or not (self._pending_upserts or self._pending_deletes):
+            return
+        with self._conn:
+            if self._pending_deletes:
+                self._conn.executemany("DELETE FROM seen_alerts WHERE fingerprint = ?",
+                                       [(f,) for f in self._pending_deletes])
+            if self._pending_upserts:
+                self._conn.executemany("INSERT OR REPLACE INTO seen_alerts (fingerprint, first_seen) VALUES (?, ?)",
+                                       list(self._pending_upserts.items()))
+        self._pending_deletes.clear()
+        self._pending_upserts.clear()
+
+    def flush(self):
+        """將累積的指紋變更寫入 SQLite (例如每輪輪詢結束時)"""
+        with self._lock:
+            self._flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._seen),
+                "checked": self.checked,
+                "suppressed": self.suppressed,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "suppression_rate": self.suppressed / self.checked if self.checked else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,229 @@
+"""
+Ingestion Scheduler - 多租戶告警輪詢排程器
+
+同時輪詢所有已設定的 (tenant, vendor) 組合：
+- 每個目標各自以帶抖動 (Jitter) 的間隔排程，避免所有租戶同時打 API
+- 擷取進度保存於 CheckpointStore，重啟後從高水位接續
+- 標準化後的 MDRAlert 放入有界工作佇列；佇列滿時輪詢端會等待 (Backpressure)
+"""
+
+import heapq
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from adapter.core.factory import AdapterFactory
+from adapter.core.schemas import MDRAlert
+from .checkpoint import CheckpointStore
+from .clustering import ClusteringStage
+from .deduplication import AlertDeduplicator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 60.0
+DEFAULT_JITTER = 0.2
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_POLL_WORKERS = 32
+CHECKPOINT_EVERY = 100
+
+
+class PollTarget(BaseModel):
+    """單一輪詢目標 (一個租戶的一個廠商來源)"""
+    tenant_id: str
+    vendor: str
+    config: Dict[str, Any] = Field(default_factory=dict)
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    page_size: int = 100
+    # 尚無 Checkpoint 時首次輪詢往回擷取的秒數 (None 表示使用 Adapter 的預設值)
+    initial_lookback: Optional[float] = None
+
+
+class IngestionScheduler:
+    """
+    告警輪詢排程器。
+
+    使用方式：
+        scheduler = IngestionScheduler(targets, CheckpointStore("state.db"))
+        scheduler.start()
+        alert = scheduler.work_queue.get()
+    """
+
+    def __init__(self, targets: List[PollTarget], checkpoint_store: CheckpointStore,
+                 work_queue: Optional["queue.Queue[MDRAlert]"] = None,
+                 max_workers: int = DEFAULT_POLL_WORKERS, jitter: float = DEFAULT_JITTER,
+                 deduplicator: Optional[AlertDeduplicator] = None):
+        self.targets = targets
+        self.checkpoints = checkpoint_store
+        self.deduplicator = deduplicator
+        self.work_queue = work_queue if work_queue is not None else queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        self.jitter = jitter
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mdr-poll")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+
+        self.stats = {"polls": 0, "poll_errors": 0, "alerts_enqueued": 0, "alerts_suppressed": 0}
+        self._stats_lock = threading.Lock()
+
+    def _incr(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # ===== 生命週期 =====
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="mdr-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+
+    # ===== 排程迴圈 =====
+
+    def _next_delay(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _run(self):
+        now = time.monotonic()
+        # 初次執行時間分散在一個週期內，避免啟動時全部目標同時輪詢
+        schedule = [(now + random.uniform(0, t.poll_interval), i) for i, t in enumerate(self.targets)]
+        heapq.heapify(schedule)
+
+        while not self._stop.is_set() and schedule:
+            run_at, index = schedule[0]
+            wait = run_at - time.monotonic()
+            if wait > 0:
+                self._stop.wait(min(wait, 1.0))
+                continue
+
+            heapq.heappop(schedule)
+            target = self.targets[index]
+            with self._in_flight_lock:
+                # 上一輪尚未結束 (例如佇列滿) 時不重複送出
+                if index not in self._in_flight:
+                    self._in_flight.add(index)
+                    self._executor.submit(self._poll_target, index, target)
+            heapq.heappush(schedule, (time.monotonic() + self._next_delay(target.poll_interval), index))
+
+    # ===== 單一目標輪詢 =====
+
+    def _poll_target(self, index: int, target: PollTarget):
+        try:
+            self.poll_once(target)
+        except Exception as e:
+            # 單一租戶失敗不影響其他租戶
+            self._incr("poll_errors")
+            logger.error(f"[{target.tenant_id}/{target.vendor}] 輪詢失敗: {str(e)}")
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(index)
+
+    def poll_once(self, target: PollTarget) -> int:
+        """
+        對單一目標執行一次輪詢，並將新告警放入工作佇列。
+
+        Returns:
+            本次放入佇列的告警數
+        """
+        # 以租約借用快取中的 Adapter，輪詢期間被淘汰也不會被關閉
+        with AdapterFactory.lease(target.vendor, target.tenant_id, target.config) as adapter:
+            return self._poll_adapter(target, adapter)
+
+    def _poll_adapter(self, target: PollTarget, adapter: Any) -> int:
+        if not hasattr(adapter, "iter_alerts"):
+            logger.warning(f"[{target.tenant_id}/{target.vendor}] Adapter 不支援 iter_alerts，略過")
+            return 0
+
+        cursor = self.checkpoints.load(target.tenant_id, target.vendor)
+        if cursor is not None:
+            adapter.alert_cursor = cursor
+
+        self._incr("polls")
+        logger.info(f"[{target.tenant_id}/{target.vendor}] Polling cycle started (since={cursor and cursor.get('last_check_time')})")
+
+        count = 0
+        processed = 0
+        # iter_alerts 在 yield 前就已推進 adapter 的游標，因此只保存「已被接受的告警」之後的游標快照，
+        # 被拒絕 (服務停止) 的告警不會寫入 Checkpoint，下次輪詢仍會重新擷取 (At-least-once)
+        committed = adapter.alert_cursor
+        try:
+            options: Dict[str, Any] = {"page_size": target.page_size}
+            if cursor is None and target.initial_lookback is not None:
+                options["initial_lookback"] = target.initial_lookback
+            for alert in adapter.iter_alerts(**options):
+                # 指紋在告警成功放入佇列後才記錄，被拒絕的告警下次輪詢不會被誤判為重複
+                if self.deduplicator is not None and self.deduplicator.is_duplicate(alert, record=False):
+                    self._incr("alerts_suppressed")
+                elif self._enqueue(alert):
+                    if self.deduplicator is not None:
+                        self.deduplicator.record(alert)
+                    count += 1
+                else:
+                    break
+                committed = adapter.alert_cursor
+                processed += 1
+                if processed % CHECKPOINT_EVERY == 0:
+                    self.checkpoints.save(target.tenant_id, target.vendor, committed)
+        finally:
+            # 擷取中途失敗或停止時，Adapter (快取中重用) 的游標回到最後接受的位置
+            adapter.alert_cursor = committed
+            if self.deduplicator is not None:
+                self.deduplicator.flush()
+            if processed or cursor is None:
+                self.checkpoints.save(target.tenant_id, target.vendor, committed)
+        self._incr("alerts_enqueued", count)
+        logger.info(f"[{target.tenant_id}/{target.vendor}] Polling cycle finished: {count} alerts")
+        return count
+
+    def _enqueue(self, alert: MDRAlert) -> bool:
+        """阻塞式放入佇列 (Backpressure)，服務停止時回傳 False"""
+        while not self._stop.is_set():
+            try:
+                self.work_queue.put(alert, timeout=1.0)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def load_targets(path: str) -> List[PollTarget]:
+    """從 JSON 檔案載入輪詢目標列表"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [PollTarget(**item) for item in json.load(f)]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    if len(sys.argv) < 2:
+        print("Usage: python -m ingestion.scheduler <targets.json> [state.db]")
+        sys.exit(1)
+
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "ingestion_state.db"
+    store = CheckpointStore(db_path)
+    scheduler = IngestionScheduler(load_targets(sys.argv[1]), store, deduplicator=AlertDeduplicator(db_path=db_path))
+    # 去重後的告警先聚合為 Incident，每個 Incident 只觸發一次調查
+    incidents = queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+    clustering = ClusteringStage(scheduler.work_queue, incidents)
+    scheduler.start()
+    clustering.start()
+    try:
+        while True:
+            alert = incidents.get().to_alert()
+            logger.info(f"MDRAlert(id={alert.alert_id}, title={alert.title})")
+    except KeyboardInterrupt:
+        scheduler.stop()
+        clustering.stop()
+        store.close()
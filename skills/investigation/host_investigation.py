@@ -6,32 +6,41 @@ Host Investigation Skills - 主機調查劇本
 
 from typing import Dict, Any
 from adapter.core.base_adapter import BaseAdapter
+from ..parallel import run_parallel, DEFAULT_SKILL_TIMEOUT
 
 
-def deep_investigate_host(adapter: BaseAdapter, hostname: str) -> Dict[str, Any]:
+def deep_investigate_host(adapter: BaseAdapter, hostname: str, timeout: float = DEFAULT_SKILL_TIMEOUT) -> Dict[str, Any]:
     """
     [Skill] 深度調查主機。
     這是一個複合劇本，一次執行多個動作並彙整結果，以節省 AI Token。
+    主機資訊與行程清單會並行查詢；任一分支失敗或逾時時仍回傳其餘結果。
     
     Args:
         adapter: Adapter 實例（可以是任何廠商的 Adapter）
         hostname: 目標主機名稱
+        timeout: 劇本整體期限（秒）
         
     Returns:
-        包含主機資訊、可疑行程、告警摘要的字典
+        包含主機資訊、可疑行程、告警摘要的字典（失敗分支列於 errors）
     """
     results = {
         "host_info": None,
         "suspicious_processes": [],
         "recent_alerts": [],
-        "summary": ""
+        "summary": "",
+        "errors": {}
     }
     
-    # 1. 獲取主機基本資產資訊
-    results["host_info"] = adapter.get_host_details(hostname)
+    # 1. 並行獲取主機基本資產資訊與行程清單
+    branches, errors = run_parallel({
+        "host_info": lambda: adapter.get_host_details(hostname),
+        "processes": lambda: adapter.list_processes(hostname)
+    }, timeout=timeout)
+    results["host_info"] = branches.get("host_info")
+    results["errors"] = errors
     
-    # 2. 獲取行程清單並過濾可疑項目 (清洗邏輯在地端跑)
-    all_processes = adapter.list_processes(hostname)
+    # 2. 過濾可疑行程 (清洗邏輯在地端跑)
+    all_processes = branches.get("processes") or []
     # 簡單過濾邏輯：無簽章或在下載目錄執行 (這只是範例，實際會更複雜)
     for p in all_processes:
         is_suspicious = False
@@ -44,31 +53,36 @@ def deep_investigate_host(adapter: BaseAdapter, hostname: str) -> Dict[str, Any]
     results["summary"] = f"主機 {hostname} 目前有 {len(results['suspicious_processes'])} 個可疑行程在執行中。"
     if results["suspicious_processes"]:
         results["summary"] += " 建議檢查網路連線或進行隔離。"
+    if errors:
+        results["summary"] += f" 部分資料取得失敗: {', '.join(errors)}。"
         
     return results
 
 
-def triage_alert(adapter: BaseAdapter, raw_alert: Dict[str, Any]) -> Dict[str, Any]:
+def triage_alert(adapter: BaseAdapter, raw_alert: Dict[str, Any], timeout: float = DEFAULT_SKILL_TIMEOUT) -> Dict[str, Any]:
     """
     [Skill] 告警初篩。
-    自動富化告警中的主機與檔案資訊。
+    自動富化告警中的主機與檔案資訊；所有主機查詢並行送出。
     
     Args:
         adapter: Adapter 實例
         raw_alert: 原始告警資料
+        timeout: 劇本整體期限（秒）
         
     Returns:
-        包含標準化告警與富化資訊的字典
+        包含標準化告警與富化資訊的字典（查詢失敗的主機列於 errors）
     """
     normalized = adapter.normalize_alert(raw_alert)
     entities = normalized.entities
     
-    enrichments = {}
-    for entity in entities:
-        if entity.type == "HOST":
-            enrichments[entity.value] = adapter.get_host_details(entity.value)
+    hostnames = {entity.value for entity in entities if entity.type == "HOST"}
+    enrichments, errors = run_parallel(
+        {host: (lambda h=host: adapter.get_host_details(h)) for host in hostnames},
+        timeout=timeout
+    )
             
     return {
         "normalized_alert": normalized.dict(),
-        "enrichments": enrichments
+        "enrichments": enrichments,
+        "errors": errors
     }
@@ -0,0 +1,77 @@
+"""
+Parallel Execution - 劇本並行執行工具
+
+讓複合式劇本將彼此獨立的廠商 API 呼叫並行送出，
+整體耗時取決於最慢的呼叫，而非所有呼叫的總和。
+共用執行緒池於程序結束時自動關閉；需要自行管理生命週期的呼叫端可傳入自己的 executor。
+"""
+
+import atexit
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 所有劇本共用的有界執行緒池 (避免大量並發調查耗盡廠商 API 連線)
+MAX_WORKERS = 16
+DEFAULT_SKILL_TIMEOUT = 60.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """取得共用的劇本執行緒池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="mdr-skill")
+    return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """關閉共用的劇本執行緒池 (下次 get_executor() 時重新建立)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+atexit.register(shutdown_executor)
+
+
+def run_parallel(tasks: Dict[str, Callable[[], Any]], timeout: float = DEFAULT_SKILL_TIMEOUT,
+                 executor: Optional[Executor] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    並行執行多個獨立任務，並在期限內收集結果。
+
+    Args:
+        tasks: {任務名稱: 無參數函數}
+        timeout: 整體期限 (秒)，逾時的任務視為失敗
+        executor: 呼叫端自行管理的執行緒池；未指定時使用共用執行緒池
+
+    Returns:
+        (results, errors)：成功任務的結果與失敗任務的錯誤訊息
+    """
+    if not tasks:
+        return {}, {}
+
+    executor = executor or get_executor()
+    futures = {name: executor.submit(func) for name, func in tasks.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, future in futures.items():
+        if not future.done():
+            # 執行中的呼叫無法中斷，僅放棄等待其結果
+            future.cancel()
+            errors[name] = f"Timed out after {timeout}s"
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+
+    return results, errors
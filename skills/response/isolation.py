@@ -21,8 +21,8 @@ def isolate_endpoint(tenant_id: str, vendor: str, config: Dict[str, Any], hostna
     Returns:
         隔離操作的執行結果
     """
-    adapter = AdapterFactory.get_adapter(vendor, tenant_id, config)
-    result = adapter.isolate_host(hostname)
+    with AdapterFactory.lease(vendor, tenant_id, config) as adapter:
+        result = adapter.isolate_host(hostname)
     return result.dict()
 
 
@@ -39,14 +39,14 @@ def unisolate_endpoint(tenant_id: str, vendor: str, config: Dict[str, Any], host
     Returns:
         解除隔離操作的執行結果
     """
-    adapter = AdapterFactory.get_adapter(vendor, tenant_id, config)
-    # 注意：這裡假設 BaseAdapter 有 unisolate_host 方法
-    # 如果沒有，需要先在 BaseAdapter 中定義
-    if hasattr(adapter, 'unisolate_host'):
-        result = adapter.unisolate_host(hostname)
-        return result.dict()
-    else:
-        return {
-            "success": False,
-            "message": f"Vendor {vendor} does not support unisolate operation"
-        }
+    with AdapterFactory.lease(vendor, tenant_id, config) as adapter:
+        # 注意：這裡假設 BaseAdapter 有 unisolate_host 方法
+        # 如果沒有，需要先在 BaseAdapter 中定義
+        if hasattr(adapter, 'unisolate_host'):
+            result = adapter.unisolate_host(hostname)
+            return result.dict()
+        else:
+            return {
+                "success": False,
+                "message": f"Vendor {vendor} does not support unisolate operation"
+            }
@@ -18,6 +18,11 @@ def get_adapter_for_tenant(tenant_id: str, vendor: str, config: Dict[str, Any]):
     return AdapterFactory.get_adapter(vendor, tenant_id, config)
 
 
+def lease_adapter_for_tenant(tenant_id: str, vendor: str, config: Dict[str, Any]):
+    """借用指定租戶的 Adapter (with 區塊結束時歸還，期間被快取淘汰也不會被關閉)"""
+    return AdapterFactory.lease(vendor, tenant_id, config)
+
+
 # ===== 封裝工具函數（供 AI 調用）=====
 
 def investigate_host_tool(tenant_id: str, vendor: str, config: Dict[str, Any], hostname: str):
@@ -29,8 +34,8 @@ def investigate_host_tool(tenant_id: str, vendor: str, config: Dict[str, Any], h
     2. 列出所有行程並過濾可疑項目
     3. 彙整分析結果
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    return deep_investigate_host(adapter, hostname)
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        return deep_investigate_host(adapter, hostname)
 
 
 def triage_alert_tool(tenant_id: str, vendor: str, config: Dict[str, Any], raw_alert: Dict[str, Any]):
@@ -42,8 +47,8 @@ def triage_alert_tool(tenant_id: str, vendor: str, config: Dict[str, Any], raw_a
     2. 提取實體（主機、IP、檔案等）
     3. 富化實體資訊
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    return triage_alert(adapter, raw_alert)
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        return triage_alert(adapter, raw_alert)
 
 
 def list_endpoint_processes_tool(tenant_id: str, vendor: str, config: Dict[str, Any], hostname: str):
@@ -52,9 +57,9 @@ def list_endpoint_processes_tool(tenant_id: str, vendor: str, config: Dict[str,
     
     這是一個原子工具，只執行單一動作。
     """
-    adapter = get_adapter_for_tenant(tenant_id, vendor, config)
-    processes = adapter.list_processes(hostname)
-    return [p.dict() for p in processes]
+    with lease_adapter_for_tenant(tenant_id, vendor, config) as adapter:
+        processes = adapter.list_processes(hostname)
+        return [p.dict() for p in processes]
 
 
 # ===== 註冊所有工具 =====
@@ -0,0 +1,106 @@
+"""
+測試共用的替身 (Fakes)
+
+各 verify_*.py 以 `from fakes import ...` 引用 (執行腳本時 tests/ 目錄位於 sys.path)。
+"""
+
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from adapter.core.schemas import EntityType, MDRAlert, MDREntity, Severity
+from ai_orchestration_engine.core.models import BaseLLM
+
+
+def make_alert(alert_id: str = "A-1", tenant_id: str = "T", severity: Severity = Severity.HIGH,
+               title: str = "Suspicious PowerShell", **entities) -> MDRAlert:
+    """建立測試告警；實體以類型為參數名稱，值可為單一值或清單 (例如 host=["PC-01", "PC-02"])"""
+    values = [MDREntity(type=EntityType[name.upper()], value=value)
+              for name, items in entities.items() for value in (items if isinstance(items, list) else [items])]
+    return MDRAlert(alert_id=alert_id, vendor="Fidelis", tenant_id=tenant_id, timestamp=datetime(2026, 1, 18, 9, 0),
+                    severity=severity, title=title, entities=values)
+
+
+def call(call_id: str, name: str, **args) -> SimpleNamespace:
+    """OpenAI 格式的 tool_call"""
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def reply(content: Optional[str] = None, tool_calls: Optional[List[Any]] = None) -> SimpleNamespace:
+    """OpenAI 格式的 chat 回應"""
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class ScriptedLLM(BaseLLM):
+    """依序回傳預先指定的回應，並記錄呼叫次數與每次收到的對話"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.seen = []
+
+    def chat(self, messages, tools=None):
+        self.calls += 1
+        self.seen.append([dict(m) for m in messages])
+        return self.responses.pop(0)
+
+
+class StubResponse:
+    """requests.Response 替身；lines 為串流時 iter_lines() 逐行送出的內容 (每行間隔 delay 秒)"""
+
+    def __init__(self, status_code: int = 200, payload: Any = None, headers: Optional[dict] = None,
+                 lines: Iterable[bytes] = (), delay: float = 0.0):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.headers = headers or {}
+        self.text = json.dumps(self.payload)
+        self.lines = list(lines)
+        self.delay = delay
+        self.closed = False
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def iter_lines(self):
+        for line in self.lines:
+            time.sleep(self.delay)
+            yield line
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StubSession:
+    """requests.Session 替身：依序回傳 responses (或由 handler(method, url, kwargs) 產生)，並記錄每個請求"""
+
+    def __init__(self, responses: Iterable[StubResponse] = (), handler: Optional[Callable] = None):
+        self.responses = list(responses)
+        self.handler = handler
+        self.sent: List[Dict[str, Any]] = []
+
+    def request(self, method, url, **kwargs):
+        self.sent.append(dict(kwargs, method=method, url=url))
+        if self.handler is not None:
+            return self.handler(method, url, kwargs)
+        return self.responses.pop(0)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
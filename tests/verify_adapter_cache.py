@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.adapter_cache import AdapterCache
+from adapter.core.factory import AdapterFactory
+
+ASYNC_CONFIG = {
+    "server_url": "https://fidelis-cache.invalid", "username": "u", "password": "p",
+    "fidelis_isolate_script_id": "iso", "fidelis_terminate_process_script_id": "term"
+}
+
+
+class StubClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubAdapter:
+    """只需要 close() 的 Adapter 替身 (預設行為與 BaseAdapter.close 相同：關閉自有的 client)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.client = StubClient()
+
+    def close(self):
+        self.client.close()
+
+
+def verify_evicted_adapters_are_closed():
+    """LRU 淘汰、TTL 過期、invalidate 與同 Key 覆寫時，沒有人借用的 Adapter 都要 close()"""
+    cache = AdapterCache(max_size=2, ttl_seconds=60)
+    a, b, c = StubAdapter("a"), StubAdapter("b"), StubAdapter("c")
+    cache.put(("V", "T1", "x"), a)
+    cache.put(("V", "T2", "x"), b)
+    with cache.lease(("V", "T1", "x"), lambda: None) as leased:
+        assert leased is a
+    cache.put(("V", "T3", "x"), c)
+    assert b.client.closed and not a.client.closed
+
+    replacement = StubAdapter("a2")
+    cache.put(("V", "T1", "x"), replacement)
+    assert a.client.closed
+
+    assert cache.invalidate(tenant_id="T3") == 1
+    assert c.client.closed
+
+    cache.ttl_seconds = 0.01
+    time.sleep(0.02)
+    with cache.lease(("V", "T1", "x"), lambda: StubAdapter("a3")) as leased:
+        assert leased.name == "a3"
+    assert replacement.client.closed
+    print("✅ 沒有人借用的 Adapter 被移出時皆已關閉")
+
+
+def verify_leased_adapters_stay_open():
+    """借用中的 Adapter 被淘汰時延後到歸還才關閉；無租約交出的 Adapter 不由快取關閉"""
+    cache = AdapterCache(max_size=1, ttl_seconds=60)
+    with cache.lease(("V", "T1", "x"), lambda: StubAdapter("a")) as a:
+        cache.put(("V", "T2", "x"), StubAdapter("b"))
+        assert not a.client.closed and cache.stats()["leased"] == 1
+    assert a.client.closed and cache.stats()["leased"] == 0
+
+    shared = cache.get_or_create(("V", "T3", "x"), lambda: StubAdapter("shared"))
+    cache.put(("V", "T4", "x"), StubAdapter("d"))
+    assert not shared.client.closed
+    print("✅ 借用中的 Adapter 歸還後才關閉")
+
+
+def verify_atomic_get_or_create():
+    """同一 Key 並行取得時只建立一次 Adapter；建立失敗時等待者收到相同的錯誤"""
+    cache = AdapterCache()
+    created = []
+
+    def factory():
+        time.sleep(0.05)
+        created.append(StubAdapter("a"))
+        return created[-1]
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(cache.get_or_create(("V", "T", "x"), factory)))
+               for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(created) == 1 and all(r is created[0] for r in results)
+    assert cache.stats()["misses"] == 1
+
+    def failing():
+        time.sleep(0.05)
+        raise ConnectionError("login failed")
+
+    errors = []
+
+    def attempt():
+        try:
+            cache.get_or_create(("V", "T-BAD", "x"), failing)
+        except ConnectionError as e:
+            errors.append(str(e))
+
+    workers = [threading.Thread(target=attempt) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert errors == ["login failed"] * 3
+    print("✅ 同一 Key 並行取得只建立一次 Adapter")
+
+
+def verify_async_adapters_cached_per_loop():
+    """非同步 Adapter 依事件迴圈快取；不同事件迴圈各自建立"""
+    async def borrow():
+        first = AdapterFactory.get_async_adapter("Fidelis", "T-ASYNC-CACHE", ASYNC_CONFIG)
+        async with AdapterFactory.async_lease("Fidelis", "T-ASYNC-CACHE", ASYNC_CONFIG) as leased:
+            assert leased is first
+        return first
+
+    one, two = asyncio.run(borrow()), asyncio.run(borrow())
+    assert one is not two
+    assert AdapterFactory.get_async_adapter("Fidelis", "T-ASYNC-CACHE", ASYNC_CONFIG) is not one
+    print("✅ 非同步 Adapter 依事件迴圈快取")
+
+
+if __name__ == "__main__":
+    verify_evicted_adapters_are_closed()
+    verify_leased_adapters_stay_open()
+    verify_atomic_get_or_create()
+    verify_async_adapters_cached_per_loop()
@@ -0,0 +1,101 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.factory import AdapterFactory
+
+CONFIG = {
+    "server_url": "https://fidelis-paging.invalid", "username": "u", "password": "p",
+    "fidelis_isolate_script_id": "iso", "fidelis_terminate_process_script_id": "term"
+}
+RAW_ALERTS = [
+    {"id": i, "name": f"Alert {i}", "severity": 3, "endpointName": f"PC-{i}",
+     "createDate": f"2026-01-18T09:00:{i:02d}Z"}
+    for i in range(1, 8)
+]
+
+
+class PagedHttp:
+    """取代 Client 的 _http_request：依 skip/take 回傳告警頁並記錄每次請求的參數"""
+
+    def __init__(self, alerts):
+        self.alerts = alerts
+        self.calls = []
+
+    def __call__(self, method, url_suffix, params=None, **kwargs):
+        self.calls.append(dict(params))
+        skip, take = params.get("skip", 0), params["take"]
+        return {"success": True, "data": {"entities": self.alerts[skip:skip + take]}}
+
+
+def make_adapter(alerts):
+    adapter = AdapterFactory.get_adapter("Fidelis", "T-PAGING", CONFIG)
+    adapter.client._http_request = PagedHttp(alerts)
+    adapter.high_water_mark, adapter._boundary_ids = None, set()
+    return adapter
+
+
+def verify_iter_alert_pages():
+    """逐頁以 skip/take 要求告警，回傳筆數少於 page_size 時停止；每頁於被讀取時才送出請求"""
+    adapter = make_adapter(RAW_ALERTS)
+    http = adapter.client._http_request
+    pages = adapter.client.iter_alert_pages(page_size=3, start_date="2026-01-18T09:00:00Z")
+    assert http.calls == []
+    first = next(pages)
+    assert [a["id"] for a in first] == [1, 2, 3] and len(http.calls) == 1
+
+    rest = list(pages)
+    assert [[a["id"] for a in page] for page in rest] == [[4, 5, 6], [7]]
+    assert [c.get("skip", 0) for c in http.calls] == [0, 3, 6]
+    assert all(c["take"] == 3 and c["sort"] == "createDate Ascending"
+               and c["startDate"] == "2026-01-18T09:00:00Z" for c in http.calls)
+
+    # 總數剛好是 page_size 的倍數時，多一次空頁請求後停止，不產生空頁
+    adapter = make_adapter(RAW_ALERTS[:6])
+    assert [len(page) for page in adapter.client.iter_alert_pages(page_size=3)] == [3, 3]
+    assert [c.get("skip", 0) for c in adapter.client._http_request.calls] == [0, 3, 6]
+    print("✅ Fidelis 告警依 skip/take 逐頁擷取")
+
+
+def verify_initial_lookback():
+    """尚無高水位時只往回擷取 initial_lookback 秒，不拉回整個告警歷史；設為 None 時擷取全部"""
+    adapter = make_adapter(RAW_ALERTS)
+    list(adapter.iter_alerts(page_size=10))
+    start = datetime.strptime(adapter.client._http_request.calls[0]["startDate"], "%Y-%m-%dT%H:%M:%SZ")
+    assert abs((datetime.utcnow() - start) - timedelta(days=1)) < timedelta(minutes=1)
+
+    adapter = make_adapter(RAW_ALERTS)
+    list(adapter.iter_alerts(page_size=10, initial_lookback=3600))
+    start = datetime.strptime(adapter.client._http_request.calls[0]["startDate"], "%Y-%m-%dT%H:%M:%SZ")
+    assert abs((datetime.utcnow() - start) - timedelta(hours=1)) < timedelta(minutes=1)
+
+    adapter = make_adapter(RAW_ALERTS)
+    adapter.initial_lookback = None
+    list(adapter.iter_alerts(page_size=10))
+    assert "startDate" not in adapter.client._http_request.calls[0]
+    print("✅ 首次輪詢只擷取 initial_lookback 時間窗內的告警")
+
+
+def verify_iter_alerts_streams_and_resumes():
+    """iter_alerts 逐筆產生標準化告警並推進高水位；下一輪從高水位接續且略過邊界上已處理的告警"""
+    adapter = make_adapter(RAW_ALERTS)
+    alerts = adapter.iter_alerts(page_size=2)
+    assert next(alerts).alert_id == "1"
+    assert len(adapter.client._http_request.calls) == 1
+    assert [a.alert_id for a in alerts] == ["2", "3", "4", "5", "6", "7"]
+    assert adapter.high_water_mark == "2026-01-18T09:00:07Z" and adapter._boundary_ids == {"7"}
+
+    # 下一輪 startDate 為包含邊界，API 會再次回傳告警 7，應被略過
+    adapter.client._http_request = PagedHttp(RAW_ALERTS[6:])
+    assert list(adapter.iter_alerts(page_size=2)) == []
+    assert adapter.client._http_request.calls[0]["startDate"] == "2026-01-18T09:00:07Z"
+    print("✅ iter_alerts 串流產生告警並從高水位接續")
+
+
+if __name__ == "__main__":
+    verify_iter_alert_pages()
+    verify_initial_lookback()
+    verify_iter_alerts_streams_and_resumes()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.async_base_adapter import SyncAdapterShim
+from adapter.core.token_manager import AsyncTokenManager
+from adapter.packs.Fidelis.async_adapter import AsyncFidelisAdapter
+from adapter.packs.Fidelis.async_client import AsyncFidelisEndpointClient
+
+CONFIG = {
+    "server_url": "https://fidelis-async.invalid", "username": "u", "password": "p",
+    "fidelis_isolate_script_id": "iso", "fidelis_terminate_process_script_id": "term"
+}
+
+
+class FidelisStub:
+    """以 httpx.MockTransport 模擬 Fidelis API；revoke_first 為 True 時第一個 API 請求回傳 401"""
+
+    def __init__(self, revoke_first=False):
+        self.logins = 0
+        self.requests = []
+        self.revoke_first = revoke_first
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/authenticate"):
+            self.logins += 1
+            return httpx.Response(200, json={"success": True, "data": {"token": f"token-{self.logins}"}})
+
+        self.requests.append((request.method, path, request.headers["Authorization"]))
+        if self.revoke_first:
+            self.revoke_first = False
+            return httpx.Response(401, json={"error": "token revoked"})
+        if "/endpoints/" in path:
+            host = json.loads(request.url.params["search"])["searchFields"][0]["values"][0]["value"]
+            return httpx.Response(200, json={"data": {"entities": [{"hostName": host, "ipAddress": f"10.0.0.{host[-1]}"}]}})
+        if path.endswith("/jobs/createTask"):
+            return httpx.Response(200, json={"data": f"job-{json.loads(request.content)['endpoints']}"})
+        if path.endswith("/v2/events"):
+            telemetry = json.dumps({"PID": 4242, "PPID": 4, "Name": "powershell.exe", "User": "CORP\\alice"})
+            return httpx.Response(200, json={"data": [{"telemetry": telemetry}, {"telemetry": telemetry}]})
+        return httpx.Response(404)
+
+
+def make_adapter(stub):
+    adapter = AsyncFidelisAdapter("T-ASYNC", CONFIG)
+    adapter.client.client = httpx.AsyncClient(transport=httpx.MockTransport(stub), timeout=5)
+    return adapter
+
+
+def verify_concurrent_async_calls():
+    """多個 coroutine 並行呼叫時只登入一次，所有請求共用同一個 AsyncClient"""
+    stub = FidelisStub()
+
+    async def run():
+        adapter = make_adapter(stub)
+        try:
+            return await asyncio.gather(*(adapter.isolate_host(f"PC-{i}") for i in range(1, 6)),
+                                        adapter.list_processes("PC-1"))
+        finally:
+            await adapter.aclose()
+
+    *results, processes = asyncio.run(run())
+    assert [r.status for r in results] == ["success"] * 5
+    assert results[2].data == {"hostname": "PC-3", "ip": "10.0.0.3", "job_id": "job-10.0.0.3"}
+    assert [p.pid for p in processes] == [4242]
+    assert stub.logins == 1
+    assert len(stub.requests) == 11 and all(auth == "Bearer token-1" for _, _, auth in stub.requests)
+    print("✅ 並行的非同步呼叫共用一次登入")
+
+
+def verify_async_401_replay():
+    """非同步 Client 收到 401 時重新登入並重送一次"""
+    stub = FidelisStub(revoke_first=True)
+
+    async def run():
+        adapter = make_adapter(stub)
+        try:
+            return await adapter.get_host_details("PC-7")
+        finally:
+            await adapter.aclose()
+
+    details = asyncio.run(run())
+    assert details == {"hostName": "PC-7", "ipAddress": "10.0.0.7"}
+    assert stub.logins == 2
+    assert [auth for _, _, auth in stub.requests] == ["Bearer token-1", "Bearer token-2"]
+    print("✅ 非同步 Client 收到 401 時更新 Token 後重送")
+
+
+def verify_static_key_async_401():
+    """靜態 API Key 的非同步 Client 收到 401 時不重送"""
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers["Authorization"])
+        return httpx.Response(401, json={"error": "invalid key"})
+
+    async def run():
+        client = AsyncFidelisEndpointClient("https://static.invalid", "u", "p")
+        client.token_manager = AsyncTokenManager.for_static_key("static-key")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            await client._http_request("GET", "/v3/healthcheck")
+        except httpx.HTTPStatusError as e:
+            return e.response.status_code
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == 401
+    assert sent == ["Bearer static-key"]
+    print("✅ 靜態 API Key 的非同步 Client 不重送 401")
+
+
+def verify_sync_shim():
+    """SyncAdapterShim 讓同步呼叫端使用非同步 Adapter (共用背景事件迴圈)"""
+    stub = FidelisStub()
+    shim = SyncAdapterShim(make_adapter(stub))
+    assert shim.isolate_host("PC-2").data["ip"] == "10.0.0.2"
+    assert shim.terminate_process("PC-2", 4242).status == "success"
+    assert stub.logins == 1
+    shim.close()
+    print("✅ SyncAdapterShim 以同步介面呼叫非同步 Adapter")
+
+
+if __name__ == "__main__":
+    verify_concurrent_async_calls()
+    verify_async_401_replay()
+    verify_static_key_async_401()
+    verify_sync_shim()
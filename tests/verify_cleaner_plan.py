@@ -0,0 +1,188 @@
+import os
+import random
+import re
+import sys
+import time
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.cleaner import (DataCleaner, DIAGNOSTIC_WHITELIST, ElidedValueStore, ProjectionProfile, SizeLimits,
+                                  get_elided_store, register_projections, register_whitelist)
+from adapter.core.pack_loader import PackLoader
+
+KEYS = ["id", "name", "Path", "links", "self", "hashSHA256", "userName", "telemetry", "eventType",
+        "commandLine", "severity", "extra", "nested", "items", "dest_ip", "createDate", "metadata_version"]
+
+
+def random_payload(rng: random.Random, depth: int = 0):
+    data = {}
+    for key in rng.sample(KEYS, rng.randint(0, 8)):
+        roll = rng.random()
+        if roll < 0.15:
+            data[key] = None
+        elif roll < 0.35 and depth < 3:
+            data[key] = random_payload(rng, depth + 1)
+        elif roll < 0.5 and depth < 3:
+            data[key] = [random_payload(rng, depth + 1) if rng.random() < 0.6 else rng.choice([1, "x", None])
+                         for _ in range(rng.randint(0, 3))]
+        else:
+            data[key] = rng.choice([0, 42, "value", "", True])
+    return data
+
+
+def legacy_optimize_for_ai(data, event_type="generic"):
+    """預編譯前的 optimize_for_ai (每次呼叫合併白名單並以子字串逐一比對)，作為比對基準"""
+    if not isinstance(data, dict):
+        return data
+    allowed_keys = DIAGNOSTIC_WHITELIST["generic"]
+    if event_type in DIAGNOSTIC_WHITELIST:
+        allowed_keys = allowed_keys.union(DIAGNOSTIC_WHITELIST[event_type])
+    optimized = {}
+    for k, v in data.items():
+        if any(key in k.lower() for key in allowed_keys):
+            if isinstance(v, dict):
+                optimized[k] = legacy_optimize_for_ai(v, event_type)
+            elif isinstance(v, list):
+                optimized[k] = [legacy_optimize_for_ai(i, event_type) if isinstance(i, dict) else i for i in v]
+            else:
+                optimized[k] = v
+    return optimized
+
+
+def verify_equivalence():
+    """optimize_for_ai 與 CleaningPlan.apply 的結果必須與預編譯前的實作完全相同"""
+    rng = random.Random(7)
+    payloads = [random_payload(rng) for _ in range(3000)]
+    for event_type in list(DIAGNOSTIC_WHITELIST) + ["unknown"]:
+        plan = DataCleaner.get_plan(event_type)
+        for payload in payloads:
+            assert DataCleaner.optimize_for_ai(payload, event_type) == legacy_optimize_for_ai(payload, event_type)
+            expected = legacy_optimize_for_ai(DataCleaner.clean_dict(payload), event_type=event_type)
+            actual = plan.apply(plan.mapper_view(payload))
+            assert actual == expected, f"[{event_type}] 結果不一致:\n{payload}\n{expected}\n{actual}"
+    print(f"✅ {len(payloads)} 筆隨機資料 x {len(DIAGNOSTIC_WHITELIST) + 1} 種事件類型結果一致")
+
+
+def verify_pack_whitelist():
+    """Pack 自訂白名單與預設白名單合併，且不影響其他 Pack"""
+    register_whitelist("VerifyPack", {"generic": ["EndpointName"], "process": ["parent"]})
+    payload = {"id": 1, "endpointName": "host-1", "parentCmd": "cmd", "noise": "x"}
+    assert DataCleaner.optimize_for_ai(payload, "process", profile="VerifyPack") == \
+        {"id": 1, "endpointName": "host-1", "parentCmd": "cmd"}
+    assert DataCleaner.optimize_for_ai(payload, "generic", profile="VerifyPack") == {"id": 1, "endpointName": "host-1"}
+    assert DataCleaner.optimize_for_ai(payload, "process") == {"id": 1, "endpointName": "host-1"}  # "name" 子字串
+    assert DataCleaner.optimize_for_ai(payload, "generic") == {"id": 1}
+    assert DataCleaner.optimize_for_ai(payload, "registry", profile="VerifyPack") == {"id": 1, "endpointName": "host-1"}
+    print("✅ Pack 自訂白名單")
+
+
+def verify_projection_profile():
+    """Pack 投影設定：路徑 include/exclude、長度上限，並取代該事件類型的白名單"""
+    register_projections("VerifyPack", {
+        "process": {
+            "include": ["id", "process.*", "**.sha256"],
+            "exclude": ["process.env"],
+            "max_list_length": 2,
+            "max_string_length": 5
+        },
+        "*": {"exclude": ["noise"]}
+    })
+    payload = {
+        "id": 7, "guid_list_hidden": [1, 2], "links": {"self": "x"},
+        "process": {"name": "powershell", "env": {"PATH": "C:"}, "args": ["-a", "-b", "-c"], "empty": None},
+        "parent": {"file": {"sha256": "abc", "size": 1}},
+        "children": [{"sha256": "def"}, {"pid": 1}]
+    }
+    plan = DataCleaner.get_plan("process", "VerifyPack")
+    assert plan.apply(payload) == {
+        "id": 7,
+        "process": {
+            "name": f"power <elided str len=10 ref={ElidedValueStore.digest('powershell')}>",
+            "args": ["-a", "-b", f"<elided list len=3 ref={ElidedValueStore.digest(['-a', '-b', '-c'])}>"]
+        },
+        "parent": {"file": {"sha256": "abc"}},
+        "children": [{"sha256": "def"}]
+    }, plan.apply(payload)
+    # optimize_for_ai 對有投影設定的 Pack 也必須可用，結果與投影相同
+    assert DataCleaner.optimize_for_ai(payload, "process", profile="VerifyPack") == plan.apply(payload)
+    fallback = DataCleaner.get_plan("file", "VerifyPack")
+    assert fallback.apply({"noise": 1, "a": {"b": None}, "c": 2}) == {"c": 2}
+    assert DataCleaner.optimize_for_ai({"noise": 1, "c": 2}, "file", profile="VerifyPack") == {"c": 2}
+    assert not isinstance(DataCleaner.get_plan("file"), ProjectionProfile)
+    print("✅ Pack 投影設定")
+
+
+def verify_pack_metadata_profiles():
+    """由 pack_metadata.json 載入的設定：告警使用白名單、host 工具結果使用投影，兩種入口結果一致"""
+    adapter_class = PackLoader().get_adapter_class("Fidelis")
+    assert adapter_class.cleaning_profile == "Fidelis"
+    host = {"hostName": "PC-01", "groups": list(range(80)), "links": {"self": "x"}, "os": None}
+    plan = DataCleaner.get_plan("host", "Fidelis")
+    assert isinstance(plan, ProjectionProfile)
+    projected = DataCleaner.optimize_for_ai(host, "host", "Fidelis")
+    assert projected == plan.apply(host)
+    assert projected["hostName"] == "PC-01" and len(projected["groups"]) == 51 and "links" not in projected
+
+    adapter = adapter_class.__new__(adapter_class)
+    adapter.cleaning_profile = adapter_class.cleaning_profile
+    assert adapter.project_for_ai(host, "host") == projected
+    # 未定義投影的事件類型：告警走白名單，工具結果只套用大小上限
+    assert not isinstance(DataCleaner.get_plan("process", "Fidelis"), ProjectionProfile)
+    assert DataCleaner.optimize_for_ai({"endpointName": "PC", "noise": 1}, "generic", "Fidelis") == {"endpointName": "PC"}
+    limited = adapter.project_for_ai(host, "process")
+    assert limited["links"] == {"self": "x"} and len(limited["groups"]) == 51
+    print("✅ pack_metadata.json 載入的白名單與投影設定")
+
+
+def verify_size_limits():
+    """超過上限的字串 / list / 深度以佔位字串取代，完整值可由 ref 取回"""
+    limits = SizeLimits(max_string_length=8, max_list_length=3, max_depth=2)
+    telemetry = "A" * 5000
+    data = {"telemetry": telemetry, "pids": list(range(1000)), "a": {"b": {"c": 1}}, "ok": [1, "short"]}
+    limited = limits.apply(data)
+    ref = re.search(r"ref=(\w+)", limited["telemetry"]).group(1)
+    assert limited["telemetry"].startswith("AAAAAAAA <elided str len=5000 ")
+    assert get_elided_store().get(ref) == telemetry
+    assert limited["pids"][:3] == [0, 1, 2] and limited["pids"][3].startswith("<elided list len=1000 ")
+    assert limited["a"]["b"].startswith("<elided dict len=1 ")
+    assert limited["ok"] is data["ok"]
+    assert data["telemetry"] == telemetry and len(data["pids"]) == 1000  # 不修改原始資料
+    print("✅ 大小上限與側存區")
+
+
+def benchmark():
+    rng = random.Random(11)
+    payloads = [random_payload(rng) for _ in range(20000)]
+    plan = DataCleaner.get_plan("process")
+
+    start = time.perf_counter()
+    for payload in payloads:
+        legacy_optimize_for_ai(payload, event_type="process")
+    legacy_optimize = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in payloads:
+        DataCleaner.optimize_for_ai(payload, event_type="process")
+    optimize = time.perf_counter() - start
+    print(f"optimize_for_ai: {legacy_optimize:.3f}s -> {optimize:.3f}s ({legacy_optimize / optimize:.1f}x)")
+
+    start = time.perf_counter()
+    for payload in payloads:
+        legacy_optimize_for_ai(DataCleaner.clean_dict(payload), event_type="process")
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in payloads:
+        plan.apply(plan.mapper_view(payload))
+    compiled = time.perf_counter() - start
+    print(f"clean_dict + optimize_for_ai: {legacy:.3f}s, CleaningPlan: {compiled:.3f}s ({legacy / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    verify_equivalence()
+    verify_pack_whitelist()
+    verify_projection_profile()
+    verify_pack_metadata_profiles()
+    verify_size_limits()
+    benchmark()
@@ -0,0 +1,95 @@
+import os
+import sys
+from datetime import timedelta
+
+# 將當前目錄加入 path 以便引用 ingestion
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.schemas import EntityType, Severity
+from fakes import make_alert
+from ingestion.clustering import AlertClusterer
+
+WORM_HASH = "e" * 64
+
+
+def verify_shared_entities_coalesce():
+    """相同檔案雜湊的告警合併為一個事件；不同租戶與系統帳號不作為聚合依據"""
+    clusterer = AlertClusterer(window_seconds=60)
+    first = clusterer.add(make_alert("1", host="PC-01", file=WORM_HASH), now=0)
+    assert clusterer.add(make_alert("2", host="PC-02", file=WORM_HASH.upper()), now=1) is first
+    assert clusterer.add(make_alert("3", severity=Severity.CRITICAL, title="Ransomware", host="PC-03", file=WORM_HASH), now=2) is first
+    assert clusterer.add(make_alert("4", tenant_id="OTHER", host="PC-01", file=WORM_HASH), now=2) is not first
+    assert clusterer.add(make_alert("5", host="PC-09", user="SYSTEM"), now=3) is not first
+    assert clusterer.add(make_alert("6", host="PC-10", user="SYSTEM"), now=3) is not first
+    assert clusterer.stats()["open_incidents"] == 4
+
+    alert = first.to_alert()
+    assert alert.alert_id == first.incident_id
+    assert alert.severity == Severity.CRITICAL
+    assert alert.title == "Ransomware (+2 related alerts)"
+    hosts = [e.value for e in alert.entities if e.type == EntityType.HOST]
+    assert hosts == ["PC-03", "PC-01", "PC-02"]
+    assert WORM_HASH in [e.value for e in alert.entities if e.type == EntityType.FILE]
+    assert [r["alert_id"] for r in alert.raw_data["related_alerts"]] == ["1", "2"]
+    print("✅ 共享實體的告警合併為單一事件")
+
+
+def verify_bridging_alert_merges_incidents():
+    """同時連結兩個事件的告警讓兩者合併到較早開啟的事件"""
+    clusterer = AlertClusterer(window_seconds=60)
+    early = clusterer.add(make_alert("1", host="PC-01"), now=0)
+    late = clusterer.add(make_alert("2", host="PC-02"), now=5)
+    merged = clusterer.add(make_alert("3", host=["PC-01", "PC-02"]), now=6)
+    assert merged is early and early is not late
+    assert [a.alert_id for a in merged.alerts] == ["1", "2", "3"]
+    assert clusterer.stats()["open_incidents"] == 1
+    assert clusterer.add(make_alert("4", host="PC-02"), now=7) is early
+    print("✅ 橋接告警合併多個事件")
+
+
+def verify_large_incident_is_capped():
+    """大型事件轉換為告警時只附帶最近 N 筆成員摘要與有限的實體，並記錄省略的數量"""
+    clusterer = AlertClusterer(window_seconds=60)
+    for i in range(1, 201):
+        alert = make_alert(str(i), host=f"PC-{i:03d}", file=WORM_HASH)
+        clusterer.add(alert.model_copy(update={"timestamp": alert.timestamp + timedelta(seconds=i)}), now=i)
+    incident = clusterer.pop_ready(force=True)[0]
+
+    alert = incident.to_alert(max_related_alerts=5, max_entities_per_type=10)
+    assert alert.title == "Suspicious PowerShell (+199 related alerts)"
+    assert [r["alert_id"] for r in alert.raw_data["related_alerts"]] == ["196", "197", "198", "199", "200"]
+    assert alert.raw_data["related_alerts_total"] == 199
+    hosts = [e.value for e in alert.entities if e.type == EntityType.HOST]
+    assert len(hosts) == 10 and hosts[0] == "PC-001"
+    assert [e.value for e in alert.entities if e.type == EntityType.FILE] == [WORM_HASH]
+    assert alert.raw_data["entities_omitted"] == {EntityType.HOST.value: 190}
+    print("✅ 大型事件的成員摘要與實體數量有上限")
+
+
+def verify_window_and_max_open():
+    """時間窗內無新告警才結案；持續有新告警的事件在 max_open_seconds 後強制送出"""
+    clusterer = AlertClusterer(window_seconds=60, max_open_seconds=300)
+    quiet = clusterer.add(make_alert("1", host="PC-01"), now=0)
+    busy = clusterer.add(make_alert("2", host="PC-02"), now=0)
+    for t in range(50, 300, 50):
+        clusterer.add(make_alert(f"b{t}", host="PC-02"), now=t)
+        ready = clusterer.pop_ready(now=t)
+        assert busy not in ready
+        if t >= 60:
+            assert quiet not in clusterer._incidents.values()
+    assert clusterer.pop_ready(now=300) == [busy]
+    assert len(busy.alerts) == 6
+
+    # 結案後的實體不再聚合到舊事件
+    assert clusterer.add(make_alert("3", host="PC-02"), now=301) is not busy
+    assert clusterer.pop_ready(now=302, force=True)[0].alerts[0].alert_id == "3"
+    stats = clusterer.stats()
+    assert stats["alerts_in"] == 8 and stats["incidents_out"] == 3
+    print("✅ 事件依時間窗結案，開啟時間達上限時強制送出")
+
+
+if __name__ == "__main__":
+    verify_shared_entities_coalesce()
+    verify_bridging_alert_merges_incidents()
+    verify_large_incident_is_capped()
+    verify_window_and_max_open()
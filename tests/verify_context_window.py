@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core.context import COMPACTED_PREFIX, ContextWindow, count_message_tokens
+from ai_orchestration_engine.core.engine import MDRIntelligenceEngine
+from fakes import ScriptedLLM, make_alert, reply
+
+
+def tool_turn(call_id, content):
+    assistant = {"role": "assistant", "content": None, "tool_calls": [
+        {"id": call_id, "type": "function", "function": {"name": "list_processes", "arguments": '{"hostname":"PC-01"}'}}]}
+    return [assistant, {"role": "tool", "tool_call_id": call_id, "name": "list_processes", "content": content}]
+
+
+def big_result(count=60):
+    return json.dumps({"hostname": "PC-01", "processes": [
+        {"pid": 1000 + i, "name": f"svc{i}.exe", "command_line": f"C:\\Windows\\svc{i}.exe -k netsvcs " + "x" * 40}
+        for i in range(count)]})
+
+
+def verify_old_tool_results_are_compacted():
+    """較舊回合的大型工具結果壓縮為摘要，最近一輪保持完整；壓縮不重複進行"""
+    history = [{"role": "system", "content": "sys"}, {"role": "user", "content": "alert"}]
+    history += tool_turn("call_1", big_result()) + tool_turn("call_2", big_result())
+    before = sum(count_message_tokens(m) for m in history)
+
+    window = ContextWindow(max_context_tokens=100000, compact_threshold=200)
+    total = window.fit(history)
+    assert history[3]["content"].startswith(COMPACTED_PREFIX)
+    assert history[3]["tool_call_id"] == "call_1"
+    assert json.loads(history[3]["content"][len(COMPACTED_PREFIX):])["hostname"] == "PC-01"
+    assert history[5]["content"] == big_result()
+    assert total == sum(count_message_tokens(m) for m in history) < before
+
+    compacted = history[3]["content"]
+    assert window.fit(history) == total and history[3]["content"] == compacted
+    print(f"✅ 舊的工具結果已壓縮 ({before} -> {total} tokens)")
+
+
+def verify_small_results_kept_until_over_limit():
+    """小型工具結果在總量未超過上限時保持完整，超過上限時一併壓縮"""
+    small = json.dumps({"hostname": "PC-01", "isolated": True, "note": "y" * 300})
+    history = [{"role": "system", "content": "sys"}] + tool_turn("call_1", small) + tool_turn("call_2", small)
+    ContextWindow(max_context_tokens=100000, compact_threshold=400).fit(history)
+    assert history[2]["content"] == small
+
+    ContextWindow(max_context_tokens=50, compact_threshold=400).fit(history)
+    assert history[2]["content"].startswith(COMPACTED_PREFIX)
+    assert history[4]["content"] == small
+    print("✅ 小型工具結果僅在超過上限時壓縮")
+
+
+class EmptyRegistry:
+    def get_schemas(self):
+        return []
+
+
+def verify_investigation_budget():
+    """累計輸入 Token 超過 investigation_budget 時不再送出請求"""
+    alert = make_alert()
+    llm = ScriptedLLM([reply("done")])
+    engine = MDRIntelligenceEngine(llm, "sys", context_window=ContextWindow(investigation_budget=10))
+    result = engine.investigate(alert, EmptyRegistry())
+    assert "Token 預算" in result and llm.calls == 0
+
+    engine = MDRIntelligenceEngine(llm, "sys")
+    assert engine.investigate(alert, EmptyRegistry()) == "done" and llm.calls == 1
+    print("✅ 超過調查 Token 預算時停止調查")
+
+
+if __name__ == "__main__":
+    verify_old_tool_results_are_compacted()
+    verify_small_results_kept_until_over_limit()
+    verify_investigation_budget()
@@ -0,0 +1,79 @@
+"""
+Verify Deduplication - 驗證告警去重過濾器
+
+依 ingestion/README.md 步驟 4 的驗證方式測試 AlertDeduplicator。
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adapter.core.schemas import MDRAlert
+from fakes import make_alert
+from ingestion.deduplication import AlertDeduplicator
+
+def host_alert(alert_id: str, hostname: str = "PC-01") -> MDRAlert:
+    return make_alert(alert_id, tenant_id="T-A", title="Malicious Process Detected", host=hostname)
+
+def verify_deduplication():
+    db_path = os.path.join(tempfile.mkdtemp(), "dedup.db")
+    dedup = AlertDeduplicator(window_seconds=1800, db_path=db_path)
+    now = time.time()
+
+    # 1. 第一次傳入告警 A -> New
+    assert not dedup.is_duplicate(host_alert("1"), now=now)
+    # 2. 立即再傳入告警 A (不同 ID、相同指紋) -> Duplicate
+    assert dedup.is_duplicate(host_alert("2"), now=now + 5)
+    # 不同主機 -> New
+    assert not dedup.is_duplicate(host_alert("3", hostname="PC-02"), now=now + 5)
+    print("[PASS] 時間窗內的重複告警被抑制")
+
+    # 重啟後 (重新載入 SQLite) 仍為 Duplicate
+    dedup.close()
+    dedup = AlertDeduplicator(window_seconds=1800, db_path=db_path)
+    assert dedup.is_duplicate(host_alert("4"))
+    print("[PASS] 重啟後保留時間窗內的指紋")
+
+    # 3. 30 分鐘後再傳入告警 A -> New
+    assert not dedup.is_duplicate(host_alert("5"), now=now + 1801)
+    print("[PASS] 超過時間窗後視為新告警")
+
+    # 容量上限
+    capped = AlertDeduplicator(max_entries=10)
+    for i in range(50):
+        capped.is_duplicate(host_alert(str(i), hostname=f"PC-{i}"))
+    assert capped.stats()["size"] == 10
+    print(f"[PASS] 容量上限生效: {capped.stats()}")
+
+    # TTL 到期也計入淘汰統計
+    ttl = AlertDeduplicator(window_seconds=10)
+    ttl.is_duplicate(host_alert("1", hostname="PC-A"), now=now)
+    ttl.is_duplicate(host_alert("2", hostname="PC-B"), now=now + 11)
+    assert ttl.stats()["expired"] == 1 and ttl.stats()["evicted"] == 1
+    print("[PASS] 超過時間窗的指紋計入 expired / evicted")
+
+    # 檢查但不記錄 (尚未放入佇列)：下次輪詢不可被誤判為重複
+    pending = AlertDeduplicator()
+    assert not pending.is_duplicate(host_alert("1"), now=now, record=False)
+    assert not pending.is_duplicate(host_alert("2"), now=now + 1, record=False)
+    pending.record(host_alert("2"), now=now + 1)
+    assert pending.is_duplicate(host_alert("3"), now=now + 2)
+    print("[PASS] record=False 時只在 record() 後才視為已處理")
+
+    # SQLite 寫入批次送出：flush 前不落地，flush / close 後可於重啟時載入
+    batch_path = os.path.join(tempfile.mkdtemp(), "batch.db")
+    batched = AlertDeduplicator(db_path=batch_path, flush_every=1000)
+    for i in range(20):
+        batched.is_duplicate(host_alert(str(i), hostname=f"PC-{i}"))
+    assert AlertDeduplicator(db_path=batch_path).stats()["size"] == 0
+    batched.flush()
+    assert AlertDeduplicator(db_path=batch_path).stats()["size"] == 20
+    print("[PASS] 指紋寫入批次送出")
+
+    print(f"\n統計: {dedup.stats()}")
+
+if __name__ == "__main__":
+    verify_deduplication()
@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core.engine import BatchProgress, MDRIntelligenceEngine
+from ai_orchestration_engine.core.models import BaseLLM
+from ai_orchestration_engine.core.rate_limit import RateLimiter
+from fakes import ScriptedLLM, call, make_alert, reply
+
+
+class SleepyRegistry:
+    """工具依參數休眠後回傳名稱；boom 拋出例外"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_schemas(self):
+        return []
+
+    def execute(self, name, args):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(args.get("seconds", 0))
+            if name == "boom":
+                raise RuntimeError("vendor down")
+            return f"{name}-done"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def verify_parallel_tool_order():
+    """同一輪的工具並行執行，結果依 tool_call 順序寫回；逾時與失敗以錯誤訊息回饋"""
+    first = reply(None, [
+        call("c1", "slow", seconds=0.3),
+        call("c2", "fast", seconds=0.0),
+        call("c3", "boom", seconds=0.1),
+        call("c4", "hang", seconds=2.0),
+    ])
+    llm = ScriptedLLM([first, reply("done")])
+    registry = SleepyRegistry()
+    engine = MDRIntelligenceEngine(llm, "sys", tool_timeout=0.6, max_parallel_tools=4)
+
+    started = time.monotonic()
+    result = engine.investigate(make_alert(), registry)
+    elapsed = time.monotonic() - started
+
+    assert result == "done"
+    tool_messages = [m for m in llm.seen[1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["c1", "c2", "c3", "c4"]
+    assert [m["content"] for m in tool_messages[:3]] == ["slow-done", "fast-done", "Error: vendor down"]
+    assert tool_messages[3]["content"] == "Error: Tool 'hang' timed out after 0.6s"
+    assert registry.max_active >= 3
+    assert elapsed < 1.5, elapsed
+    print(f"✅ 工具並行執行並依呼叫順序回饋 ({elapsed:.2f}s)")
+
+
+class EchoLLM(BaseLLM):
+    """先要求查詢主機，再以告警 ID 作結；告警 ID 含 FAIL 時拋出例外"""
+
+    def chat(self, messages, tools=None):
+        alert_id = json.loads(messages[1]["content"].split("\n\n", 1)[1])["alert_id"]
+        if "FAIL" in alert_id:
+            raise RuntimeError("provider error")
+        if messages[-1]["role"] == "user":
+            time.sleep(0.05)
+            return reply(None, [call(f"{alert_id}-c1", "fast")])
+        return reply(f"結論: {alert_id}")
+
+
+def verify_isolated_sessions():
+    """同一個引擎並行調查多筆告警：每個 session 的對話與結果互不干擾"""
+    engine = MDRIntelligenceEngine(EchoLLM(), "sys")
+    registry = SleepyRegistry()
+    sessions = [engine.new_session(make_alert(f"A-{i}")) for i in range(6)]
+    threads = [threading.Thread(target=engine.run_session, args=(session, registry)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, session in enumerate(sessions):
+        assert session.result == f"結論: A-{i}"
+        assert [r["tool_call_id"] for r in session.tool_results] == [f"A-{i}-c1"]
+        assert len(session.history) == 5 and session.iterations == 2
+    assert not hasattr(engine, "history")
+    print("✅ 每筆調查使用獨立的 session")
+
+
+def verify_investigate_many():
+    """工作池依需要取出告警並依完成順序回傳；單筆失敗記錄於 session.error；進度與限制器配額隨之更新"""
+    limiter = RateLimiter(requests_per_minute=600)
+    engine = MDRIntelligenceEngine(EchoLLM(), "sys", rate_limiter=limiter)
+    registry = SleepyRegistry()
+    progress = BatchProgress()
+    pulled = []
+
+    def alerts():
+        for alert_id in [f"A-{i}" for i in range(6)] + ["A-FAIL"]:
+            pulled.append(alert_id)
+            yield make_alert(alert_id)
+
+    sessions = {}
+    for session in engine.investigate_many(alerts(), registry, concurrency=3, progress=progress):
+        if not sessions:
+            # 第一筆完成前只取出 concurrency 筆告警
+            assert len(pulled) == 3
+        sessions[session.alert.alert_id] = session
+
+    assert len(sessions) == 7
+    assert all(sessions[f"A-{i}"].result == f"結論: A-{i}" for i in range(6))
+    assert sessions["A-FAIL"].error == "provider error"
+    assert registry.max_active <= 3
+    snapshot = progress.snapshot()
+    assert (snapshot["submitted"], snapshot["completed"], snapshot["failed"], snapshot["in_flight"]) == (7, 7, 1, 0)
+    # 每筆成功的調查呼叫 LLM 兩次，失敗的一次
+    assert limiter.stats()["acquired"] == 13
+    print("✅ investigate_many 回報進度並經由限制器送出請求")
+
+
+def verify_engine_limiter_release():
+    """引擎層級限制器的並行名額在每次呼叫後歸還 (含失敗的呼叫)，並依告警的租戶排隊"""
+    limiter = RateLimiter(max_concurrency=2)
+    engine = MDRIntelligenceEngine(EchoLLM(), "sys", rate_limiter=limiter)
+    alerts = [make_alert(f"A-{i}", tenant_id=f"T-{i % 2}") for i in range(6)] + [make_alert("A-FAIL")]
+    sessions = []
+    runner = threading.Thread(target=lambda: sessions.extend(engine.investigate_many(alerts, SleepyRegistry(), concurrency=4)),
+                              daemon=True)
+    runner.start()
+    runner.join(timeout=5)
+    assert not runner.is_alive(), "並行名額未歸還，調查卡住"
+
+    assert len(sessions) == 7
+    stats = limiter.stats()
+    assert stats["in_flight"] == 0 and stats["acquired"] == 13
+    assert set(stats["tenant_avg_wait"]) == {"T", "T-0", "T-1"}
+    print("✅ 引擎層級限制器歸還並行名額並依租戶排隊")
+
+
+if __name__ == "__main__":
+    verify_parallel_tool_order()
+    verify_isolated_sessions()
+    verify_investigate_many()
+    verify_engine_limiter_release()
@@ -0,0 +1,91 @@
+import os
+import sys
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.schemas import Severity
+from ai_orchestration_engine.core.engine import MDRIntelligenceEngine
+from ai_orchestration_engine.core.fast_path import FastPathTriage, extract_verdict
+from fakes import ScriptedLLM, call, make_alert, reply
+
+SIGNED_TOOL = "a" * 64
+
+
+def verify_extract_verdict():
+    assert extract_verdict("**判定結果**: Malicious\n**信心程度**: 95%") == ("malicious", 95)
+    assert extract_verdict("Verdict: 良性，confidence 120") == ("benign", 100)
+    assert extract_verdict("尚需更多資訊") == (None, None)
+    assert extract_verdict(None) == (None, None)
+    print("✅ 擷取判定結果與信心分數")
+
+
+def verify_rules():
+    """良性雜湊、INFO 無實體與相同實體已判定的告警直接結案"""
+    triage = FastPathTriage(benign_hashes=[SIGNED_TOOL.upper()], verdict_ttl=60)
+    assert triage.evaluate(make_alert(severity=Severity.INFO))[0] == "empty_info"
+    assert triage.evaluate(make_alert(host="PC-01", file=SIGNED_TOOL))[0] == "benign_hash"
+    assert triage.evaluate(make_alert(host="PC-01", file="b" * 64)) is None
+
+    triage.record(make_alert("A-1", host="PC-01", user="alice"), "**判定結果**: Benign", now=0)
+    rule, conclusion = triage.evaluate(make_alert("A-2", host="pc-01", user="ALICE"), now=30)
+    assert rule == "entity_verdict" and "A-1" in conclusion
+    # 不同偵測、未判定的實體與過期的判定都不可沿用
+    assert triage.evaluate(make_alert("A-3", title="Mimikatz", host="PC-01", user="alice"), now=30) is None
+    assert triage.evaluate(make_alert("A-4", host="PC-01", user="bob"), now=30) is None
+    assert triage.evaluate(make_alert("A-5", host="PC-01", user="alice"), now=61) is None
+
+    triage.record(make_alert("A-6", host="PC-02"), "**判定結果**: Malicious", now=0)
+    assert triage.evaluate(make_alert("A-7", host="PC-02"), now=1) is None
+    assert triage.stats["entity_verdict"] == 1 and triage.stats["benign_hash"] == 1
+    print("✅ 規則判定與實體判定沿用")
+
+
+def verify_is_settled():
+    triage = FastPathTriage(min_confidence=90, stable_turns=2)
+    assert triage.is_settled([("malicious", 95)])
+    assert not triage.is_settled([("malicious", 60)])
+    assert triage.is_settled([("suspicious", 60), ("suspicious", 70)])
+    assert not triage.is_settled([("benign", 60), ("suspicious", 70)])
+    assert not triage.is_settled([("malicious", 95), (None, None)])
+    print("✅ 判定穩定條件")
+
+
+class IsolationRegistry:
+    def __init__(self):
+        self.executed = []
+
+    def get_schemas(self):
+        return []
+
+    def execute(self, name, args):
+        self.executed.append(name)
+        return {"status": "success"}
+
+
+def verify_engine_fast_paths():
+    """規則命中時不呼叫 LLM；判定穩定時執行完本輪工具 (處置動作) 即結束"""
+    triage = FastPathTriage(benign_hashes=[SIGNED_TOOL])
+    llm = ScriptedLLM([])
+    engine = MDRIntelligenceEngine(llm, "sys", fast_path=triage)
+    session = engine.new_session(make_alert(host="PC-01", file=SIGNED_TOOL))
+    engine.run_session(session, IsolationRegistry())
+    assert session.resolved_by == "benign_hash" and llm.calls == 0
+
+    decided = reply("**判定結果**: Malicious\n**信心程度**: 95%\n立即隔離主機。", [call("call_1", "isolate_host", hostname="PC-09")])
+    llm = ScriptedLLM([decided, reply("不應被呼叫")])
+    registry = IsolationRegistry()
+    engine = MDRIntelligenceEngine(llm, "sys", fast_path=triage)
+    session = engine.new_session(make_alert("A-9", host="PC-09"))
+    engine.run_session(session, registry)
+    assert session.resolved_by == "early_exit" and llm.calls == 1
+    assert registry.executed == ["isolate_host"]
+    assert "Malicious" in session.result
+    print("✅ 引擎依規則略過調查，判定穩定時提前結束")
+
+
+if __name__ == "__main__":
+    verify_extract_verdict()
+    verify_rules()
+    verify_is_settled()
+    verify_engine_fast_paths()
@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core import models
+from ai_orchestration_engine.core.models import GeminiAPIError, GeminiLLM, _parse_retry_after
+from ai_orchestration_engine.core.rate_limit import RateLimiter
+from fakes import StubResponse, StubSession
+
+TOOLS = [
+    {"type": "function", "function": {
+        "name": "list_processes", "description": "列出主機行程",
+        "parameters": {"type": "object", "additionalProperties": False,
+                       "properties": {"hostname": {"type": "string", "description": "主機名稱", "default": "PC-01"}},
+                       "required": ["hostname"]}}},
+    {"type": "function", "function": {"name": "get_time", "description": "目前時間",
+                                      "parameters": {"type": "object", "properties": {}}}},
+]
+
+
+def make_llm(responses, **kwargs):
+    llm = GeminiLLM(api_key="test", model="gemini-1.5-flash", **kwargs)
+    llm.session = StubSession(responses)
+    return llm
+
+
+def verify_payload_mapping():
+    """OpenAI 格式的對話與工具定義轉為 Gemini functionDeclarations / functionCall / functionResponse"""
+    messages = [
+        {"role": "system", "content": "你是 MDR 分析師"},
+        {"role": "user", "content": "調查告警"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "list_processes", "arguments": '{"hostname": "PC-01"}'}},
+            {"id": "call_2", "type": "function", "function": {"name": "get_time", "arguments": ""}},
+        ]},
+        {"role": "tool", "tool_call_id": "call_1", "content": '{"processes": ["a.exe"]}'},
+        {"role": "tool", "tool_call_id": "call_2", "content": "2026-01-18T09:00:00Z"},
+    ]
+    payload = GeminiLLM._build_payload(messages, TOOLS)
+
+    assert payload["systemInstruction"] == {"parts": [{"text": "你是 MDR 分析師"}]}
+    assert [c["role"] for c in payload["contents"]] == ["user", "model", "user"]
+    assert payload["contents"][1]["parts"] == [
+        {"functionCall": {"name": "list_processes", "args": {"hostname": "PC-01"}}},
+        {"functionCall": {"name": "get_time", "args": {}}},
+    ]
+    # 並行呼叫的結果合併在同一個回合；非物件結果包成 {"result": ...}
+    assert payload["contents"][2]["parts"] == [
+        {"functionResponse": {"name": "list_processes", "response": {"processes": ["a.exe"]}}},
+        {"functionResponse": {"name": "get_time", "response": {"result": "2026-01-18T09:00:00Z"}}},
+    ]
+
+    declarations = payload["tools"][0]["functionDeclarations"]
+    assert declarations[0]["parameters"] == {
+        "type": "object", "required": ["hostname"],
+        "properties": {"hostname": {"type": "string", "description": "主機名稱"}}}
+    assert "parameters" not in declarations[1]
+    assert payload["toolConfig"] == {"functionCallingConfig": {"mode": "AUTO"}}
+    print("✅ 對話與工具定義轉為 Gemini function calling 格式")
+
+
+def verify_function_call_response():
+    """Gemini 回傳的 functionCall 轉為 OpenAI 相容的 tool_calls (缺少 ID 時自動產生)"""
+    body = {
+        "candidates": [{"content": {"role": "model", "parts": [
+            {"text": "先查詢行程。"},
+            {"functionCall": {"name": "list_processes", "args": {"hostname": "PC-01"}}},
+        ]}}],
+        "usageMetadata": {"promptTokenCount": 120, "candidatesTokenCount": 8},
+    }
+    llm = make_llm([StubResponse(200, body)])
+    message = llm.chat([{"role": "user", "content": "調查"}], TOOLS).choices[0].message
+
+    assert message.content == "先查詢行程。"
+    assert len(message.tool_calls) == 1
+    tool_call = message.tool_calls[0]
+    assert tool_call.id.startswith("call_")
+    assert tool_call.function.name == "list_processes"
+    assert json.loads(tool_call.function.arguments) == {"hostname": "PC-01"}
+    assert llm.session.sent[0]["json"]["tools"][0]["functionDeclarations"][0]["name"] == "list_processes"
+    print("✅ functionCall 回應轉為 tool_calls")
+
+
+def with_recorded_sleeps(func):
+    """以記錄取代 time.sleep，回傳 (結果或例外, 各次等待秒數)"""
+    sleeps = []
+    original = models.time
+    models.time = SimpleNamespace(sleep=sleeps.append, monotonic=time.monotonic)
+    try:
+        return func(), sleeps
+    except Exception as e:
+        return e, sleeps
+    finally:
+        models.time = original
+
+
+def verify_retry_after():
+    """429/5xx 依 Retry-After (秒數或 HTTP 日期) 重試；其餘錯誤與重試用盡時拋出 GeminiAPIError"""
+    ok = StubResponse(200, {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]})
+    throttled = StubResponse(429, {"error": "quota"}, headers={"Retry-After": "7"})
+    llm = make_llm([throttled, ok])
+    response, sleeps = with_recorded_sleeps(lambda: llm.chat([{"role": "user", "content": "hi"}]))
+    assert response.choices[0].message.content == "ok"
+    assert sleeps == [7.0] and throttled.closed
+    assert [sent["timeout"] for sent in llm.session.sent] == [llm.timeout] * 2
+
+    # 無 Retry-After 時指數退避 (第一次 1~2 秒)
+    llm = make_llm([StubResponse(503), ok])
+    _, sleeps = with_recorded_sleeps(lambda: llm.chat([{"role": "user", "content": "hi"}]))
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 2.0
+
+    llm = make_llm([StubResponse(400, {"error": "bad request"})])
+    error, sleeps = with_recorded_sleeps(lambda: llm.chat([{"role": "user", "content": "hi"}]))
+    assert isinstance(error, GeminiAPIError) and error.status_code == 400 and sleeps == []
+
+    # Retry-After 超過 MAX_RETRY_DELAY 時不等待，直接回報伺服器要求的等待秒數
+    long_wait = StubResponse(429, headers={"Retry-After": "1000"})
+    llm = make_llm([long_wait, ok])
+    error, sleeps = with_recorded_sleeps(lambda: llm.chat([{"role": "user", "content": "hi"}]))
+    assert isinstance(error, GeminiAPIError) and error.status_code == 429 and error.retry_after == 1000
+    assert sleeps == [] and long_wait.closed and len(llm.session.sent) == 1
+
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= _parse_retry_after(retry_at) <= 30
+    assert _parse_retry_after("not a date") is None
+    print("✅ 依 Retry-After 重試，不可重試的錯誤立即回報")
+
+
+def verify_backoff_releases_slot():
+    """退避等待期間歸還並行名額，重試前重新取得；結束後名額全數歸還"""
+    ok = StubResponse(200, {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]})
+    llm = make_llm([StubResponse(503), StubResponse(429, headers={"Retry-After": "2"}), ok])
+    llm.rate_limiter = RateLimiter(max_concurrency=1)
+    in_flight = []
+    original = models.time
+    models.time = SimpleNamespace(sleep=lambda _: in_flight.append(llm.rate_limiter.in_flight),
+                                  monotonic=time.monotonic)
+    try:
+        response = llm.chat([{"role": "user", "content": "hi"}])
+    finally:
+        models.time = original
+    assert response.choices[0].message.content == "ok"
+    assert in_flight == [0, 0] and llm.rate_limiter.in_flight == 0
+    print("✅ 退避等待時歸還限制器名額")
+
+
+def verify_shared_session():
+    """同一程序內的 GeminiLLM 共用連線池"""
+    first = GeminiLLM(api_key="a", model="gemini-1.5-flash")
+    second = GeminiLLM(api_key="b", model="gemini-1.5-pro")
+    assert first.session is second.session
+    print("✅ GeminiLLM 共用連線池")
+
+
+if __name__ == "__main__":
+    verify_payload_mapping()
+    verify_function_call_response()
+    verify_retry_after()
+    verify_backoff_releases_slot()
+    verify_shared_session()
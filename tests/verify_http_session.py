@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+import requests
+from requests.adapters import BaseAdapter
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.http_session import close_all_sessions, get_shared_session
+from adapter.packs.Fidelis.client import FidelisEndpointClient
+
+SERVER = "https://fidelis-pool.invalid"
+
+
+class CountingTransport(BaseAdapter):
+    """取代 HTTPAdapter 的傳輸層：記錄每個請求，登入回傳 Token，其餘回傳空的告警頁"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request.method, request.url.split("?")[0], request.headers.get("Authorization")))
+        body = {"success": True, "data": {"token": "token-1"}} if "/authenticate" in request.url \
+            else {"success": True, "data": {"entities": []}}
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode("utf-8")
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def verify_shared_pool_config():
+    """同一 server_url 共用 Session；連線池大小與重試策略 (只重試冪等方法) 依設定建立"""
+    session = get_shared_session(SERVER + "/", pool_size=4, max_retries=2)
+    assert get_shared_session(SERVER, pool_size=4, max_retries=2) is session
+    assert get_shared_session(SERVER, pool_size=8, max_retries=2) is not session
+
+    adapter = session.get_adapter(SERVER)
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert "GET" in adapter.max_retries.allowed_methods
+    assert "POST" not in adapter.max_retries.allowed_methods
+    print("✅ 同一 server_url 共用 Session，POST 不自動重試")
+
+
+def verify_clients_reuse_session():
+    """多個 Client (不同租戶) 共用同一個 Session 與 Token，只登入一次"""
+    first = FidelisEndpointClient(SERVER, "svc", "secret")
+    second = FidelisEndpointClient(SERVER + "/Endpoint/api", "svc", "secret")
+    assert first.session is second.session
+
+    transport = CountingTransport()
+    first.session.mount(SERVER, transport)
+    first.list_alerts(limit=10)
+    second.list_alerts(limit=10)
+    first.get_host_info(host_name="PC-01")
+
+    logins = [s for s in transport.sent if s[1].endswith("/authenticate")]
+    calls = [s for s in transport.sent if not s[1].endswith("/authenticate")]
+    assert len(logins) == 1
+    assert len(calls) == 3 and all(auth == "Bearer token-1" for _, _, auth in calls)
+    first.token_manager.close()
+
+    close_all_sessions()
+    assert get_shared_session(SERVER) is not first.session
+    print("✅ Client 共用 Session 與 Token")
+
+
+if __name__ == "__main__":
+    verify_shared_pool_config()
+    verify_clients_reuse_session()
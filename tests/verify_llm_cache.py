@@ -0,0 +1,78 @@
+import os
+import sys
+from types import SimpleNamespace
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core.cache import CachingLLM, ResponseCache
+from ai_orchestration_engine.core.models import ChatResponse, FunctionCall, ToolCall
+from fakes import ScriptedLLM, make_alert
+
+
+def make_session(alert_id: str):
+    return SimpleNamespace(alert=make_alert(alert_id), iterations=1)
+
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "alert"}]
+
+
+def verify_only_verdicts_are_cached():
+    """備援訊息不可快取；工具呼叫回合與含判定結果的回應才可重播"""
+    failure = ChatResponse.build("AI 未能提供有效回應。")
+    tool_call = ChatResponse.build(None, [ToolCall("call_1", FunctionCall("list_processes", "{}"))])
+    verdict = ChatResponse.build("**判定結果**: Benign\n**信心程度**: 95%")
+    llm = ScriptedLLM([failure, tool_call, verdict])
+    caching = CachingLLM(llm, ResponseCache(), replay_verdicts=True)
+
+    # 1. 暫時性失敗：不快取，下一筆相同告警仍呼叫 LLM
+    assert caching.for_session(make_session("A-0001")).chat(MESSAGES).choices[0].message.content == failure.choices[0].message.content
+    # 2. 工具呼叫回應：快取，重播時使用新的 tool_call_id
+    assert caching.for_session(make_session("A-0002")).chat(MESSAGES).choices[0].message.tool_calls
+    replayed_call = caching.for_session(make_session("A-0003")).chat(MESSAGES).choices[0].message.tool_calls[0]
+    assert replayed_call.function.name == "list_processes" and replayed_call.id != "call_1"
+    assert llm.calls == 2
+    # 3. 含判定結果：快取並可重播
+    assert "Benign" in caching.for_session(make_session("A-0004")).chat(MESSAGES[:1]).choices[0].message.content
+    assert llm.calls == 3
+
+    replayed = caching.for_session(make_session("A-0005")).chat(MESSAGES)
+    assert "Benign" in replayed.choices[0].message.content
+    assert llm.calls == 3
+    print("✅ 快取工具呼叫回合與含判定結果的最終回應")
+
+
+def investigate(caching: CachingLLM, alert_id: str, tool_result: str) -> str:
+    """模擬一次調查：第一輪取得工具呼叫，執行工具後第二輪取得結論"""
+    llm = caching.for_session(make_session(alert_id))
+    messages = [dict(m) for m in MESSAGES]
+    call = llm.chat(messages).choices[0].message.tool_calls[0]
+    messages.append({"role": "assistant", "content": None, "tool_calls": [
+        {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+    ]})
+    messages.append({"role": "tool", "tool_call_id": call.id, "content": tool_result})
+    return llm.chat(messages).choices[0].message.content
+
+
+def verify_default_caches_conversation_prefix():
+    """預設 (不重播結論) 時，重複調查的工具呼叫回合命中快取；工具結果相同時結論也命中"""
+    tool_call = ChatResponse.build(None, [ToolCall("call_1", FunctionCall("list_processes", "{}"))])
+    benign = ChatResponse.build("**判定結果**: Benign\n**信心程度**: 95%")
+    malicious = ChatResponse.build("**判定結果**: Malicious\n**信心程度**: 90%")
+    llm = ScriptedLLM([tool_call, benign, malicious])
+    caching = CachingLLM(llm, ResponseCache())
+
+    assert "Benign" in investigate(caching, "A-0001", "explorer.exe")
+    assert llm.calls == 2
+    # 工具結果相同：兩輪都命中快取
+    assert "Benign" in investigate(caching, "A-0002", "explorer.exe")
+    assert llm.calls == 2
+    # 工具結果不同：只有結論那一輪呼叫 LLM
+    assert "Malicious" in investigate(caching, "A-0003", "mimikatz.exe")
+    assert llm.calls == 3
+    print("✅ 預設依對話前綴快取重複調查的工具呼叫回合")
+
+
+if __name__ == "__main__":
+    verify_only_verdicts_are_cached()
+    verify_default_caches_conversation_prefix()
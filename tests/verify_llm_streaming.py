@@ -0,0 +1,234 @@
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace as NS
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core.engine import MDRIntelligenceEngine
+from ai_orchestration_engine.core.models import (BaseLLM, ChatResponse, FunctionCall, GeminiLLM, OpenAILLM,
+                                                 StreamEvent, StreamTimeoutError, ToolCall)
+from ai_orchestration_engine.core.rate_limit import RateLimiter
+from fakes import StubResponse, StubSession, make_alert
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "alert"}]
+
+
+def sse_response(parts, delay=0.0):
+    """Gemini streamGenerateContent 的 SSE 回應，每段文字一個 data 行"""
+    lines = [("data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})).encode("utf-8")
+             for text in parts]
+    return StubResponse(lines=lines, delay=delay)
+
+
+def make_llm(response, **kwargs):
+    llm = GeminiLLM(api_key="test", model="gemini-1.5-flash", **kwargs)
+    llm.session = StubSession([response])
+    llm.rate_limiter = RateLimiter(max_concurrency=1)
+    return llm
+
+
+def verify_early_stop_closes_response():
+    """呼叫端提前停止讀取時，HTTP 回應立即關閉並歸還並行名額"""
+    response = sse_response(["第一段", "第二段", "第三段"])
+    llm = make_llm(response)
+    events = llm.chat_stream(MESSAGES, tenant_id="T")
+    first = next(events)
+    assert first.type == StreamEvent.CONTENT and first.content == "第一段"
+    assert llm.rate_limiter.in_flight == 1
+    events.close()
+    assert response.closed
+    assert llm.rate_limiter.in_flight == 0
+    assert [sent["timeout"] for sent in llm.session.sent] == [llm.timeout]
+    print("✅ 提前停止串流時關閉 HTTP 回應並歸還名額")
+
+
+def verify_stream_deadline():
+    """串流超過整體時限時中止，並關閉回應"""
+    response = sse_response(["a"] * 10, delay=0.02)
+    llm = make_llm(response, stream_timeout=0.05)
+    try:
+        list(llm.chat_stream(MESSAGES, tenant_id="T"))
+    except StreamTimeoutError:
+        pass
+    else:
+        raise AssertionError("串流未在整體時限內中止")
+    assert response.closed
+    assert llm.rate_limiter.in_flight == 0
+    print("✅ 串流超過整體時限即中止")
+
+
+def chunk(content=None, tool_calls=None, finish_reason=None, usage=None):
+    choices = [] if usage else [NS(delta=NS(content=content, tool_calls=tool_calls), finish_reason=finish_reason)]
+    return NS(choices=choices, usage=usage)
+
+
+def tool_delta(index, call_id=None, name=None, arguments=None):
+    return NS(index=index, id=call_id, function=NS(name=name, arguments=arguments))
+
+
+class StubStream(list):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def verify_openai_stream_assembly():
+    """OpenAI 分段送達的文字與工具呼叫組裝為事件；工具呼叫在下一個 index 出現時即送出"""
+    stream = StubStream([
+        chunk(content="先查詢"),
+        chunk(content="行程。"),
+        chunk(tool_calls=[tool_delta(0, "call_1", "list_", '{"host')]),
+        chunk(tool_calls=[tool_delta(0, None, "processes", 'name": "PC-01"}')]),
+        chunk(tool_calls=[tool_delta(1, "call_2", "get_host_details", "{}")]),
+        chunk(finish_reason="tool_calls"),
+        chunk(usage=NS(prompt_tokens=100, completion_tokens=20)),
+    ])
+    sent = {}
+    # openai 套件為選用相依，直接注入 client 替身
+    llm = OpenAILLM.__new__(OpenAILLM)
+    llm.model, llm.timeout, llm.stream_timeout = "gpt-4o", 30.0, 300.0
+    llm.client = NS(chat=NS(completions=NS(create=lambda **kwargs: sent.update(kwargs) or stream)))
+
+    events = list(llm.chat_stream([{"role": "user", "content": "alert"}], tools=[{"type": "function"}]))
+    assert [e.type for e in events] == [StreamEvent.CONTENT, StreamEvent.CONTENT, StreamEvent.TOOL_CALL,
+                                        StreamEvent.TOOL_CALL, StreamEvent.DONE]
+    # 第一個工具呼叫在 index 1 出現時就已完整送出
+    assert events[2].tool_call.function.name == "list_processes"
+    assert json.loads(events[2].tool_call.function.arguments) == {"hostname": "PC-01"}
+    message = events[-1].response.choices[0].message
+    assert message.content == "先查詢行程。"
+    assert [tc.id for tc in message.tool_calls] == ["call_1", "call_2"]
+    assert events[-1].response.usage.prompt_tokens == 100
+    assert sent["stream"] and sent["timeout"] == 30.0 and sent["tool_choice"] == "auto"
+    assert stream.closed
+    print("✅ OpenAI 串流片段組裝為文字與工具呼叫事件")
+
+
+class SlowFinishLLM(BaseLLM):
+    """送出工具呼叫後等待工具開始執行才送出 DONE，模擬 AI 仍在生成其餘內容"""
+
+    def __init__(self, tool_started):
+        self.tool_started = tool_started
+        self.started_before_done = None
+        self.turn = 0
+
+    def chat(self, messages, tools=None):
+        raise AssertionError("串流模式不應呼叫 chat()")
+
+    def chat_stream(self, messages, tools=None):
+        self.turn += 1
+        if self.turn > 1:
+            yield StreamEvent(StreamEvent.CONTENT, content="結論")
+            yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build("結論"))
+            return
+        tool_call = ToolCall("call_1", FunctionCall("list_processes", "{}"))
+        yield StreamEvent(StreamEvent.CONTENT, content="查詢中")
+        yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=tool_call)
+        self.started_before_done = self.tool_started.wait(2)
+        yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build("查詢中", [tool_call]))
+
+
+class SignalRegistry:
+    def __init__(self):
+        self.started = threading.Event()
+
+    def get_schemas(self):
+        return []
+
+    def execute(self, name, args):
+        self.started.set()
+        return "ok"
+
+
+def verify_engine_starts_tools_while_streaming():
+    """串流模式下工具呼叫一解析完成就開始執行，文字片段即時送給回呼"""
+    registry = SignalRegistry()
+    llm = SlowFinishLLM(registry.started)
+    engine = MDRIntelligenceEngine(llm, "sys")
+    chunks = []
+    assert engine.investigate(make_alert(), registry, on_content=chunks.append) == "結論"
+    assert llm.started_before_done is True
+    assert chunks == ["查詢中", "結論"]
+    print("✅ 串流模式下工具在回應完成前即開始執行")
+
+
+class ReorderedStreamLLM(BaseLLM):
+    """串流送出的工具呼叫與完整回應不一致：順序不同、缺少 call_1、多出 call_9"""
+
+    def __init__(self):
+        self.turn = 0
+
+    def chat(self, messages, tools=None):
+        raise AssertionError("串流模式不應呼叫 chat()")
+
+    def chat_stream(self, messages, tools=None):
+        self.turn += 1
+        if self.turn > 1:
+            yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build("結論"))
+            return
+        first = ToolCall("call_1", FunctionCall("get_host_details", '{"hostname": "PC-01"}'))
+        second = ToolCall("call_2", FunctionCall("list_processes", '{"hostname": "PC-02"}'))
+        yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=second)
+        yield StreamEvent(StreamEvent.TOOL_CALL, tool_call=ToolCall("call_9", FunctionCall("list_processes", "{}")))
+        yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build(None, [first, second]))
+
+
+class RecordingRegistry:
+    def __init__(self):
+        self.executed = []
+        self._lock = threading.Lock()
+
+    def get_schemas(self):
+        return []
+
+    def execute(self, name, args):
+        with self._lock:
+            self.executed.append((name, args.get("hostname")))
+        return f"{name}:{args.get('hostname')}"
+
+
+def verify_streamed_calls_matched_by_id():
+    """串流中已送出的工具依 tool_call.id 對應完整回應；沒有對應的呼叫在組裝後才執行"""
+    registry = RecordingRegistry()
+    engine = MDRIntelligenceEngine(ReorderedStreamLLM(), "sys", stream=True)
+    session = engine.run_session(engine.new_session(make_alert()), registry)
+    results = {m["tool_call_id"]: m["content"] for m in session.history if m["role"] == "tool"}
+    assert results == {"call_1": "get_host_details:PC-01", "call_2": "list_processes:PC-02"}
+    assert registry.executed.count(("list_processes", "PC-02")) == 1
+    assert registry.executed.count(("get_host_details", "PC-01")) == 1
+    print("✅ 串流中的工具呼叫依 ID 對應完整回應")
+
+
+class PlainLLM(BaseLLM):
+    """chat / chat_stream 不接受 tenant_id 的自訂 LLM"""
+
+    def __init__(self):
+        self.rate_limiter = RateLimiter(max_concurrency=1)
+
+    def chat(self, messages, tools=None):
+        return ChatResponse.build("plain")
+
+
+def verify_tenant_passed_only_when_declared():
+    """自訂 LLM 設有限制器但未宣告 tenant_id 時，租戶視圖不傳入 tenant_id"""
+    session = NS(alert=make_alert(tenant_id="T-PLAIN"))
+    scoped = PlainLLM().for_session(session)
+    assert scoped.chat(MESSAGES).choices[0].message.content == "plain"
+    assert [e.type for e in scoped.chat_stream(MESSAGES)] == [StreamEvent.CONTENT, StreamEvent.DONE]
+
+    llm = make_llm(sse_response(["ok"]))
+    assert llm.for_session(session)._chat_kwargs == {"tenant_id": "T-PLAIN"}
+    print("✅ 只有宣告 tenant_id 的 LLM 才會收到租戶")
+
+
+if __name__ == "__main__":
+    verify_early_stop_closes_response()
+    verify_stream_deadline()
+    verify_openai_stream_assembly()
+    verify_engine_starts_tools_while_streaming()
+    verify_streamed_calls_matched_by_id()
+    verify_tenant_passed_only_when_declared()
@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.schemas import MDRAlert, MDREntity, MDRProcess, MDRToolResult, EntityType, MitreAttack, Severity
+from ai_orchestration_engine.core.context import COMPACTED_PREFIX, compact_tool_content, count_tokens
+from ai_orchestration_engine.core.prompt_encoding import PromptEncoder
+
+
+def sample_alert() -> MDRAlert:
+    return MDRAlert(
+        alert_id="ALERT-20260118-0001",
+        vendor="Fidelis",
+        tenant_id="Tenant-A",
+        timestamp=datetime(2026, 1, 18, 9, 30),
+        severity=Severity.HIGH,
+        title="偵測到惡意行程執行",
+        description="主機 PC-01 執行了 PowerShell 下載腳本，疑似為 Cobalt Strike 活動。",
+        entities=[
+            MDREntity(type=EntityType.HOST, value="PC-01"),
+            MDREntity(type=EntityType.IP, value="192.168.1.10"),
+            MDREntity(type=EntityType.USER, value="CORP\\alice"),
+            MDREntity(type=EntityType.FILE, value="a" * 64, metadata={"algo": "sha256", "path": "C:\\Temp\\x.ps1"}),
+        ],
+        mitre_attack=[MitreAttack(tactic="Execution", technique_id="T1059.001")],
+        raw_data={"id": 1001, "severity": 4, "endpointName": "PC-01", "eventType": "Process", "parentName": None}
+    )
+
+
+def sample_processes(count: int = 40):
+    start = datetime(2026, 1, 18, 8, 0)
+    return [
+        MDRProcess(
+            pid=1000 + i, ppid=4 if i % 5 else None, name=f"svc{i}.exe",
+            command_line=f"C:\\Windows\\System32\\svc{i}.exe -k netsvcs" if i % 3 == 0 else None,
+            executable_path=f"C:\\Windows\\System32\\svc{i}.exe", username="SYSTEM",
+            start_time=start + timedelta(minutes=i)
+        )
+        for i in range(count)
+    ]
+
+
+def verify_lossless():
+    """精簡格式只省略 None / 預設值，還原後內容與原本相同"""
+    encoder = PromptEncoder()
+    alert = sample_alert()
+    decoded = MDRAlert.model_validate_json(encoder.encode_alert(alert))
+    assert decoded == alert
+
+    processes = sample_processes(5)
+    table = json.loads(encoder.encode(processes))
+    assert "hash" not in table["columns"]
+    rebuilt = [MDRProcess(**dict(zip(table["columns"], row))) for row in table["rows"]]
+    assert rebuilt == processes
+
+    result = MDRToolResult(status="success", data=processes, execution_time=0.2)
+    assert json.loads(encoder.encode(result))["data"] == table
+    assert json.loads(PromptEncoder(tabular_processes=False).encode(processes))[0]["pid"] == 1000
+    print("✅ 精簡格式可完整還原")
+
+
+def verify_compaction_keeps_structure():
+    """ContextWindow 壓縮舊的工具結果時，表格欄位與 MDRToolResult.data 必須保留"""
+    encoder = PromptEncoder()
+    processes = sample_processes(12)
+    result = MDRToolResult(status="success", data=processes, execution_time=0.2)
+    compacted = json.loads(compact_tool_content(encoder.encode(result))[len(COMPACTED_PREFIX):])
+    table = compacted["data"]
+    assert compacted["status"] == "success"
+    assert table["columns"] == json.loads(encoder.encode(processes))["columns"]
+    rows = [row for row in table["rows"] if isinstance(row, list)]
+    assert len(rows) == 5 and all(len(row) == len(table["columns"]) for row in rows)
+    assert table["rows"][-1] == "...[+7 rows]"
+
+    host = MDRToolResult(status="success", data={"hostname": "PC-01", "agent": {"version": "9.1"}}, execution_time=1)
+    compacted = json.loads(compact_tool_content(encoder.encode(host))[len(COMPACTED_PREFIX):])
+    assert compacted["data"]["hostname"] == "PC-01" and "agent" in compacted["data"]
+    print("✅ 壓縮後保留表格與 data 結構")
+
+
+def report_savings():
+    encoder = PromptEncoder()
+    alert = sample_alert()
+    baseline = count_tokens(alert.model_dump_json(indent=2))
+    compact = count_tokens(encoder.encode_alert(alert))
+    print(f"MDRAlert: {baseline} -> {compact} tokens ({1 - compact / baseline:.0%} 節省)")
+
+    processes = sample_processes()
+    # 比較基準：逐筆 model_dump_json 組成的 JSON 陣列
+    baseline = count_tokens("[" + ",".join(p.model_dump_json() for p in processes) + "]")
+    rows = count_tokens(PromptEncoder(tabular_processes=False).encode(processes))
+    table = count_tokens(encoder.encode(processes))
+    print(f"MDRProcess x {len(processes)}: {baseline} -> {rows} (精簡 JSON) -> {table} tokens (表格, {1 - table / baseline:.0%} 節省)")
+
+    result = MDRToolResult(status="success", data={"hostname": "PC-01", "isolated": True}, execution_time=1.25)
+    baseline = count_tokens(result.model_dump_json())
+    compact = count_tokens(encoder.encode(result))
+    print(f"MDRToolResult: {baseline} -> {compact} tokens")
+
+
+if __name__ == "__main__":
+    verify_lossless()
+    verify_compaction_keeps_structure()
+    report_savings()
@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_orchestration_engine.core.rate_limit import RateLimiter, get_provider_limiter
+
+
+def verify_rpm_tpm():
+    """RPM 與 TPM 任一用完即等待；reconcile 以實際用量修正 TPM"""
+    limiter = RateLimiter(requests_per_minute=60)
+    assert all(limiter.acquire(timeout=0) for _ in range(60))
+    assert not limiter.acquire(timeout=0.05)
+
+    limiter = RateLimiter(tokens_per_minute=600)
+    assert limiter.acquire(tokens=550, timeout=0)
+    assert not limiter.acquire(tokens=100, timeout=0.05)
+    # 實際用了 700 Token：多出的 150 由之後的請求負擔
+    limiter.reconcile(550, 700)
+    assert limiter.stats()["tokens_available"] < -90
+    assert limiter.tokens.wait_time(100) > 15
+    print("✅ RPM / TPM 用完即等待，實際用量修正 TPM")
+
+
+def verify_concurrency():
+    """max_concurrency 限制同時進行中的請求，request() 結束時歸還名額 (含例外)"""
+    limiter = RateLimiter(max_concurrency=1)
+    with limiter.request(10, tenant_id="A"):
+        assert limiter.in_flight == 1
+        assert not limiter.acquire(timeout=0.05, tenant_id="B")
+    assert limiter.in_flight == 0
+
+    try:
+        with limiter.request(10, tenant_id="A"):
+            raise RuntimeError("provider error")
+    except RuntimeError:
+        pass
+    assert limiter.in_flight == 0
+    print("✅ 並行名額於請求結束時歸還")
+
+
+def verify_tenant_fairness():
+    """等待中的請求依租戶輪替：A 的告警風暴不會讓 B 排到最後"""
+    limiter = RateLimiter(max_concurrency=1)
+    order = []
+    threads = []
+
+    def worker(tenant):
+        with limiter.request(tenant_id=tenant):
+            order.append(tenant)
+
+    limiter.acquire(tenant_id="setup")
+    for tenant in ["A", "A", "A", "B"]:
+        thread = threading.Thread(target=worker, args=(tenant,))
+        thread.start()
+        threads.append(thread)
+        # 確保依序進入等待佇列
+        while limiter.stats()["waiting"] < len(threads):
+            time.sleep(0.005)
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["A", "B", "A", "A"], order
+    assert set(limiter.stats()["tenant_avg_wait"]) == {"setup", "A", "B"}
+    print("✅ 等待中的請求依租戶輪流取得配額")
+
+
+def verify_provider_sharing():
+    """同一供應商 + 模型共用限制器，之後的呼叫沿用第一次的配額"""
+    first = get_provider_limiter("verify", "model-x", requests_per_minute=100)
+    assert get_provider_limiter("verify", "model-x", requests_per_minute=5) is first
+    assert first.requests.capacity == 100
+    assert get_provider_limiter("verify", "model-y") is not first
+    print("✅ 同一供應商 + 模型共用限制器")
+
+
+if __name__ == "__main__":
+    verify_rpm_tpm()
+    verify_concurrency()
+    verify_tenant_fairness()
+    verify_provider_sharing()
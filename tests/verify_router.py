@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+import time
+
+# 將當前目錄加入 path 以便引用 ai_orchestration_engine
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.schemas import Severity
+from ai_orchestration_engine.core.models import BaseLLM, ChatResponse, StreamEvent
+from ai_orchestration_engine.core.router import ModelRoute, RoutingLLM
+
+MESSAGES = [{"role": "user", "content": "alert"}]
+
+
+class StubLLM(BaseLLM):
+    """回傳固定內容；fail 為 True 時拋出例外，delay 模擬回應延遲"""
+
+    def __init__(self, name, fail=False, delay=0.0, fail_after_first_event=False):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.fail_after_first_event = fail_after_first_event
+        self.calls = 0
+
+    def chat(self, messages, tools=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return ChatResponse.build(self.name)
+
+    def chat_stream(self, messages, tools=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        yield StreamEvent(StreamEvent.CONTENT, content=self.name)
+        if self.fail_after_first_event:
+            raise RuntimeError(f"{self.name} dropped")
+        yield StreamEvent(StreamEvent.DONE, response=ChatResponse.build(self.name))
+
+
+def content(response):
+    return response.choices[0].message.content
+
+
+def verify_tier_selection():
+    """依嚴重程度選擇模型等級，迭代過多時升級"""
+    router = RoutingLLM([
+        ModelRoute("fast", StubLLM("fast"), tier=0),
+        ModelRoute("mid", StubLLM("mid"), tier=1),
+        ModelRoute("strong", StubLLM("strong"), tier=2),
+    ], escalate_after=2)
+    assert [r.name for r in router.candidates(Severity.LOW)] == ["fast", "mid", "strong"]
+    assert [r.name for r in router.candidates(Severity.HIGH)] == ["mid", "strong", "fast"]
+    assert router.candidates(Severity.CRITICAL)[0].name == "strong"
+    assert router.candidates(Severity.HIGH, iteration=3)[0].name == "strong"
+    assert content(router.route_chat(MESSAGES, severity=Severity.LOW)) == "fast"
+    print("✅ 依嚴重程度與迭代次數選擇模型")
+
+
+def verify_failover():
+    """呼叫失敗或逾時時切換到下一個候選模型，失敗的模型在冷卻期間排到最後"""
+    broken = StubLLM("broken", fail=True)
+    backup = StubLLM("backup")
+    router = RoutingLLM([ModelRoute("broken", broken, tier=1), ModelRoute("backup", backup, tier=0)])
+    assert content(router.route_chat(MESSAGES, severity=Severity.HIGH)) == "backup"
+    assert router.candidates(Severity.HIGH)[0].name == "backup"
+    assert content(router.route_chat(MESSAGES, severity=Severity.HIGH)) == "backup"
+    assert broken.calls == 1 and backup.calls == 2
+
+    slow = StubLLM("slow", delay=0.5)
+    router = RoutingLLM([ModelRoute("slow", slow, tier=0), ModelRoute("backup", StubLLM("backup"), tier=0)], timeout=0.1)
+    started = time.monotonic()
+    assert content(router.route_chat(MESSAGES, severity=Severity.LOW)) == "backup"
+    assert time.monotonic() - started < 0.4
+
+    router = RoutingLLM([ModelRoute("a", StubLLM("a", fail=True)), ModelRoute("b", StubLLM("b", fail=True))])
+    try:
+        router.route_chat(MESSAGES)
+    except RuntimeError as e:
+        assert "unavailable" in str(e)
+    else:
+        raise AssertionError("所有模型失敗時應拋出最後的錯誤")
+    print("✅ 失敗或逾時時切換模型")
+
+
+def verify_queue_time_excluded():
+    """逾時與延遲由模型呼叫實際開始執行時起算，工作池排隊時間不使模型被判定為失敗"""
+    shared = StubLLM("shared", delay=0.2)
+    router = RoutingLLM([ModelRoute("shared", shared, tier=0)], timeout=0.3, max_workers=1)
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(content(router.route_chat(MESSAGES))))
+               for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    stats = router.stats()["shared"]
+    assert results == ["shared", "shared"] and stats["failures"] == 0 and stats["latency"] < 0.3
+
+    # 排隊超過 queue_timeout 仍未開始時取消並拋出 TimeoutError，但不計入模型的健康統計
+    router = RoutingLLM([ModelRoute("shared", StubLLM("shared", delay=0.3), tier=0)], max_workers=1, queue_timeout=0.05)
+    busy = threading.Thread(target=router.route_chat, args=(MESSAGES,))
+    busy.start()
+    time.sleep(0.05)
+    try:
+        router.route_chat(MESSAGES)
+    except TimeoutError as e:
+        assert "排隊" in str(e)
+    else:
+        raise AssertionError("工作池忙碌時應拋出排隊逾時")
+    busy.join()
+    assert router.stats()["shared"]["failures"] == 0 and router.stats()["shared"]["calls"] == 1
+    print("✅ 排隊時間不計入模型逾時與延遲")
+
+
+def verify_stream_failover():
+    """串流只在尚未輸出任何事件前切換模型"""
+    router = RoutingLLM([ModelRoute("broken", StubLLM("broken", fail=True), tier=0),
+                         ModelRoute("backup", StubLLM("backup"), tier=0)])
+    events = list(router.route_chat_stream(MESSAGES, severity=Severity.LOW))
+    assert [e.content for e in events if e.type == StreamEvent.CONTENT] == ["backup"]
+
+    router = RoutingLLM([ModelRoute("flaky", StubLLM("flaky", fail_after_first_event=True), tier=0),
+                         ModelRoute("backup", StubLLM("backup"), tier=0)])
+    received = []
+    try:
+        for event in router.route_chat_stream(MESSAGES, severity=Severity.LOW):
+            received.append(event.content)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("已輸出片段後的錯誤不可切換模型")
+    assert received == ["flaky"]
+    print("✅ 串流僅在輸出前切換模型")
+
+
+if __name__ == "__main__":
+    verify_tier_selection()
+    verify_failover()
+    verify_queue_time_excluded()
+    verify_stream_failover()
@@ -0,0 +1,102 @@
+import os
+import queue
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.factory import AdapterFactory
+from ingestion.checkpoint import CheckpointStore
+from ingestion.scheduler import IngestionScheduler, PollTarget
+
+# 測試資料的 createDate 固定於過去，首次輪詢不限制往回擷取的時間
+CONFIG = {
+    "server_url": "https://fidelis.invalid", "username": "u", "password": "p",
+    "fidelis_isolate_script_id": "iso", "fidelis_terminate_process_script_id": "term",
+    "initial_lookback": None
+}
+RAW_ALERTS = [
+    {"id": i, "name": f"Alert {i}", "severity": 3, "endpointName": f"PC-{i}",
+     "createDate": f"2026-01-18T09:00:0{min(i, 3)}Z"}
+    for i in range(1, 7)
+]
+
+
+class StubClient:
+    """模擬 Fidelis API：回傳 createDate >= start_date 的告警 (startDate 為包含邊界)"""
+
+    def __init__(self):
+        self.requested = []
+
+    def iter_alert_pages(self, page_size=100, start_date=None, **kwargs):
+        self.requested.append(start_date)
+        alerts = [a for a in RAW_ALERTS if start_date is None or a["createDate"] >= start_date]
+        for i in range(0, len(alerts), page_size):
+            yield alerts[i:i + page_size]
+
+
+class StoppingQueue(queue.Queue):
+    """放入 limit 筆後模擬服務停止 (後續的 put 一律 Full)"""
+
+    def __init__(self, scheduler_ref, limit):
+        super().__init__()
+        self.scheduler_ref = scheduler_ref
+        self.limit = limit
+
+    def put(self, item, block=True, timeout=None):
+        if self.qsize() >= self.limit:
+            self.scheduler_ref[0]._stop.set()
+            raise queue.Full
+        super().put(item, block, timeout)
+
+
+def verify_rejected_alert_is_repolled():
+    """服務停止時被拒絕的告警不可寫入 Checkpoint，重啟後必須重新擷取"""
+    db_path = os.path.join(tempfile.mkdtemp(), "state.db")
+    store = CheckpointStore(db_path)
+    target = PollTarget(tenant_id="T-CKPT", vendor="Fidelis", config=CONFIG, page_size=2)
+
+    adapter = AdapterFactory.get_adapter("Fidelis", target.tenant_id, CONFIG)
+    adapter.client = StubClient()
+
+    ref = [None]
+    first = IngestionScheduler([target], store, work_queue=StoppingQueue(ref, limit=3))
+    ref[0] = first
+    assert first.poll_once(target) == 3
+    first.stop()
+    delivered = [first.work_queue.get_nowait().alert_id for _ in range(3)]
+    assert delivered == ["1", "2", "3"]
+    assert store.load(target.tenant_id, target.vendor) == {"last_check_time": "2026-01-18T09:00:03Z", "boundary_ids": ["3"]}
+
+    # 重啟：從 Checkpoint 接續，第 4 筆 (上次被拒絕) 之後的告警都要收到
+    second = IngestionScheduler([target], store)
+    assert second.poll_once(target) == 3
+    second.stop()
+    resumed = [second.work_queue.get_nowait().alert_id for _ in range(3)]
+    assert resumed == ["4", "5", "6"], resumed
+    assert adapter.client.requested[-1] == "2026-01-18T09:00:03Z"
+    store.close()
+    print("✅ 被拒絕的告警於重啟後重新擷取，已送出的告警不重複")
+
+
+def verify_first_poll_uses_initial_lookback():
+    """尚無 Checkpoint 時以 PollTarget.initial_lookback 限制首次擷取的起點"""
+    store = CheckpointStore(os.path.join(tempfile.mkdtemp(), "state.db"))
+    target = PollTarget(tenant_id="T-LOOKBACK", vendor="Fidelis", config=CONFIG, initial_lookback=3600)
+    adapter = AdapterFactory.get_adapter("Fidelis", target.tenant_id, CONFIG)
+    adapter.client = StubClient()
+
+    scheduler = IngestionScheduler([target], store)
+    assert scheduler.poll_once(target) == 0
+    scheduler.stop()
+    start = datetime.strptime(adapter.client.requested[0], "%Y-%m-%dT%H:%M:%SZ")
+    assert abs((datetime.utcnow() - start) - timedelta(hours=1)) < timedelta(minutes=1)
+    store.close()
+    print("✅ 首次輪詢依 initial_lookback 決定起點")
+
+
+if __name__ == "__main__":
+    verify_rejected_alert_is_repolled()
+    verify_first_poll_uses_initial_lookback()
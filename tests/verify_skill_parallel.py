@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 將當前目錄加入 path 以便引用 skills
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.schemas import MDRProcess
+from fakes import make_alert
+from skills import parallel
+from skills.investigation import deep_investigate_host, triage_alert
+from skills.parallel import get_executor, run_parallel, shutdown_executor
+
+
+def verify_run_parallel():
+    """各分支並行執行；失敗與逾時的分支列於 errors，其餘結果照常回傳"""
+    def boom():
+        raise RuntimeError("vendor down")
+
+    started = time.monotonic()
+    results, errors = run_parallel({
+        "a": lambda: time.sleep(0.2) or "A",
+        "b": lambda: time.sleep(0.2) or "B",
+        "boom": boom,
+        "slow": lambda: time.sleep(1) or "late",
+    }, timeout=0.5)
+    assert results == {"a": "A", "b": "B"}
+    assert errors["boom"] == "vendor down" and errors["slow"].startswith("Timed out")
+    assert time.monotonic() - started < 0.9
+    print("✅ 劇本分支並行執行，失敗與逾時分別回報")
+
+
+def verify_executor_lifecycle():
+    """呼叫端可傳入自行管理的執行緒池；共用執行緒池可關閉並於下次使用時重建"""
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="caller") as own:
+        results, _ = run_parallel({"name": lambda: __import__("threading").current_thread().name}, executor=own)
+        assert results["name"].startswith("caller")
+
+    shared = get_executor()
+    shutdown_executor()
+    assert parallel._executor is None
+    assert get_executor() is not shared
+    shutdown_executor()
+    print("✅ 共用執行緒池可關閉，呼叫端可自行提供執行緒池")
+
+
+class SlowAdapter:
+    """每個廠商呼叫耗時 0.3 秒；broken 中列出的主機查詢失敗"""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+
+    def get_host_details(self, hostname):
+        time.sleep(0.3)
+        if hostname in self.broken:
+            raise ConnectionError(f"{hostname} unreachable")
+        return {"hostname": hostname, "os": "Windows 11"}
+
+    def list_processes(self, hostname):
+        time.sleep(0.3)
+        return [MDRProcess(pid=1, name="explorer.exe", executable_path="C:\\Windows\\explorer.exe"),
+                MDRProcess(pid=2, name="dropper.exe", executable_path="C:\\Users\\alice\\Downloads\\dropper.exe")]
+
+    def normalize_alert(self, raw_alert):
+        return make_alert(title="Lateral movement", host=raw_alert["hosts"])
+
+
+def verify_host_skills_fan_out():
+    """deep_investigate_host 與 triage_alert 的廠商呼叫並行送出，失敗的分支列於 errors"""
+    started = time.monotonic()
+    result = deep_investigate_host(SlowAdapter(), "PC-01")
+    assert time.monotonic() - started < 0.5
+    assert result["host_info"]["hostname"] == "PC-01"
+    assert [p["pid"] for p in result["suspicious_processes"]] == [2]
+    assert result["errors"] == {}
+
+    result = deep_investigate_host(SlowAdapter(broken={"PC-01"}), "PC-01")
+    assert result["host_info"] is None and "host_info" in result["errors"]
+    assert len(result["suspicious_processes"]) == 1
+
+    started = time.monotonic()
+    result = triage_alert(SlowAdapter(broken={"PC-03"}), {"hosts": ["PC-01", "PC-02", "PC-03", "PC-04"]})
+    assert time.monotonic() - started < 0.5
+    assert sorted(result["enrichments"]) == ["PC-01", "PC-02", "PC-04"]
+    assert result["errors"] == {"PC-03": "PC-03 unreachable"}
+    print("✅ 複合劇本並行查詢廠商 API")
+
+
+if __name__ == "__main__":
+    verify_run_parallel()
+    verify_executor_lifecycle()
+    verify_host_skills_fan_out()
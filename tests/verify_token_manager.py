@@ -0,0 +1,148 @@
+import gc
+import os
+import sys
+import threading
+import time
+import weakref
+
+import requests
+
+# 將當前目錄加入 path 以便引用 adapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from adapter.core.token_manager import TokenManager, get_shared_token_manager
+from adapter.packs.Fidelis import client as fidelis_client
+from adapter.packs.Fidelis.client import FidelisEndpointClient
+from adapter.packs.TrendMicro.client import TrendMicroVisionOneClient
+from fakes import StubResponse, StubSession
+
+
+class VendorApi:
+    """模擬廠商 API：登入回傳遞增的 Token，其餘請求依序回傳指定狀態碼"""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.logins = 0
+        self.authorizations = []
+
+    def __call__(self, method, url, kwargs):
+        if url.endswith("/authenticate"):
+            self.logins += 1
+            return StubResponse(200, {"success": True, "data": {"token": f"token-{self.logins}"}})
+        self.authorizations.append(kwargs["headers"]["Authorization"])
+        status = self.statuses.pop(0) if self.statuses else 200
+        return StubResponse(status, {"success": True, "data": {"entities": []}})
+
+
+def verify_static_key_is_not_replayed():
+    """靜態 API Key 收到 401 時不重送 (重送只會再次失敗)"""
+    client = TrendMicroVisionOneClient("https://tm.invalid", "static-key")
+    api = VendorApi(statuses=[401])
+    client.session = StubSession(handler=api)
+    try:
+        client._http_request("GET", "/v3/healthcheck")
+    except requests.HTTPError:
+        pass
+    else:
+        raise AssertionError("401 應回報為錯誤")
+    assert api.authorizations == ["Bearer static-key"]
+    assert client.token_manager._timer is None
+    print("✅ 靜態 API Key 收到 401 不重送")
+
+
+def verify_shared_manager_per_credential():
+    """同一組憑證的 Client 共用 Token 與背景計時器；收到 401 時只重新登入一次並重送"""
+    api = VendorApi(statuses=[401])
+    session = StubSession(handler=api)
+    shared_session = fidelis_client.get_shared_session
+    fidelis_client.get_shared_session = lambda *args, **kwargs: session
+    try:
+        first = FidelisEndpointClient("https://fidelis-shared.invalid", "svc", "secret")
+        second = FidelisEndpointClient("https://fidelis-shared.invalid", "svc", "secret")
+        other = FidelisEndpointClient("https://fidelis-shared.invalid", "other", "secret")
+        rotated = FidelisEndpointClient("https://fidelis-shared.invalid", "svc", "rotated")
+    finally:
+        fidelis_client.get_shared_session = shared_session
+    assert first.token_manager is second.token_manager
+    assert other.token_manager is not first.token_manager and rotated.token_manager is not first.token_manager
+
+    second._http_request("GET", "/alerts/getalertsV2")
+    assert api.logins == 2
+    assert api.authorizations == ["Bearer token-1", "Bearer token-2"]
+    assert first.token == "token-2"
+
+    first._http_request("GET", "/alerts/getalertsV2")
+    assert api.logins == 2
+    first.token_manager.close()
+    print("✅ 同一組憑證共用 TokenManager，401 時更新後重送一次")
+
+
+def verify_shared_manager_does_not_pin_client():
+    """共用管理器不持有建立它的 Client；綁定方法不可作為共用登入函式"""
+    login = CountingLogin(ttl=None)
+    first = FidelisEndpointClient("https://fidelis-pin.invalid", "svc", "secret")
+    manager = first.token_manager
+    first_ref = weakref.ref(first)
+    second = FidelisEndpointClient("https://fidelis-pin.invalid", "svc", "secret")
+    del first
+    gc.collect()
+    assert first_ref() is None and second.token_manager is manager
+
+    try:
+        get_shared_token_manager(login.__call__, "svc")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("綁定方法應被拒絕")
+    print("✅ 共用 TokenManager 不持有第一個 Client")
+
+
+class CountingLogin:
+    """每次登入回傳新的 Token，可模擬登入延遲"""
+
+    def __init__(self, ttl, delay=0.0):
+        self.ttl = ttl
+        self.delay = delay
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self._lock:
+            self.count += 1
+            return f"token-{self.count}", self.ttl
+
+
+def verify_refresh_on_expiry():
+    """Token 到期後重新登入；並發的呼叫只觸發一次登入；背景計時器在到期前更新"""
+    login = CountingLogin(ttl=0.2, delay=0.05)
+    manager = TokenManager(login, refresh_margin=0, auto_refresh=False)
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get_token())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tokens == ["token-1"] * 8 and login.count == 1
+
+    time.sleep(0.25)
+    assert manager.get_token() == "token-2" and login.count == 2
+
+    login = CountingLogin(ttl=1.2)
+    manager = TokenManager(login, refresh_margin=1.0)
+    assert manager.get_token() == "token-1"
+    # 到期前 refresh_margin 秒 (最少 1 秒後) 由背景計時器更新
+    deadline = time.monotonic() + 3
+    while manager.token == "token-1" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert manager.token == "token-2"
+    manager.close()
+    assert manager._timer is None
+    print("✅ Token 到期前背景更新，並發登入合併為一次")
+
+
+if __name__ == "__main__":
+    verify_static_key_is_not_replayed()
+    verify_refresh_on_expiry()
+    verify_shared_manager_per_credential()
+    verify_shared_manager_does_not_pin_client()